@@ -0,0 +1,59 @@
+"""
+Micro-benchmark of sentinel-preserving lists used for ``sys.meta_path``.
+
+Compares :class:`recursely.utils.SentinelList` with
+:class:`recursely.utils.FastSentinelList` on the kinds of mutations
+that frameworks and test runners perform on ``sys.meta_path``,
+as well as on checking whether the recursive importer is installed.
+
+Usage::
+
+    $ python benchmarks/sentinel_list.py [LENGTH]
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), os.pardir))
+
+from recursely.utils import FastSentinelList, SentinelList
+
+
+class Finder(object):
+    pass
+
+
+class Sentinel(object):
+    pass
+
+
+def churn(meta_path):
+    """Typical hook (un)installation done by a framework."""
+    finder = Finder()
+    meta_path.insert(0, finder)
+    meta_path.append(finder)
+    meta_path.remove(finder)
+    meta_path.pop(0)
+
+
+def is_installed(meta_path):
+    """Check for the sentinel hook the way ``ImportHook`` does."""
+    for ih in getattr(meta_path, 'sentinels', meta_path):
+        if isinstance(ih, Sentinel):
+            return True
+
+
+def main(length=10, number=20000):
+    print("%d finders before sentinels, %d repetitions\n" % (length, number))
+    print("%-20s %12s %12s" % ('', 'churn', 'is_installed'))
+    for cls in (SentinelList, FastSentinelList):
+        meta_path = cls([Finder() for _ in range(length)],
+                        sentinels=[Sentinel(), Finder()])
+        timings = [timeit.timeit(lambda: op(meta_path), number=number)
+                   for op in (churn, is_installed)]
+        print("%-20s %10.1fms %10.1fms" % (
+            (cls.__name__,) + tuple(t * 1000 for t in timings)))
+
+
+if __name__ == '__main__':
+    main(*map(int, sys.argv[1:2]))
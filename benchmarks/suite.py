@@ -0,0 +1,247 @@
+"""
+Benchmark suite for recursive imports of synthetic package trees.
+
+Generates package trees of several predefined sizes (see ``treegen.SIZES``),
+and/or one of a custom shape, in a temporary directory and times,
+each in a fresh interpreter:
+
+* ``cold_import`` -- importing the tree without any bytecode cached
+* ``warm_import`` -- importing it again, with bytecode cached
+* ``retroactive_install`` -- ``install()`` after the top-level package
+  has been imported without the hook
+* ``find_spec`` -- 1000 lookups of nonexistent modules through the hook
+* ``meta_path_churn`` -- 10000 insertions and removals of another finder
+  into ``sys.meta_path`` with the hook installed
+
+Results can be saved as JSON, and compared against a baseline saved
+earlier (with the same ``--module-size`` and ``--star``), exiting with
+non-zero status if any timing got worse by more than given tolerance.
+
+Usage::
+
+    $ python benchmarks/suite.py [--sizes tiny,small,medium,large]
+                                 [--width N] [--depth N] [--modules N]
+                                 [--module-size N] [--star]
+                                 [--repeat N] [--save results.json]
+                                 [--baseline baseline.json]
+                                 [--tolerance 0.2]
+
+Giving any of ``--width``, ``--depth`` or ``--modules`` adds a tree
+of that shape (with the rest taken from the ``small`` size), named
+like ``4x2x10``, and runs only that one unless ``--sizes`` are given too.
+"""
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+
+from treegen import (MODULE_SIZE, SIZES, add_shape_arguments,
+                     generate_tree, shape_from_arguments)
+
+
+REPO_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__),
+                                        os.pardir))
+
+METRICS = ('cold_import', 'warm_import', 'retroactive_install',
+           'find_spec', 'meta_path_churn')
+
+#: Code run in a fresh interpreter to take a single measurement;
+#: prints the time in seconds
+DRIVER = r'''
+import sys, time
+clock = getattr(time, 'perf_counter', time.time)
+root, metric = sys.argv[1:3]
+sys.path[:0] = [root, %(repo_dir)r]
+import recursely
+
+if metric in ('cold_import', 'warm_import'):
+    recursely.install()
+    start = clock()
+    import bench
+elif metric == 'retroactive_install':
+    import bench
+    start = clock()
+    recursely.install(retroactive=True)
+elif metric == 'find_spec':
+    recursely.install()
+    importer = recursely.RecursiveImporter.get_installed()
+    start = clock()
+    for i in range(1000):
+        importer.find_spec('nonexistent_module_%%d' %% i)
+elif metric == 'meta_path_churn':
+    recursely.install()
+    finder = object()
+    start = clock()
+    for _ in range(10000):
+        sys.meta_path.insert(0, finder)
+        sys.meta_path.remove(finder)
+print(clock() - start)
+''' % {'repo_dir': REPO_DIR}
+
+
+def measure(root, metric, repeat=3):
+    """Take the best of ``repeat`` measurements of given metric.
+    :return: Time in seconds
+    """
+    # warm imports need the bytecode to be written in the first place
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+
+    timings = []
+    for _ in range(repeat):
+        if metric == 'cold_import':
+            _remove_bytecode(root)
+        output = subprocess.check_output(
+            [sys.executable, '-c', DRIVER, root, metric], env=env)
+        timings.append(float(output.decode('ascii').strip()))
+    return min(timings)
+
+
+def run(sizes, star=False, repeat=3, module_size=MODULE_SIZE, shapes=None,
+        log=sys.stderr):
+    """Run the benchmarks for trees of given sizes.
+
+    :param sizes: Names of tree sizes, out of ``treegen.SIZES``
+                  and ``shapes``
+    :param module_size: Number of functions in every module
+    :param shapes: Optional dictionary of additional tree shapes,
+                   in the same format as ``treegen.SIZES``
+    :return: Dictionary of results, suitable for saving as JSON
+    """
+    shapes = dict(SIZES, **(shapes or {}))
+    results = {}
+    for size in sizes:
+        width, depth, modules = shapes[size]
+        root = tempfile.mkdtemp(prefix='recursely-bench-')
+        try:
+            count = generate_tree(root, width=width, depth=depth,
+                                  modules=modules, module_size=module_size,
+                                  star=star)
+            log.write("%s (%d modules)...\n" % (size, count))
+
+            # run the warm import once first, so that bytecode gets cached
+            measure(root, 'warm_import', repeat=1)
+            results[size] = dict((metric, measure(root, metric, repeat))
+                                 for metric in METRICS)
+            results[size]['modules'] = count
+        finally:
+            shutil.rmtree(root)
+
+    return {'python': platform.python_version(),
+            'implementation': platform.python_implementation(),
+            'star': star,
+            'module_size': module_size,
+            'results': results}
+
+
+def compare(current, baseline, tolerance=0.2):
+    """Compare results against the baseline.
+
+    :param tolerance: Relative slowdown that is still acceptable
+    :return: Tuple of report lines and list of regressions,
+             as ``(size, metric, ratio)`` tuples
+    :raise ValueError: If the baseline was run on trees of different kind
+    """
+    # (baselines saved before these options existed were run with defaults)
+    for option, default in (('star', False), ('module_size', MODULE_SIZE)):
+        if current.get(option) != baseline.get(option, default):
+            raise ValueError("baseline was run with %s=%r, not %r" % (
+                option, baseline.get(option, default), current.get(option)))
+
+    lines = ['%-8s %-20s %12s %12s %8s' % ('size', 'metric', 'baseline',
+                                           'current', 'ratio')]
+    regressions = []
+    for size, metrics in sorted(current['results'].items()):
+        base_metrics = baseline.get('results', {}).get(size, {})
+        for metric in METRICS:
+            if metric not in metrics or metric not in base_metrics:
+                continue
+            ratio = metrics[metric] / base_metrics[metric]
+            flag = ''
+            if ratio > 1 + tolerance:
+                regressions.append((size, metric, ratio))
+                flag = '  <-- regression'
+            lines.append('%-8s %-20s %10.2fms %10.2fms %7.2fx%s' % (
+                size, metric, base_metrics[metric] * 1000,
+                metrics[metric] * 1000, ratio, flag))
+    return lines, regressions
+
+
+def report(results):
+    """Format the results as a table.
+    :return: List of lines
+    """
+    lines = ['%-8s %8s ' % ('size', 'modules') +
+             ' '.join('%20s' % metric for metric in METRICS)]
+    for size, metrics in sorted(results['results'].items(),
+                                key=lambda item: item[1]['modules']):
+        lines.append('%-8s %8d ' % (size, metrics['modules']) +
+                     ' '.join('%18.2fms' % (metrics[metric] * 1000)
+                              for metric in METRICS))
+    return lines
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--sizes',
+                        help="comma-separated tree sizes, out of: %s "
+                             "(default: tiny,small,medium)" % (
+                                 ', '.join(sorted(SIZES, key=SIZES.get))))
+    add_shape_arguments(parser)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--save', help="file to save the results to")
+    parser.add_argument('--baseline', help="file with results to compare to")
+    parser.add_argument('--tolerance', type=float, default=0.2,
+                        help="acceptable relative slowdown "
+                             "(default: %(default)s)")
+    args = parser.parse_args(argv)
+
+    sizes = args.sizes.split(',') if args.sizes else []
+    shapes = {}
+    if (args.width, args.depth, args.modules) != (None, None, None):
+        shape = shape_from_arguments(args)
+        custom = '%dx%dx%d' % shape
+        shapes[custom] = shape
+        sizes.append(custom)
+    unknown = [size for size in sizes if size not in SIZES and
+               size not in shapes]
+    if unknown:
+        parser.error("unknown sizes: %s" % ', '.join(unknown))
+
+    results = run(sizes or ['tiny', 'small', 'medium'], star=args.star,
+                  repeat=args.repeat,
+                  module_size=(MODULE_SIZE if args.module_size is None
+                               else args.module_size),
+                  shapes=shapes)
+    print('\n'.join(report(results)))
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        try:
+            lines, regressions = compare(results, baseline, args.tolerance)
+        except ValueError as e:
+            parser.error(str(e))
+        print('')
+        print('\n'.join(lines))
+        if regressions:
+            return 1
+    return 0
+
+
+def _remove_bytecode(root):
+    for dirpath, dirnames, _ in os.walk(root):
+        if '__pycache__' in dirnames:
+            shutil.rmtree(os.path.join(dirpath, '__pycache__'))
+            dirnames.remove('__pycache__')
+
+
+if __name__ == '__main__':
+    sys.exit(main())
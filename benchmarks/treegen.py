@@ -0,0 +1,140 @@
+"""
+Generator of synthetic package trees for benchmarks.
+
+Usage::
+
+    $ python benchmarks/treegen.py [--size NAME] [--width N] [--depth N]
+                                   [--modules N] [--module-size N] [--star]
+                                   [--name NAME] DIRECTORY
+"""
+import argparse
+import os
+import sys
+
+
+#: Tree shapes used by the benchmark suite, by name:
+#: ``(width, depth, modules)``, i.e. number of subpackages in every package,
+#: how deep the subpackages go, and number of modules in every package
+SIZES = {
+    'tiny': (1, 1, 5),          # 2 packages, 10 modules
+    'small': (3, 2, 8),         # 13 packages, 104 modules
+    'medium': (5, 3, 6),        # 156 packages, 936 modules
+    'large': (10, 3, 9),        # 1111 packages, 9999 modules
+}
+
+#: Default number of functions in every generated module
+MODULE_SIZE = 20
+
+
+def generate_tree(root, name='bench', width=3, depth=2, modules=8,
+                  module_size=MODULE_SIZE, star=False):
+    """Generate a recursive package tree.
+
+    :param root: Directory to generate the package in
+    :param name: Name of the top-level package
+    :param width: Number of subpackages in every package
+    :param depth: Depth of the subpackages' nesting
+    :param modules: Number of modules in every package
+    :param module_size: Number of functions in every module
+    :param star: Whether the package should use ``__recursive__ = '*'``
+
+    :return: Number of modules generated, including packages
+    """
+    top_dir = os.path.join(root, name)
+    count = _generate_package(top_dir, width, depth, modules, module_size,
+                              star=star)
+    with open(os.path.join(top_dir, '__init__.py'), 'w') as f:
+        f.write('__recursive__ = %r\n' % ('*' if star else True))
+    return count
+
+
+def _generate_package(package_dir, width, depth, modules, module_size,
+                      star=False):
+    os.makedirs(package_dir)
+    with open(os.path.join(package_dir, '__init__.py'), 'w'):
+        pass
+    count = 1
+
+    for i in range(modules):
+        module_name = 'mod%d' % i
+        path = os.path.join(package_dir, module_name + '.py')
+        with open(path, 'w') as f:
+            f.write(_module_source(module_name, module_size, star))
+        count += 1
+
+    if depth > 0:
+        for i in range(width):
+            count += _generate_package(
+                os.path.join(package_dir, 'pkg%d' % i),
+                width, depth - 1, modules, module_size, star)
+    return count
+
+
+def _module_source(module_name, size, star=False):
+    """Return the source of a module with ``size`` functions."""
+    lines = ['"""Generated module %s."""' % module_name]
+    if star:
+        lines.append('__all__ = [%s]' % ', '.join(
+            "'%s_f%d'" % (module_name, i) for i in range(size)))
+    for i in range(size):
+        lines.extend(['', '',
+                      'def %s_f%d(x):' % (module_name, i),
+                      '    """Return x plus %d."""' % i,
+                      '    return x + %d' % i])
+    return '\n'.join(lines) + '\n'
+
+
+def add_shape_arguments(parser):
+    """Add options for the shape of generated trees to an argument parser.
+    Options that aren't given are ``None``.
+    """
+    parser.add_argument('--width', type=int,
+                        help="number of subpackages in every package")
+    parser.add_argument('--depth', type=int,
+                        help="depth of the subpackages' nesting")
+    parser.add_argument('--modules', type=int,
+                        help="number of modules in every package")
+    parser.add_argument('--module-size', type=int,
+                        help="number of functions in every module")
+    parser.add_argument('--star', action='store_true',
+                        help="use __recursive__ = '*' in the tree")
+
+
+def shape_from_arguments(args, size='small'):
+    """Return the tree shape given by options added with
+    :func:`add_shape_arguments`, with those that weren't given
+    taken from a predefined size.
+
+    :return: Tuple of ``(width, depth, modules)``
+    """
+    width, depth, modules = SIZES[size]
+    return (width if args.width is None else args.width,
+            depth if args.depth is None else args.depth,
+            modules if args.modules is None else args.modules)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('directory', help="directory to generate the tree in")
+    parser.add_argument('--name', default='bench',
+                        help="name of the top-level package "
+                             "(default: %(default)s)")
+    parser.add_argument('--size', choices=sorted(SIZES, key=SIZES.get),
+                        help="predefined tree shape, which other options "
+                             "can override (default: small)")
+    add_shape_arguments(parser)
+    args = parser.parse_args(argv)
+
+    width, depth, modules = shape_from_arguments(args, args.size or 'small')
+    count = generate_tree(
+        args.directory, name=args.name,
+        width=width, depth=depth, modules=modules,
+        module_size=(MODULE_SIZE if args.module_size is None
+                     else args.module_size),
+        star=args.star)
+    print("generated %d modules" % count)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
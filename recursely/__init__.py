@@ -7,28 +7,96 @@ __author__ = "Karol Kuczmarski"
 __license__ = "Simplified BSD"
 
 
+import os
 import sys
 
 from recursely._compat import IS_PY3
+from recursely.cache import ManifestCache
+from recursely.directive import Directive
 from recursely.importer import RecursiveImporter
-from recursely.utils import SentinelList
+from recursely.lazy import materialize
+from recursely.manifest import ImportManifest
+from recursely.plan import plan as _plan
+from recursely.prefetch import Prefetcher
+from recursely.preload import preload as _preload
+from recursely.profiling import ImportProfiler
+from recursely.refresh import Watcher
+from recursely.utils import FastSentinelList
 
 
-__all__ = ['install']
+__all__ = ['Directive', 'expanded_packages', 'install', 'materialize',
+           'plan', 'preload', 'refresh', 'stats', 'wait', 'watch',
+           'when_ready']
 
 
-def install(retroactive=True):
+def install(retroactive=True, cache=None, prefetch=0, profile=None,
+            packages=None, manifest=None, include=None, exclude=None,
+            max_depth=None, namespaces=False):
     """Install the recursive import hook in ``sys.meta_path``,
     enabling the use of ``__recursive__`` directive.
 
     :param retroactive: Whether the hook should be retroactively applied
                         to module's that have been imported before
                         it was installed.
+    :param cache: Path to a file where listings of package directories
+                  will be cached between runs, so that only their
+                  modification times have to be checked on startup.
+                  Defaults to the ``RECURSELY_CACHE`` environment variable;
+                  if neither is set, no caching is done.
+    :param prefetch: Number of threads used to read and compile
+                     child modules ahead of their import.
+                     Zero (the default) disables prefetching.
+    :param profile: Whether to time every recursively imported module,
+                    making the results available through :func:`stats`.
+                    With ``'memory'``, memory taken by every module
+                    is measured as well.
+                    Defaults to the ``RECURSELY_PROFILE`` environment
+                    variable being set to a non-empty value
+                    (which can also be ``memory``).
+    :param packages: Names of the only packages that may use
+                     ``__recursive__`` (in them or any of their
+                     subpackages). If given, the import hook rejects
+                     lookups of all other modules immediately, rather than
+                     locating each of them to check for the directive.
+    :param manifest: Path to a manifest file generated ahead of time
+                     with ``python -m recursely freeze``. Packages
+                     recorded there are imported without listing their
+                     directories, unless they have changed since.
+                     Defaults to the ``RECURSELY_MANIFEST``
+                     environment variable.
+    :param include: Glob patterns of the only children to import
+                    in all recursive packages (see :class:`Directive`)
+    :param exclude: Glob patterns of children to skip in all recursive
+                    packages. Defaults to comma-separated patterns from
+                    the ``RECURSELY_EXCLUDE`` environment variable.
+    :param max_depth: Limit of recursion depth for all recursive packages
+    :param namespaces: Whether subdirectories without `__init__.py`
+                       should be imported as :pep:`420` namespace
+                       subpackages of recursive packages, unless their
+                       directives say otherwise (see :class:`Directive`)
     """
     if RecursiveImporter.is_installed():
         return
 
-    importer = RecursiveImporter()
+    cache = cache or os.environ.get('RECURSELY_CACHE')
+    manifest = manifest or os.environ.get('RECURSELY_MANIFEST')
+    if exclude is None:
+        exclude = [pattern.strip() for pattern
+                   in os.environ.get('RECURSELY_EXCLUDE', '').split(',')
+                   if pattern.strip()]
+    if profile is None:
+        profile = os.environ.get('RECURSELY_PROFILE') or False
+    if prefetch and not Prefetcher.is_supported():
+        raise RuntimeError("prefetching requires Python 3.2 or newer")
+    importer = RecursiveImporter(
+        cache=ManifestCache(cache) if cache else None,
+        prefetcher=Prefetcher(prefetch) if prefetch else None,
+        profiler=(ImportProfiler(memory=profile == 'memory')
+                  if profile else None),
+        packages=packages,
+        manifest=ImportManifest(manifest) if manifest else None,
+        include=include, exclude=exclude, max_depth=max_depth,
+        namespaces=namespaces)
 
     # because the hook is a catch-all one, we ensure that it's always
     # at the very end of ``sys.meta_path``, so that it's tried only if
@@ -39,14 +107,176 @@ def install(retroactive=True):
             is_builtin = ih_module == '_frozen_importlib'
             if not is_builtin:
                 break
-        sys.meta_path = SentinelList(
+        sys.meta_path = FastSentinelList(
             sys.meta_path[:i],
             sentinels=[importer] + sys.meta_path[i:])
     else:
-        sys.meta_path = SentinelList(sys.meta_path, sentinel=importer)
+        sys.meta_path = FastSentinelList(sys.meta_path, sentinel=importer)
 
     # look through already imported packages and recursively import
     # their submodules, if they contain the ``__recursive__`` directive
     if retroactive:
         for module in list(sys.modules.values()):
             importer.recurse(module)
+
+
+def preload(*packages, **options):
+    """Fully import trees of given recursive packages before forking
+    worker processes (e.g. with gunicorn's ``--preload``), so that
+    their memory is shared copy-on-write between the workers.
+
+    The recursive import hook is installed first, if necessary.
+    Packages that are imported lazily or in the background are imported
+    completely. Afterwards, recursive packages imported for the first time
+    in a forked process trigger a :class:`PostForkImportWarning`.
+
+    :param packages: Names (or module objects) of recursive packages
+    :param collect: Whether to run ``gc.collect()`` afterwards
+                    (``True`` by default)
+    :param freeze: Whether to run ``gc.freeze()`` afterwards, on Python 3.7+
+                   (``True`` by default)
+    :return: :class:`PreloadReport` with names of all modules
+             that have been loaded, and the memory they took
+    """
+    unknown = set(options) - set(['collect', 'freeze'])
+    if unknown:
+        raise TypeError("unexpected keyword arguments: %s" % (
+            ', '.join(sorted(unknown))))
+
+    install(retroactive=True)
+    return _preload(RecursiveImporter.get_installed(), packages, **options)
+
+
+def plan(package):
+    """Find out which modules ``__recursive__`` directives would pull in
+    when given package is imported, without executing any of them.
+
+    The directives are read from packages' `__init__.py` files statically,
+    and global filters of the installed hook (if any) are applied.
+
+    :param package: Name of a recursive package
+    :return: :class:`PlanNode` of the package, with its children
+             (and theirs) in the order they would be imported,
+             and sizes of their source files
+    """
+    return _plan(package, RecursiveImporter.get_installed())
+
+
+def refresh(package):
+    """Import modules and subpackages that have been added to the tree
+    of a recursive package (e.g. plugins dropped into its directory)
+    since it was imported, and find those that have been removed.
+
+    Only the package directories that have changed are listed again.
+    Removed modules are not unloaded.
+
+    :param package: Package module object or its name
+    :return: :class:`RefreshReport` with names of added
+             and removed modules
+    :raise RuntimeError: If the recursive import hook is not installed
+    """
+    importer = RecursiveImporter.get_installed()
+    if importer is None:
+        raise RuntimeError("recursive import hook is not installed")
+
+    if not hasattr(package, '__dict__'):
+        from importlib import import_module
+        package = import_module(package)
+    return importer.refresh(package)
+
+
+def watch(*packages, **options):
+    """Start refreshing recursive packages (see :func:`refresh`)
+    on a background thread, whenever modules are added or removed.
+
+    On Linux, the package directories are watched with ``inotify``;
+    elsewhere, they're checked periodically.
+
+    :param packages: Names of recursive packages
+    :param callback: Function called with a :class:`RefreshReport`
+                     for every package that has changed
+    :param interval: How often to check for changes, in seconds
+                     (``1.0`` by default)
+    :param inotify: Whether to use ``inotify`` (by default, if available)
+    :return: Started :class:`Watcher`, with a ``stop()`` method
+    :raise RuntimeError: If the recursive import hook is not installed
+    """
+    unknown = set(options) - set(['callback', 'interval', 'inotify'])
+    if unknown:
+        raise TypeError("unexpected keyword arguments: %s" % (
+            ', '.join(sorted(unknown))))
+
+    importer = RecursiveImporter.get_installed()
+    if importer is None:
+        raise RuntimeError("recursive import hook is not installed")
+    names = [getattr(package, '__name__', package) for package in packages]
+    return Watcher(importer, names, **options).start()
+
+
+def stats():
+    """Return timings (and memory usage) of recursive imports,
+    if profiling was enabled when calling :func:`install`.
+
+    :return: :class:`ImportProfiler` whose ``roots`` are the trees
+             of :class:`ImportRecord`\\ s, and which can also produce
+             a ``report()`` of the slowest imports (and a ``memory_report()``
+             of the biggest ones); or ``None``
+    """
+    importer = RecursiveImporter.get_installed()
+    return None if importer is None else importer.profiler
+
+
+def expanded_packages():
+    """Return the packages whose trees have been fully imported
+    (or made importable lazily) by the installed recursive importer.
+
+    :return: Dictionary mapping package names to lists of their children
+    """
+    importer = RecursiveImporter.get_installed()
+    return {} if importer is None else importer.expanded_packages.as_dict()
+
+
+def wait(package, timeout=None):
+    """Wait until children of a package with
+    ``__recursive__ = 'background'`` have all been imported.
+
+    This must not be called while the package itself is still being
+    imported (e.g. from its `__init__.py`), as its background import
+    cannot finish before that.
+
+    :param package: Package module object or its name
+    :param timeout: Maximum time to wait, in seconds
+    :return: Whether the package is ready, i.e. its background import
+             has finished within ``timeout``, or there isn't any
+    :raise: Exception that the background import has failed with
+    """
+    importer = RecursiveImporter.get_installed()
+    if importer is None:
+        return True
+
+    name = getattr(package, '__name__', package)
+    background_import = importer.background_imports.get(name)
+    if background_import is None or not background_import.started():
+        return True
+    return background_import.wait(timeout)
+
+
+def when_ready(package, callback):
+    """Register a function to be called once children of a package
+    with ``__recursive__ = 'background'`` have all been imported.
+
+    The function is called on the background thread (or immediately,
+    if the import has already finished) with a :class:`BackgroundImport`
+    object, whose ``module`` and ``exception`` attributes hold the package
+    and the exception that the import has failed with, if any.
+
+    :param package: Package module object or its name
+    :raise RuntimeError: If the recursive import hook is not installed
+    """
+    importer = RecursiveImporter.get_installed()
+    if importer is None:
+        raise RuntimeError("recursive import hook is not installed")
+
+    name = getattr(package, '__name__', package)
+    importer.background_imports.get(name, create=True) \
+        .add_done_callback(callback)
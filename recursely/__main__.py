@@ -0,0 +1,108 @@
+"""
+Command line interface, available as ``python -m recursely``.
+"""
+import argparse
+import json
+import sys
+
+from recursely.check import check
+from recursely.manifest import freeze
+from recursely.plan import plan
+
+
+def main(argv=None):
+    """Entry point of the command line interface.
+
+    :param argv: Command line arguments, excluding program name
+    :return: Exit code
+    """
+    parser = argparse.ArgumentParser(prog='python -m recursely')
+    commands = parser.add_subparsers(dest='command')
+    commands.required = True
+
+    freeze_parser = commands.add_parser(
+        'freeze', help="write a manifest of recursive packages' trees, "
+                       "to be used with install(manifest=...)")
+    freeze_parser.add_argument('packages', nargs='+', metavar='package',
+                               help="name of a top-level recursive package")
+    freeze_parser.add_argument('-o', '--output',
+                               default='recursely-manifest.json',
+                               help="manifest file to write "
+                                    "(default: %(default)s)")
+
+    check_parser = commands.add_parser(
+        'check', help="import every module of recursive packages' trees "
+                      "in separate processes, reporting failures, "
+                      "import times and memory")
+    check_parser.add_argument('packages', nargs='+', metavar='package',
+                              help="name of a top-level recursive package")
+    check_parser.add_argument('-j', '--jobs', type=int,
+                              help="number of worker processes "
+                                   "(default: number of CPUs)")
+    check_parser.add_argument('--timeout', type=float,
+                              help="maximum time to import a module, "
+                                   "in seconds")
+    check_parser.add_argument('--format', choices=('text', 'json'),
+                              default='text',
+                              help="format of the report "
+                                   "(default: %(default)s)")
+    check_parser.add_argument('-o', '--output',
+                              help="file to write the report to "
+                                   "(default: standard output)")
+
+    plan_parser = commands.add_parser(
+        'plan', help="show which modules recursive import of a package "
+                     "would pull in, without importing them")
+    plan_parser.add_argument('package',
+                             help="name of a top-level recursive package")
+    plan_parser.add_argument('--format', choices=('text', 'json'),
+                             default='text',
+                             help="format of the plan "
+                                  "(default: %(default)s)")
+
+    args = parser.parse_args(argv)
+    if args.command == 'freeze':
+        return _freeze(args)
+    if args.command == 'check':
+        return _check(args)
+    if args.command == 'plan':
+        return _plan(args)
+
+
+def _freeze(args):
+    manifest = freeze(args.packages)
+    manifest.save(args.output)
+    sys.stderr.write("recorded %d package(s) in %s\n" % (
+        len(manifest), args.output))
+    return 0
+
+
+def _check(args):
+    report = check(args.packages, jobs=args.jobs, timeout=args.timeout)
+    if args.format == 'json':
+        output = json.dumps(report.as_dict(), indent=2, sort_keys=True)
+    else:
+        output = '\n'.join(report.format())
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output + '\n')
+        sys.stderr.write("checked %d module(s), %d failed\n" % (
+            len(report.results), len(report.failures)))
+    else:
+        sys.stdout.write(output + '\n')
+    return 1 if report.failures else 0
+
+
+def _plan(args):
+    node = plan(args.package)
+    if args.format == 'json':
+        output = json.dumps(node.as_dict(), indent=2, sort_keys=True)
+    else:
+        output = '\n'.join(node.format())
+    sys.stdout.write(output + '\n')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -7,6 +7,37 @@ import sys
 IS_PY26 = sys.version_info[0:2] == (2, 6)
 IS_PY3 = sys.version_info[0] == 3
 
+#: Whether the import system supports ``find_spec``/``exec_module``
+HAS_PEP451 = sys.version_info >= (3, 4)
+
+#: Whether directories without `__init__.py` can be (namespace) packages
+HAS_PEP420 = sys.version_info >= (3, 3)
+
+text_type = str if IS_PY3 else unicode  # noqa
+
+
+if HAS_PEP451:
+    # ``imp`` is deprecated (and removed in Python 3.12),
+    # and only needed where ``importlib`` lacks module specs
+    imp = None
+else:
+    import imp
+
+if IS_PY3:
+    from _imp import acquire_lock, release_lock
+else:
+    from imp import acquire_lock, release_lock
+
+try:
+    # per-module locks used by ``importlib`` itself
+    from importlib._bootstrap import _DeadlockError as DeadlockError
+    from importlib._bootstrap import _ModuleLockManager as ModuleLockManager
+except ImportError:
+    ModuleLockManager = None  # Python 2 only has the global import lock
+
+    class DeadlockError(RuntimeError):
+        """Never raised; only the global import lock exists here."""
+
 
 class metaclass(object):
     """Decorator for creating a class through a metaclass.
@@ -46,3 +77,79 @@ class metaclass(object):
                 original_dict.pop(slot)
 
         return self.metaclass(cls.__name__, cls.__bases__, original_dict)
+
+
+try:
+    from os import scandir
+except ImportError:
+    try:
+        from scandir import scandir
+    except ImportError:
+        scandir = None
+
+if scandir is None:
+    import os
+
+    class _DirEntry(object):
+        """Minimal stand-in for ``os.DirEntry`` on Pythons without
+        ``os.scandir``, where no type information comes with the listing.
+        """
+        def __init__(self, dirname, name):
+            self.name = name
+            self.path = os.path.join(dirname, name)
+
+        def is_dir(self):
+            return os.path.isdir(self.path)
+
+        def is_file(self):
+            return os.path.isfile(self.path)
+
+        def stat(self):
+            return os.stat(self.path)
+
+    class _ScandirIterator(list):
+        """List of directory entries that can be used as context manager,
+        like the iterator returned by ``os.scandir``.
+        """
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.close()
+
+        def close(self):
+            del self[:]
+
+    def scandir(path):
+        """Fallback implementation of ``os.scandir`` based on ``os.listdir``.
+        """
+        return _ScandirIterator(_DirEntry(path, name)
+                                for name in os.listdir(path))
+
+elif sys.version_info < (3, 6):
+    _native_scandir = scandir
+
+    class _ScandirIterator(object):
+        """Wrapper that makes iterators of ``scandir`` which predate
+        Python 3.6 usable as context managers.
+        """
+        def __init__(self, iterator):
+            self._iterator = iterator
+
+        def __iter__(self):
+            return iter(self._iterator)
+
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc_info):
+            self.close()
+
+        def close(self):
+            close = getattr(self._iterator, 'close', None)
+            if close is not None:
+                close()
+
+    def scandir(path):
+        """``scandir`` whose iterator can be used as context manager."""
+        return _ScandirIterator(_native_scandir(path))
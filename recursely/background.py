@@ -0,0 +1,136 @@
+"""
+Recursive imports running on background threads.
+"""
+import sys
+import threading
+
+
+__all__ = ['BackgroundImport', 'BackgroundImports']
+
+
+class BackgroundImport(object):
+    """Import of a package's children on a background thread,
+    for packages with ``__recursive__ = 'background'``.
+
+    :param name: Name of the package
+    :param module: Package module object, once the import has started
+    :param exception: Exception that the import has failed with, if any
+    """
+    def __init__(self, name):
+        self.name = name
+        self.module = None
+        self.exception = None
+        self.thread = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def __repr__(self):
+        state = 'done' if self.done() else \
+            'running' if self.started() else 'pending'
+        return '<%s %s (%s)>' % (self.__class__.__name__, self.name, state)
+
+    def started(self):
+        """Whether the background thread has been started."""
+        return self.module is not None
+
+    def done(self):
+        """Whether the import has finished, successfully or not."""
+        return self._done.is_set()
+
+    def wait(self, timeout=None):
+        """Wait for the import to finish.
+
+        :param timeout: Maximum time to wait, in seconds
+        :return: Whether the import has finished within ``timeout``
+        :raise: Exception that the import has failed with
+        """
+        if not self._done.wait(timeout):
+            return False
+        if self.exception is not None:
+            raise self.exception
+        return True
+
+    def add_done_callback(self, callback):
+        """Register a function to be called with this object
+        once the import has finished. If it has finished already,
+        the function is called immediately.
+        """
+        with self._lock:
+            if not self.done():
+                self._callbacks.append(callback)
+                return
+        callback(self)
+
+    def start(self, module, target):
+        """Run ``target`` (that imports children of ``module``)
+        on a new daemon thread, unless it has been started already.
+        """
+        with self._lock:
+            if self.started():
+                return
+            self.module = module
+        self.thread = threading.Thread(
+            target=self._run, args=(target,),
+            name='recursely-background-%s' % self.name)
+        self.thread.daemon = True
+        self.thread.start()
+
+    def _run(self, target):
+        try:
+            target()
+        except Exception:
+            self.exception = sys.exc_info()[1]
+        with self._lock:
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            try:
+                callback(self)
+            except Exception:
+                pass  # nowhere to report it to
+
+
+class BackgroundImports(object):
+    """Registry of :class:`BackgroundImport`\\ s, by package name."""
+
+    def __init__(self):
+        self._imports = {}
+        self._lock = threading.Lock()
+
+    def __iter__(self):
+        with self._lock:
+            return iter(list(self._imports.values()))
+
+    def get(self, name, create=False):
+        """Return the background import of given package.
+
+        :param create: Whether to register a (not yet started) import
+                       if there is none
+        :return: :class:`BackgroundImport` or ``None``
+        """
+        with self._lock:
+            background_import = self._imports.get(name)
+            if background_import is None and create:
+                background_import = self._imports[name] = \
+                    BackgroundImport(name)
+            return background_import
+
+    def start(self, module, target):
+        """Start importing children of ``module`` in the background,
+        unless that has been done already.
+
+        :param target: Function that performs the import
+        :return: :class:`BackgroundImport`
+        """
+        name = module.__name__
+        with self._lock:
+            background_import = self._imports.get(name)
+            if background_import is None or (
+                    background_import.started() and
+                    background_import.module is not module):
+                # (the latter means the package has been imported anew)
+                background_import = self._imports[name] = \
+                    BackgroundImport(name)
+        background_import.start(module, target)
+        return background_import
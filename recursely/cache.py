@@ -0,0 +1,221 @@
+"""
+Persistent cache of package directory listings.
+"""
+import os
+import threading
+import time
+
+from recursely.listing import PackageListing
+
+
+__all__ = ['ManifestCache']
+
+
+class ManifestCache(object):
+    """On-disk cache ("manifest") of package children,
+    keyed by package directory path and its modification time.
+
+    Adding or removing a file in a directory updates that directory's
+    mtime, which is enough to invalidate a cached listing of its submodules.
+    Because turning a subdirectory into a package (or back) only touches
+    the subdirectory itself, each entry also records the mtimes
+    of immediate subdirectories that can be subpackages (but not
+    of `__pycache__`, which changes whenever a module is compiled).
+
+    Validating an entry returns fresh ``stat`` results for subdirectories,
+    which callers can reuse when looking up the subdirectories themselves,
+    so that a warm start costs a single ``stat`` per directory.
+
+    The cache also holds the results of scanning module files, for content
+    markers (see :class:`MarkerScanner`) or exported names (see
+    :class:`ExportIndex`), keyed by file path and validated by file's
+    modification time and size.
+    """
+    #: Version of the on-disk format; files with different one are ignored
+    VERSION = 3
+
+    #: Directories modified more recently than this many seconds ago
+    #: are not persisted, because coarse filesystem timestamps could
+    #: make a subsequent change within the same tick go unnoticed
+    RACY_INTERVAL = 2
+
+    def __init__(self, filename):
+        """Constructor.
+
+        :param filename: Path to the file where the manifest is stored.
+                         It doesn't have to exist yet.
+        """
+        self.filename = filename
+        self._entries = None  # loaded lazily
+        self._scans = None  # loaded along with the entries
+        self._dirty = False
+        self._lock = threading.RLock()
+
+    def lookup(self, package_dir, dir_stat, namespaces=False):
+        """Retrieve cached listing of given package directory.
+
+        :param package_dir: Package directory
+        :param dir_stat: Current ``stat`` result for the directory
+        :param namespaces: Whether the listing should include
+                           namespace subpackages
+        :return: :class:`PackageListing` with fresh ``stat`` results
+                 of subdirectories, or ``None`` if there is no entry
+                 for the directory or it's not up to date
+        """
+        entry = self._load().get(package_dir)
+        if entry is None or _mtime(dir_stat) != entry['mtime'] or \
+                entry['namespaces'] != namespaces:
+            return None
+
+        subdirs = {}
+        try:
+            for name, mtime in entry['subdirs'].items():
+                st = os.stat(os.path.join(package_dir, name))
+                if _mtime(st) != mtime:
+                    return None
+                subdirs[name] = st
+        except OSError:
+            return None
+
+        return PackageListing(children=list(entry['children']),
+                              subdirs=subdirs)
+
+    def store(self, package_dir, dir_stat, listing, namespaces=False):
+        """Put the listing of given package directory into the cache.
+
+        :param package_dir: Package directory
+        :param dir_stat: ``stat`` result for the directory,
+                         obtained before it was listed
+        :param listing: :class:`PackageListing`
+        :param namespaces: Whether the listing includes
+                           namespace subpackages
+        """
+        subdirs = listing.package_subdirs
+        newest = max([dir_stat.st_mtime] +
+                     [st.st_mtime for st in subdirs.values()])
+        if time.time() - newest < self.RACY_INTERVAL:
+            return
+
+        entry = {
+            'mtime': _mtime(dir_stat),
+            'subdirs': dict((name, _mtime(st))
+                            for name, st in subdirs.items()),
+            'children': list(listing.children),
+            'namespaces': namespaces,
+        }
+        with self._lock:
+            self._load()[package_dir] = entry
+            self._dirty = True
+
+    def lookup_scan(self, path, file_stat, key):
+        """Retrieve the cached result of scanning a file.
+
+        :param path: Path to the scanned file
+        :param file_stat: Current ``stat`` result for the file
+        :param key: Key identifying the kind of scan (e.g. the marker)
+        :return: Result of the scan, or ``None`` if it's not known
+        """
+        self._load()
+        entry = self._scans.get(path)
+        if entry is None or entry['mtime'] != _mtime(file_stat) or \
+                entry['size'] != file_stat.st_size:
+            return None
+        return entry['results'].get(key)
+
+    def store_scan(self, path, file_stat, key, result):
+        """Put the result of scanning a file into the cache.
+
+        :param path: Path to the scanned file
+        :param file_stat: ``stat`` result for the file,
+                          obtained before it was scanned
+        :param key: Key identifying the kind of scan (e.g. the marker)
+        :param result: Result of the scan, serializable as JSON
+        """
+        if time.time() - file_stat.st_mtime < self.RACY_INTERVAL:
+            return
+
+        mtime, size = _mtime(file_stat), file_stat.st_size
+        with self._lock:
+            self._load()
+            entry = self._scans.get(path)
+            if entry is None or entry['mtime'] != mtime or \
+                    entry['size'] != size:
+                entry = self._scans[path] = {'mtime': mtime, 'size': size,
+                                             'results': {}}
+            entry['results'][key] = result
+            self._dirty = True
+
+    def save(self):
+        """Write the manifest back to disk, if it has been modified.
+
+        Failures are silently ignored, as the cache is merely an optimization.
+        """
+        with self._lock:
+            if not self._dirty:
+                return
+
+            import json
+            tmp_filename = '%s.%s.tmp' % (self.filename, os.getpid())
+            try:
+                with open(tmp_filename, 'w') as f:
+                    json.dump({'version': self.VERSION,
+                               'entries': self._entries,
+                               'scans': self._scans}, f)
+                _replace(tmp_filename, self.filename)
+            except (IOError, OSError):
+                try:
+                    os.remove(tmp_filename)
+                except OSError:
+                    pass
+            else:
+                self._dirty = False
+
+    def _load(self):
+        """Load the manifest from disk, unless it has been loaded already.
+        :return: Dictionary of cache entries
+        """
+        if self._entries is None:
+            with self._lock:
+                if self._entries is None:
+                    self._scans, self._entries = self._read()
+        return self._entries
+
+    def _read(self):
+        """Read the cache entries from disk.
+        :return: Tuple of dictionaries of marker scans and cache entries
+        """
+        import json
+        try:
+            with open(self.filename) as f:
+                data = json.load(f)
+            if data.get('version') == self.VERSION:
+                return data.get('scans') or {}, data['entries']
+        except (IOError, OSError, ValueError, KeyError, AttributeError):
+            pass  # missing or corrupted file, start afresh
+        return {}, {}
+
+
+# Utility functions
+
+def _mtime(st):
+    """Return the most precise modification time available
+    in given ``stat`` result.
+    """
+    return getattr(st, 'st_mtime_ns', None) or st.st_mtime
+
+
+def _has_coarse_mtime(st):
+    """Tell whether the modification time in given ``stat`` result
+    looks like it comes from a filesystem with whole-second timestamps.
+    """
+    return st.st_mtime == int(st.st_mtime)
+
+
+def _replace(src, dst):
+    """Atomically replace ``dst`` file with ``src``, where supported."""
+    if hasattr(os, 'replace'):
+        os.replace(src, dst)
+    else:
+        if os.name == 'nt' and os.path.exists(dst):
+            os.remove(dst)
+        os.rename(src, dst)
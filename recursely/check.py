@@ -0,0 +1,186 @@
+"""
+Validating that every module in recursive package trees imports cleanly,
+with each module imported in a separate process.
+"""
+import multiprocessing
+import sys
+import time
+import traceback
+
+from recursely.directive import Directive
+from recursely.importer import RecursiveImporter
+from recursely.plan import _plan
+from recursely.utils import rss
+
+
+__all__ = ['CheckReport', 'check', 'discover']
+
+
+#: Most precise clock available for timing imports
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class CheckReport(object):
+    """Results of :func:`check`.
+
+    :param results: List of dictionaries, one for every module
+                    (in the order of their recursive import), with keys:
+                    ``'module'`` (name), ``'ok'``, ``'error'``
+                    (formatted exception, or ``None``), ``'time'``
+                    (of importing the module, in seconds, excluding
+                    its parent packages) and ``'memory'`` (growth
+                    of process' resident memory, in bytes, or ``None``
+                    if it cannot be measured on this platform)
+    """
+    def __init__(self, results):
+        self.results = results
+
+    def __repr__(self):
+        return '<%s: %d module(s), %d failed>' % (
+            self.__class__.__name__, len(self.results), len(self.failures))
+
+    @property
+    def failures(self):
+        """Results of modules that have failed to import."""
+        return [result for result in self.results if not result['ok']]
+
+    def as_dict(self):
+        """Return the report as a dictionary, suitable for saving as JSON."""
+        return {'modules': len(self.results),
+                'failures': len(self.failures),
+                'time': sum(result['time'] or 0 for result in self.results),
+                'results': self.results}
+
+    def format(self, n=None):
+        """Format the report as text: a table of modules,
+        the slowest ones first, followed by errors of failed ones.
+
+        :param n: Maximum number of modules in the table
+        :return: List of lines
+        """
+        lines = ['%-50s %10s %10s  %s' % ('module', 'time', 'memory',
+                                          'status')]
+        results = sorted(self.results, key=lambda r: -(r['time'] or 0))
+        for result in results[:n]:
+            lines.append('%-50s %8.1fms %10s  %s' % (
+                result['module'], (result['time'] or 0) * 1000,
+                '-' if result['memory'] is None
+                else '%.1fKiB' % (result['memory'] / 1024.0),
+                'ok' if result['ok'] else 'FAILED'))
+
+        lines.append('')
+        lines.append('%d module(s), %d failed, %.1fms in total' % (
+            len(self.results), len(self.failures),
+            self.as_dict()['time'] * 1000))
+        for result in self.failures:
+            lines.append('')
+            lines.append('%s:' % result['module'])
+            lines.extend('    ' + line
+                         for line in result['error'].rstrip().splitlines())
+        return lines
+
+
+def check(packages, jobs=None, timeout=None):
+    """Import every module in trees of given recursive packages,
+    each in a separate worker process, and report the results.
+
+    The trees are found with :func:`discover`, and modules are imported
+    on a pool of processes, with a new process for every module,
+    so that failures and state of one module don't affect the others.
+
+    :param packages: Names of top-level recursive packages
+    :param jobs: Number of worker processes (by default, number of CPUs)
+    :param timeout: Maximum time to wait for a module's import, in seconds
+    :return: :class:`CheckReport`
+    """
+    names = discover(packages)
+
+    pool = multiprocessing.Pool(jobs, maxtasksperchild=1)
+    try:
+        pending = [(name, pool.apply_async(_check_module, (name,)))
+                   for name in names]
+        results = []
+        for name, async_result in pending:
+            try:
+                results.append(async_result.get(timeout))
+            except multiprocessing.TimeoutError:
+                results.append(_result(name, error="import has not finished "
+                                                   "in %ss\n" % timeout))
+            except Exception:  # worker has died
+                results.append(_result(name, error=_format_exception()))
+    finally:
+        pool.terminate()
+        pool.join()
+
+    return CheckReport(results)
+
+
+def discover(packages):
+    """Find all modules in trees of given recursive packages,
+    without importing any of them (see :func:`plan`).
+
+    Packages without a ``__recursive__`` directive are assumed
+    to have ``__recursive__ = True``.
+
+    :param packages: Names of top-level recursive packages
+    :return: List of module names, in the order of recursive import
+    """
+    names = []
+    for package in packages:
+        node = _plan(package, default=Directive(root=package))
+        names.extend(module.name for module in node.walk())
+    return names
+
+
+def _check_module(name):
+    """Import a single module, in a worker process.
+    :return: Result dictionary, as described in :class:`CheckReport`
+    """
+    from importlib import import_module
+
+    # make sure that packages calling ``recursely.install()`` themselves
+    # (or a hook inherited from a forking parent process) don't import
+    # whole trees when they're imported as parents of the checked module
+    if not _NonRecursiveImporter.is_installed():
+        sys.meta_path = [ih for ih in sys.meta_path
+                         if not isinstance(ih, RecursiveImporter)]
+        sys.meta_path.append(_NonRecursiveImporter(packages=()))
+
+    parent = name.rpartition('.')[0]
+    if parent:
+        try:
+            import_module(parent)
+        except BaseException:
+            return _result(name, error="parent package failed to import\n")
+
+    rss_before = rss()
+    start = clock()
+    try:
+        import_module(name)
+    except BaseException:
+        return _result(name, elapsed=clock() - start,
+                       error=_format_exception())
+    elapsed = clock() - start
+    rss_after = rss()
+
+    return _result(name, elapsed=elapsed,
+                   memory=None if rss_before is None or rss_after is None
+                   else rss_after - rss_before)
+
+
+def _result(name, elapsed=None, memory=None, error=None):
+    return {'module': name, 'ok': error is None, 'error': error,
+            'time': elapsed, 'memory': memory}
+
+
+def _format_exception():
+    return ''.join(traceback.format_exception_only(*sys.exc_info()[:2]))
+
+
+class _NonRecursiveImporter(RecursiveImporter):
+    """Importer installed in worker processes, which doesn't intercept
+    any imports, so that ``install()`` called by checked packages
+    is a no-op and their children aren't imported recursively.
+    """
+    def recurse(self, module):
+        return module
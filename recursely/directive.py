@@ -0,0 +1,206 @@
+"""
+Parsing of the ``__recursive__`` directive.
+"""
+from fnmatch import fnmatchcase
+
+from recursely.markers import Marker
+
+
+__all__ = ['Directive']
+
+
+class Directive(object):
+    """Parsed ``__recursive__`` directive of a package.
+
+    Besides ``True``, ``'*'``, ``'lazy'``, ``'lazy*'`` or ``'background'``,
+    the directive can be a dictionary (or an instance of this class)
+    that also limits which children are imported::
+
+        __recursive__ = {'mode': True,
+                         'exclude': ['tests', 'migrations', 'conftest'],
+                         'max_depth': 2}
+
+    Patterns are globs matched against the name of every (direct
+    or indirect) child relative to the package, its fully qualified name,
+    and its last segment. Children that are excluded, or not included
+    when ``include`` is given, are skipped before any filesystem access
+    or import is done for them. Descendants of included children
+    are included as well.
+
+    With ``'parallel': N``, children are imported (each along with its
+    whole subtree) on a pool of ``N`` threads, which can take advantage
+    of free-threaded Python builds, or of module bodies that do I/O.
+
+    With ``'marker'``, only the child modules whose source contains
+    the marker (like ``b'@app.route'``, or a regular expression
+    such as ``{'regex': '^class .*Model'}``) are imported,
+    which is checked without executing them
+    (see :class:`Marker`). Subpackages are always imported,
+    with the marker applying to their own children.
+
+    With ``'namespaces': True``, subdirectories without `__init__.py`
+    that contain some `.py` files are imported as :pep:`420` namespace
+    subpackages. Otherwise, only regular subpackages are imported,
+    so that directories like `scripts` or `examples` are left alone.
+    """
+    MODES = (True, '*', 'lazy', 'lazy*', 'background')
+
+    def __init__(self, mode=True, include=None, exclude=None, max_depth=None,
+                 parallel=None, marker=None, namespaces=False, root=None):
+        """Constructor.
+
+        :param mode: ``True`` for regular recursive import,
+                     ``'*'`` for "star" import,
+                     ``'lazy'`` for importing children on first access,
+                     ``'lazy*'`` for "star" import where every child
+                     is imported on first access to any of its names,
+                     or ``'background'`` for importing them
+                     on a background thread
+        :param include: Optional list of patterns for children to import
+        :param exclude: Optional list of patterns for children to skip
+        :param max_depth: Optional limit of how deep the recursion goes,
+                          with ``1`` meaning only the immediate children
+        :param parallel: Optional number of threads to import children on
+        :param marker: Optional pattern that sources of child modules
+                       have to contain for them to be imported
+                       (see :meth:`Marker.parse`)
+        :param namespaces: Whether subdirectories without `__init__.py`
+                           should be imported as namespace subpackages
+        :param root: Name of the package that declared the directive
+        """
+        if mode not in self.MODES:
+            raise ValueError("invalid __recursive__ mode: %r" % (mode,))
+        if max_depth is not None and max_depth < 0:
+            raise ValueError("max_depth must be non-negative")
+        if parallel is not None and (isinstance(parallel, bool) or
+                                     not isinstance(parallel, int) or
+                                     parallel < 1):
+            raise ValueError("parallel must be a positive number of threads")
+        self.mode = mode
+        self.include = list(include) if include is not None else None
+        self.exclude = list(exclude or ())
+        self.max_depth = max_depth
+        self.parallel = parallel
+        self.marker = Marker.parse(marker) if marker is not None else None
+        self.namespaces = bool(namespaces)
+        self.root = root
+
+    def __repr__(self):
+        return '<%s %r in %s>' % (self.__class__.__name__,
+                                  self.mode, self.root)
+
+    @classmethod
+    def parse(cls, value, root, defaults=None):
+        """Parse the value of ``__recursive__`` attribute.
+
+        :param value: Value of the attribute
+        :param root: Name of the package the attribute is defined in
+        :param defaults: Optional :class:`Directive` with filters
+                         that apply to all packages
+        :return: :class:`Directive`, or ``None`` if ``value`` is falsy
+        :raise ValueError: If the value is not a valid directive
+        """
+        if not value:
+            return None
+
+        if isinstance(value, cls):
+            spec = {'mode': value.mode, 'include': value.include,
+                    'exclude': value.exclude, 'max_depth': value.max_depth,
+                    'parallel': value.parallel, 'marker': value.marker,
+                    'namespaces': value.namespaces}
+        elif isinstance(value, dict):
+            spec = dict(value)
+            unknown = set(spec) - set(['mode', 'include', 'exclude',
+                                       'max_depth', 'parallel', 'marker',
+                                       'namespaces'])
+            if unknown:
+                raise ValueError("invalid __recursive__ keys in %s: %s" % (
+                    root, ', '.join(sorted(unknown))))
+        else:
+            spec = {'mode': True if value not in cls.MODES else value}
+
+        if defaults is not None:
+            spec['exclude'] = list(spec.get('exclude') or ()) + \
+                defaults.exclude
+            if defaults.include is not None:
+                spec['include'] = defaults.include + \
+                    list(spec.get('include') or ())
+            if defaults.max_depth is not None:
+                max_depth = spec.get('max_depth')
+                spec['max_depth'] = defaults.max_depth if max_depth is None \
+                    else min(max_depth, defaults.max_depth)
+            if spec.get('namespaces') is None:
+                spec['namespaces'] = defaults.namespaces
+
+        return cls(root=root, **spec)
+
+    @property
+    def as_star(self):
+        """Whether symbols from children are brought into package's namespace.
+        """
+        return self.mode in ('*', 'lazy*')
+
+    @property
+    def lazy(self):
+        """Whether children are imported on first access."""
+        return self.mode in ('lazy', 'lazy*')
+
+    @property
+    def background(self):
+        """Whether children are imported on a background thread."""
+        return self.mode == 'background'
+
+    @property
+    def is_filtered(self):
+        """Whether the directive may skip any children at all."""
+        return bool(self.include is not None or self.exclude or
+                    self.max_depth is not None)
+
+    def depth(self, fullname):
+        """Return how deep given module is in the tree of root package."""
+        if fullname == self.root:
+            return 0
+        return fullname[len(self.root) + 1:].count('.') + 1
+
+    def descends(self, fullname):
+        """Check whether the children of given package
+        are within the depth limit.
+        """
+        return self.max_depth is None or self.depth(fullname) < self.max_depth
+
+    def accepts(self, fullname):
+        """Check whether module of given fully qualified name,
+        contained within the tree of root package, should be imported.
+        """
+        if not self.is_filtered:
+            return True
+        if self.max_depth is not None and \
+                self.depth(fullname) > self.max_depth:
+            return False
+
+        relname = fullname[len(self.root) + 1:]
+        if self.exclude and self._matches(self.exclude, fullname, relname):
+            return False
+        if self.include is None:
+            return True
+
+        # a module is included if it or any of its ancestors matches,
+        # or if it's an ancestor of something that may match
+        segments = relname.split('.')
+        for i in range(1, len(segments) + 1):
+            prefix = '.'.join(segments[:i])
+            if self._matches(self.include, '%s.%s' % (self.root, prefix),
+                             prefix):
+                return True
+        for pattern in self.include:
+            pattern_segments = pattern.split('.')
+            if len(pattern_segments) > len(segments) and fnmatchcase(
+                    relname, '.'.join(pattern_segments[:len(segments)])):
+                return True
+        return False
+
+    def _matches(self, patterns, fullname, relname):
+        lastname = relname.rpartition('.')[2]
+        return any(fnmatchcase(name, pattern)
+                   for pattern in patterns
+                   for name in (relname, fullname, lastname))
@@ -0,0 +1,193 @@
+"""
+Static index of names exported by child modules of "star" packages.
+"""
+import ast
+import os
+import threading
+
+from recursely._compat import text_type
+from recursely.cache import _mtime
+
+
+__all__ = ['ExportIndex', 'find_exports']
+
+
+class ExportIndex(object):
+    """Tells which names a "star" import would bring from given module,
+    by parsing its source rather than executing it (see :func:`find_exports`).
+
+    Results are remembered by file's modification time and size,
+    and persisted in :class:`ManifestCache` if one is given,
+    so that unchanged files aren't parsed again on subsequent runs.
+    """
+    #: Key of the results in :class:`ManifestCache`
+    CACHE_KEY = 'exports'
+
+    def __init__(self, cache=None):
+        """Constructor.
+
+        :param cache: Optional :class:`ManifestCache` to persist results in
+        """
+        self.cache = cache
+        self._results = {}  # path -> (mtime, size, names)
+        self._lock = threading.Lock()
+
+        #: Number of files that had to be parsed
+        self.parsed = 0
+
+    def exports(self, path, file_stat=None):
+        """Find the names exported by given source file.
+
+        :param path: Path to module's `.py` file (or package's `__init__.py`)
+        :param file_stat: Optional ``stat`` result for the file
+        :return: List of names, or ``None`` if they cannot be determined
+                 without executing the module
+        :raise OSError: If the file cannot be accessed
+        """
+        if file_stat is None:
+            file_stat = os.stat(path)
+        mtime, size = _mtime(file_stat), file_stat.st_size
+
+        result = self._results.get(path)
+        if result is not None and result[:2] == (mtime, size):
+            return result[2]
+        # (in the cache, ``False`` marks modules whose exports are unknown,
+        # as opposed to ``None`` for no result at all)
+        cached = None
+        if self.cache is not None:
+            cached = self.cache.lookup_scan(path, file_stat, self.CACHE_KEY)
+        if cached is None:
+            with self._lock:
+                self.parsed += 1
+            with open(path, 'rb') as f:
+                names = find_exports(f.read(), path)
+            if self.cache is not None:
+                self.cache.store_scan(path, file_stat, self.CACHE_KEY,
+                                      False if names is None else names)
+        else:
+            names = None if cached is False else list(cached)
+
+        with self._lock:
+            self._results[path] = (mtime, size, names)
+        return names
+
+
+def find_exports(source, filename='<unknown>'):
+    """Find the names that ``from module import *`` would bring
+    from a module of given source, without executing it.
+
+    Those are the names listed in module's ``__all__``, if it's
+    a literal list or tuple of strings. Otherwise, they are all the public
+    names that the module binds at its top level (including inside
+    ``if`` and ``try`` blocks): functions, classes, assigned variables
+    and imported names.
+
+    :param source: Source code of the module
+    :param filename: Name of the module's file, for error messages
+    :return: List of names, or ``None`` if the module does something
+             that makes them impossible to tell statically: assigns
+             ``__all__`` dynamically, does a star import itself,
+             or fails to parse
+    """
+    try:
+        tree = ast.parse(source, filename)
+    except (SyntaxError, ValueError):
+        return None
+
+    names = []
+    all_assignments = []
+    for node in _top_level_statements(tree.body):
+        if isinstance(node, ast.ImportFrom) and \
+                any(alias.name == '*' for alias in node.names):
+            return None
+        if _modifies_all(node):
+            return None
+
+        bound = _bound_names(node)
+        if '__all__' in bound:
+            all_assignments.append(node)
+        names.extend(name for name in bound
+                     if not name.startswith('_') and name not in names)
+
+    if all_assignments:
+        if len(all_assignments) > 1:
+            return None
+        return _literal_names(all_assignments[0])
+    return names
+
+
+def _top_level_statements(body):
+    """Yield statements executed at module's top level,
+    including those nested in compound statements other than definitions.
+    """
+    for node in body:
+        yield node
+        if isinstance(node, (ast.FunctionDef, ast.ClassDef)) or \
+                type(node).__name__ == 'AsyncFunctionDef':
+            continue
+        for field in ('body', 'orelse', 'finalbody'):
+            for child in _top_level_statements(getattr(node, field, ())):
+                yield child
+        for handler in getattr(node, 'handlers', ()):
+            for child in _top_level_statements(handler.body):
+                yield child
+
+
+def _bound_names(node):
+    """Return the names bound by a single statement
+    (not counting the statements nested inside it).
+    """
+    if isinstance(node, (ast.FunctionDef, ast.ClassDef)) or \
+            type(node).__name__ == 'AsyncFunctionDef':
+        return [node.name]
+    if isinstance(node, (ast.Import, ast.ImportFrom)):
+        return [alias.asname or alias.name.partition('.')[0]
+                for alias in node.names]
+
+    targets = []
+    if isinstance(node, ast.Assign):
+        targets = list(node.targets)
+    elif isinstance(node, (ast.AugAssign, ast.For)) or \
+            type(node).__name__ in ('AnnAssign', 'AsyncFor'):
+        targets = [node.target]
+    elif type(node).__name__ in ('With', 'AsyncWith'):
+        targets = [item.optional_vars for item in getattr(node, 'items', ())
+                   if item.optional_vars is not None]
+
+    names = []
+    while targets:
+        target = targets.pop(0)
+        if isinstance(target, ast.Name):
+            names.append(target.id)
+        elif isinstance(target, (ast.Tuple, ast.List)):
+            targets.extend(target.elts)
+    return names
+
+
+def _modifies_all(node):
+    """Check whether given statement calls a method of ``__all__``,
+    like ``__all__.append(name)``.
+    """
+    if not isinstance(node, ast.Expr) or \
+            not isinstance(node.value, ast.Call):
+        return False
+    func = node.value.func
+    return isinstance(func, ast.Attribute) and \
+        isinstance(func.value, ast.Name) and func.value.id == '__all__'
+
+
+def _literal_names(node):
+    """Return the names assigned to ``__all__`` in given statement,
+    if it's a plain assignment of a literal list or tuple of strings.
+    """
+    if not isinstance(node, ast.Assign) or len(node.targets) != 1 or \
+            not isinstance(node.targets[0], ast.Name):
+        return None
+    try:
+        value = ast.literal_eval(node.value)
+    except ValueError:
+        return None
+    if not isinstance(value, (list, tuple)) or \
+            not all(isinstance(name, (str, text_type)) for name in value):
+        return None
+    return list(value)
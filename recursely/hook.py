@@ -1,12 +1,20 @@
 """
 Base class for import hooks.
 """
+from collections import namedtuple
 from contextlib import contextmanager
-import imp
 import inspect
+import marshal
+import os
+import struct
 import sys
 
-from recursely._compat import IS_PY3
+from recursely._compat import (HAS_PEP451, IS_PY3, ModuleLockManager,
+                               acquire_lock, imp, release_lock)
+
+if HAS_PEP451:
+    from importlib import import_module
+    from importlib.machinery import ModuleSpec, PathFinder
 
 
 __all__ = ['ImportHook']
@@ -22,22 +30,60 @@ class ImportHook(object):
 
     Alternativaly, it's possible to completely either the process
     of finding a module to import, or loading the module, or both.
+
+    On Python 3.4+, the hook is a :pep:`451` finder and loader
+    which delegates to the standard ``PathFinder`` (and therefore reuses
+    parent packages' ``__path__`` and cached path entry finders).
+    On older Pythons, it's a :pep:`302` one based on the ``imp`` module.
     """
     @classmethod
     def is_installed(cls):
         """Checks whether any instance of this import hook is installed."""
-        return any(isinstance(ih, cls) for ih in sys.meta_path)
+        return cls.get_installed() is not None
+
+    @classmethod
+    def get_installed(cls):
+        """Returns the installed instance of this import hook, if any.
+
+        If ``sys.meta_path`` keeps its hooks as sentinels
+        (see :class:`FastSentinelList`), only those are checked.
+
+        :return: Import hook object or ``None``
+        """
+        meta_path = sys.meta_path
+        for ih in getattr(meta_path, 'sentinels', meta_path):
+            if isinstance(ih, cls):
+                return ih
 
     @contextmanager
     def import_lock(self):
         """Context manager for establishing a lock on the import facility.
-        Uses ``imp.acquire_lock`` and ``imp.release_lock``.
+        Uses ``acquire_lock`` and ``release_lock`` from ``imp``
+        (or ``_imp`` on Python 3).
         """
-        imp.acquire_lock()
+        acquire_lock()
         try:
             yield
         finally:
-            imp.release_lock()
+            release_lock()
+
+    @contextmanager
+    def module_lock(self, fullname):
+        """Context manager for establishing a lock on importing
+        a single module of given name.
+
+        On Python 3, this is the same per-module lock that ``importlib``
+        takes, so imports of other modules (in other threads) may proceed
+        in the meantime, and circular waits are detected rather than
+        deadlocking. Where no such locks exist, the global import lock
+        (see :meth:`import_lock`) is used instead.
+        """
+        if ModuleLockManager is None:
+            with self.import_lock():
+                yield
+        else:
+            with ModuleLockManager(fullname):
+                yield
 
     # Overrideable import events
 
@@ -79,34 +125,112 @@ class ImportHook(object):
                  if standard import procedure should be used
         """
 
-    # Main importing logic
+    # Main importing logic (PEP 451)
 
-    def find_module(self, fullname, path=None):
+    def find_spec(self, fullname, path=None, target=None):
         """Module finding method.
 
+        By default, we locate the module using the standard ``PathFinder``,
+        which searches the parent package's ``__path__`` for submodules
+        (or ``sys.path`` for top-level modules), using path entry finders
+        cached in ``sys.path_importer_cache``.
+        This can be overridden in subclasses by implementing ``on_find_module``
+        that returns truthy value.
+
+        :return: ``ModuleSpec`` whose loader is this import hook,
+                 or ``None`` if the module cannot be found
+        """
+        existing = self._get_module(fullname)
+        if existing is not None:  # i.e. we're reloading
+            if not self.on_module_already_imported(fullname, existing):
+                return None
+
+        try:
+            if self.on_find_module(fullname, path):
+                spec = ModuleSpec(fullname, None)
+            else:
+                spec = PathFinder.find_spec(fullname, path, target)
+                if spec is None or not hasattr(spec.loader, 'exec_module'):
+                    return None
+            self.on_module_found(fullname, path)
+        except ImportError:
+            return None  # couldn't find the module, let Python try
+                         # the next importer from ``sys.meta_path``
+
+        spec.loader_state = _HookState(loader=spec.loader,
+                                       loader_state=spec.loader_state,
+                                       path=path)
+        spec.loader = self
+        return spec
+
+    def create_module(self, spec):
+        """Create the module object for given spec.
+
+        This is where ``on_load_module`` can take over the loading.
+        If it doesn't, the module is loaded using the standard procedure,
+        even if ``on_find_module`` has overridden its finding.
+        """
+        state = spec.loader_state
+        module = self.on_load_module(spec.name, state.path)
+        if module is not None:
+            spec.loader_state = state._replace(loader=None)
+            return module
+
+        if state.loader is None:
+            regular_spec = PathFinder.find_spec(spec.name, state.path)
+            if regular_spec is None or \
+                    not hasattr(regular_spec.loader, 'exec_module'):
+                raise ImportError("no module named %s" % spec.name,
+                                  name=spec.name)
+            spec.origin = regular_spec.origin
+            spec.submodule_search_locations = \
+                regular_spec.submodule_search_locations
+            spec.has_location = regular_spec.has_location
+            spec.cached = regular_spec.cached
+            state = spec.loader_state = state._replace(
+                loader=regular_spec.loader,
+                loader_state=regular_spec.loader_state)
+        return state.loader.create_module(spec)
+
+    def exec_module(self, module):
+        """Execute the module using the loader of the standard ``PathFinder``
+        and trigger the ``on_module_imported`` event afterwards.
+        """
+        spec = module.__spec__
+        fullname = spec.name
+        state = spec.loader_state
+
+        if state.loader is not None:
+            # make the module indistinguishable from a regularly imported one
+            # even while it's being executed
+            spec.loader = module.__loader__ = state.loader
+            spec.loader_state = state.loader_state
+            state.loader.exec_module(module)
+
+        # do post-processing defined in subclasses, if any
+        module = sys.modules.get(fullname, module)
+        processed_module = self.on_module_imported(fullname, module)
+        if processed_module is not None:
+            sys.modules[fullname] = processed_module
+
+    # Legacy importing logic (PEP 302)
+
+    def find_module(self, fullname, path=None):
+        """Module finding method for Pythons without :pep:`451`.
+
         By default, we locate the module using a standard method
         that involves ``find_module`` function from ``imp`` package.
+        For submodules, ``path`` is the parent package's ``__path__``.
         This can be overridden in subclasses by implementing ``on_find_module``
         that returns truthy value.
         """
         try:
             finding_overridden = bool(self.on_find_module(fullname, path))
             if not finding_overridden:
-                # although documentation on ``imp`` module says otherwise,
-                # without adding ``sys.path`` the hook doesn't really work
-                # because it doesn't capture the submodules of the module
-                # where it was itself imported to
-                find_path = (path or []) + sys.path
-
-                name = fullname
-                while '.' in name:
-                    head, tail = name.split('.', 1)
-                    _, filepath, _ = imp.find_module(head, find_path)
-
-                    find_path = [filepath]
-                    name = tail
-
-                imp.find_module(name, path)
+                name = fullname.rsplit('.', 1)[-1]
+                file_obj, _, _ = imp.find_module(name, path or sys.path)
+                if file_obj:
+                    file_obj.close()
                 self.on_module_found(fullname, path)
         except ImportError:
             return None  # couldn't find the module, let Python try
@@ -116,14 +240,18 @@ class ImportHook(object):
         return self
 
     def load_module(self, fullname):
-        """Module loading method.
+        """Module loading method for Pythons without :pep:`451`.
 
         By default, we use standard importing method that involves
         the ``load_module`` function from ``imp`` package.
         This can be overriden in subclasses by implementing ``on_load_module``
         that returns a module object.
+
+        Only the module itself is locked while it's loaded,
+        so that a long ``on_module_imported`` handler (like importing
+        a whole package tree) doesn't stall imports in other threads.
         """
-        with self.import_lock():
+        with self.module_lock(fullname):
             module = self.on_load_module(fullname, self._path)
             return module or self._import(fullname)
 
@@ -133,6 +261,9 @@ class ImportHook(object):
         :return: Module object
         :raise ImportError: When finding or loading the module fails
         """
+        if HAS_PEP451:
+            return import_module(fullname)
+
         existing = self._get_module(fullname)
         if existing is not None:
             reimport = bool(self.on_module_already_imported(fullname, existing))
@@ -172,19 +303,192 @@ class ImportHook(object):
             return None
 
     # Optional PEP302 methods
+    #
+    # These answer questions about modules without importing them,
+    # i.e. without executing any of their code.
 
     def is_package(self, fullname):
-        module = self._get_module(fullname) or self._import(fullname)
-        return hasattr(module, '__path__')
+        """Check whether module of given name is a package.
+        :raise ImportError: If the module cannot be found
+        """
+        if HAS_PEP451:
+            spec = self._find_inspected_spec(fullname)
+            return spec.submodule_search_locations is not None
+
+        _, _, desc = self._find_inspected_module(fullname)
+        return desc[2] == imp.PKG_DIRECTORY
 
     def get_code(self, fullname):
-        return compile(self.get_source(fullname))
+        """Return the code object of given module.
+
+        Cached bytecode is used if it's up to date with the source;
+        otherwise the source is compiled (and, on Python 3,
+        the bytecode is cached just like during regular import).
+
+        :return: Code object, or ``None`` if the module has no code
+                 (like namespace packages or extension modules)
+        :raise ImportError: If the module cannot be found
+        """
+        if HAS_PEP451:
+            loader = self._get_original_loader(fullname)
+            if hasattr(loader, 'get_code'):
+                return loader.get_code(fullname)
+        else:
+            filename, pathname, desc = self._find_inspected_module(fullname)
+            if desc[2] == imp.PY_COMPILED:
+                return _read_bytecode(pathname)
+            if filename is not None:
+                code = _read_bytecode(filename + 'c',
+                                      source_mtime=os.stat(filename).st_mtime)
+                if code is not None:
+                    return code
+
+        source = self.get_source(fullname)
+        if source is None:
+            return None
+        return compile(source, self._get_filename(fullname), 'exec',
+                       dont_inherit=True)
 
     def get_source(self, fullname):
-        module = self._get_module(fullname) or self._import(fullname)
-        return inspect.getsource(module)
+        """Return the source code of given module.
+
+        :return: Source code as string, or ``None`` if it's not available
+        :raise ImportError: If the module cannot be found
+        """
+        if HAS_PEP451:
+            loader = self._get_original_loader(fullname)
+            if hasattr(loader, 'get_source'):
+                return loader.get_source(fullname)
+            module = self._get_module(fullname)
+            return None if module is None else inspect.getsource(module)
+
+        filename, _, _ = self._find_inspected_module(fullname)
+        if filename is None:
+            return None
+        with open(filename, 'U') as f:
+            return f.read()
+
+    def _get_filename(self, fullname):
+        """Return the path to the file of given module,
+        for use in code objects compiled from its source.
+        """
+        if HAS_PEP451:
+            spec = self._find_inspected_spec(fullname)
+            return spec.origin or '<%s>' % fullname
+        filename, pathname, _ = self._find_inspected_module(fullname)
+        return filename or pathname
+
+    def _find_inspected_spec(self, fullname):
+        """Find the spec of given module the way the standard ``PathFinder``
+        would, without importing it (or its parent packages).
+
+        Specs of modules that are imported already are reused.
+
+        :raise ImportError: If the module cannot be found
+        """
+        module = self._get_module(fullname)
+        spec = getattr(module, '__spec__', None)
+        if spec is not None:
+            return spec
+
+        path = None
+        if '.' in fullname:
+            parent = fullname.rsplit('.', 1)[0]
+            parent_module = self._get_module(parent)
+            if parent_module is not None:
+                path = getattr(parent_module, '__path__', None)
+            else:
+                path = self._find_inspected_spec(parent) \
+                    .submodule_search_locations
+            if path is None:
+                raise ImportError("%s is not a package" % parent,
+                                  name=fullname)
+
+        spec = PathFinder.find_spec(fullname, path)
+        if spec is None:
+            raise ImportError("no module named %s" % fullname, name=fullname)
+        return spec
+
+    def _get_original_loader(self, fullname):
+        """Return the loader that our hook delegates (or would delegate)
+        the loading of given module to.
+
+        :return: Loader object, or ``None`` if the module was loaded
+                 by ``on_load_module``
+        """
+        spec = self._find_inspected_spec(fullname)
+        if spec.loader is self:
+            return getattr(spec.loader_state, 'loader', None)
+        return spec.loader
+
+    def _find_inspected_module(self, fullname):
+        """Find given module using ``imp.find_module``,
+        without importing it (or its parent packages).
+
+        :return: Tuple of path to the module's source file (or ``None``),
+                 and ``pathname`` and ``description`` from ``imp``
+        :raise ImportError: If the module cannot be found
+        """
+        path = None
+        if '.' in fullname:
+            parent, name = fullname.rsplit('.', 1)
+            parent_module = self._get_module(parent)
+            if parent_module is not None:
+                path = getattr(parent_module, '__path__', None)
+            else:
+                _, pathname, desc = self._find_inspected_module(parent)
+                if desc[2] == imp.PKG_DIRECTORY:
+                    path = [pathname]
+            if path is None:
+                raise ImportError("%s is not a package" % parent)
+        else:
+            name = fullname
+
+        file_obj, pathname, desc = imp.find_module(name, path)
+        if file_obj:
+            file_obj.close()
+
+        filename = None
+        if desc[2] == imp.PY_SOURCE:
+            filename = pathname
+        elif desc[2] == imp.PKG_DIRECTORY:
+            init_py = os.path.join(pathname, '__init__.py')
+            if os.path.isfile(init_py):
+                filename = init_py
+        return filename, pathname, desc
+
+
+def _read_bytecode(filename, source_mtime=None):
+    """Read code object from a legacy ``.pyc`` file.
+
+    :param source_mtime: Modification time of the source file,
+                         if the bytecode has to be up to date with it
+    :return: Code object, or ``None`` if the file is missing or stale
+    """
+    try:
+        with open(filename, 'rb') as f:
+            data = f.read()
+    except IOError:
+        return None
+    if data[:4] != imp.get_magic():
+        return None
+    if source_mtime is not None and \
+            struct.unpack('<I', data[4:8])[0] != int(source_mtime):
+        return None
+    # (since Python 3.3, the source mtime is followed by its size)
+    header_size = 8 if sys.version_info < (3, 3) else 12
+    return marshal.loads(data[header_size:])
+
+
+class _HookState(namedtuple('_HookState', ['loader', 'loader_state', 'path'])):
+    """``loader_state`` of module specs returned by :class:`ImportHook`,
+    holding the original loader (and its own state) it delegates to.
+    """
+    __slots__ = ()
+
 
 if IS_PY3:
     from importlib import abc
-    for ab in (abc.Finder, abc.Loader, abc.InspectLoader):
+    for ab in (getattr(abc, 'Finder', abc.MetaPathFinder), abc.MetaPathFinder,
+               abc.Loader, abc.InspectLoader):
         ab.register(ImportHook)
@@ -1,11 +1,28 @@
 """
 Import hook for ``__recursive__`` importing of submodules.
 """
+from contextlib import contextmanager
+import functools
 import os
 import sys
+import threading
+import time
+import warnings
+import zipimport
 
-from recursely._compat import IS_PY26
+from recursely._compat import IS_PY26, DeadlockError
+from recursely.background import BackgroundImports
+from recursely.cache import ManifestCache, _has_coarse_mtime, _mtime
+from recursely.directive import Directive
+from recursely.exports import ExportIndex
 from recursely.hook import ImportHook
+from recursely.lazy import LazyChildren
+from recursely.listing import ArchiveIndex, find_archive, scan_package_dir
+from recursely.markers import MarkerScanner
+from recursely.preload import PostForkImportWarning
+from recursely.refresh import RefreshReport
+from recursely.registry import (DeferredChildren, ExpandedPackages,
+                                PackageRegistry)
 
 
 __all__ = ['RecursiveImporter']
@@ -16,11 +33,113 @@ class RecursiveImporter(ImportHook):
     of a package that is marked as 'recursive'.
 
     In general, such packages should have ``__recursive__ = True``
-    somewhere inside their `__init__.py` files.
+    somewhere inside their `__init__.py` files. With ``__recursive__ = '*'``,
+    symbols from child modules are also brought into package's namespace,
+    while ``__recursive__ = 'lazy'`` defers importing every child
+    until it's first accessed as package's attribute (and ``'lazy*'``
+    until any of the names it exports is accessed), and
+    ``__recursive__ = 'background'`` imports them on a separate thread.
+    A dictionary can be used as well, to filter the children that are
+    imported (see :class:`Directive`).
     """
+    def __init__(self, cache=None, prefetcher=None, profiler=None,
+                 packages=None, manifest=None, include=None, exclude=None,
+                 max_depth=None, namespaces=False):
+        """Constructor.
+
+        :param cache: Optional :class:`ManifestCache` used to avoid
+                      listing the package directories on every run
+        :param prefetcher: Optional :class:`Prefetcher` used to read
+                           and compile child modules ahead of their import
+        :param profiler: Optional :class:`ImportProfiler` that will time
+                         every child module import
+        :param packages: Optional names of packages whose trees
+                         the importer should be limited to.
+                         By default, it intercepts every import
+                         (so that it can find any ``__recursive__`` package)
+        :param manifest: Optional :class:`ImportManifest` with children
+                         of packages recorded ahead of time
+        :param include: Optional patterns of the only children to import,
+                        in addition to those in ``__recursive__`` directives
+        :param exclude: Optional patterns of children to skip in all
+                        recursive packages
+        :param max_depth: Optional limit of recursion depth
+                          for all recursive packages
+        :param namespaces: Whether subdirectories without `__init__.py`
+                           should be imported as namespace subpackages
+                           in recursive packages whose directives
+                           don't say otherwise
+        """
+        self.cache = cache
+        self.manifest = manifest
+        self.defaults = None
+        if include is not None or exclude or max_depth is not None or \
+                namespaces:
+            self.defaults = Directive(include=include, exclude=exclude,
+                                      max_depth=max_depth,
+                                      namespaces=namespaces)
+        self.prefetcher = prefetcher
+        self.profiler = profiler
+        self.scanner = MarkerScanner(cache)
+        self.export_index = ExportIndex(cache)
+        if profiler is not None:
+            # done once here rather than checked on every import,
+            # so that profiling costs nothing when it's disabled
+            self._import_child_module = profiler.wrap(
+                self._import_child_module)
+        self._state = _RecursionState()
+        self._outermost_recursions = 0  # in progress on all threads
+        self._recursions_lock = threading.Lock()
+
+        #: Names of all packages that had ``__recursive__`` directive
+        self.recursive_packages = PackageRegistry(packages or ())
+        self.limited = packages is not None
+
+        #: Packages whose trees have already been fully imported
+        self.expanded_packages = ExpandedPackages()
+
+        #: Children left for other threads that were importing them
+        #: while their packages were being expanded
+        self.deferred_children = DeferredChildren()
+
+        #: Packages whose children are imported in the background
+        self.background_imports = BackgroundImports()
+
+        #: ID of the process where :func:`preload` has been called, if any
+        self.preloaded_pid = None
+
+        #: Modification times of package directories when they were
+        #: last listed, so that :meth:`refresh` can skip unchanged ones
+        self.dir_mtimes = {}
+
+        #: Number of module lookups rejected upfront
+        #: because they were outside of ``recursive_packages``
+        self.short_circuited = 0
+
+    def find_spec(self, fullname, path=None, target=None):
+        """Module finding method.
+
+        If the importer is limited to certain packages, lookups
+        for any other modules are rejected immediately.
+        """
+        if self.limited and not self.recursive_packages.covers(fullname):
+            self.short_circuited += 1
+            return None
+        return super(RecursiveImporter, self).find_spec(fullname, path, target)
+
+    def find_module(self, fullname, path=None):
+        """Legacy module finding method, limited like :meth:`find_spec`."""
+        if self.limited and not self.recursive_packages.covers(fullname):
+            self.short_circuited += 1
+            return None
+        return super(RecursiveImporter, self).find_module(fullname, path)
+
     def on_module_imported(self, fullname, module):
         """Invoked just after a module has been imported."""
-        return self.recurse(module)
+        result = self.recurse(module)
+        if self.deferred_children:
+            self._finish_deferred_child(fullname, module)
+        return result
 
     def recurse(self, module):
         """Act upon possible ``__recursive__`` directive defined in ``module``.
@@ -28,25 +147,180 @@ class RecursiveImporter(ImportHook):
         :return: ``module`` object
         """
         recursive = getattr(module, '__recursive__', None)
-        if recursive:
-            return self._recursive_import(module, as_star=recursive == '*')
-        else:
+        if not recursive:
             return module
 
-    def _recursive_import(self, module, as_star=False):
+        name = module.__name__
+        if name.endswith('.__init__'):
+            name = name[:-len('.__init__')]
+        self.recursive_packages.add(name)
+        if module in self.expanded_packages:
+            return module
+
+        if self.preloaded_pid is not None and \
+                os.getpid() != self.preloaded_pid:
+            warnings.warn("recursive package %s is imported after fork "
+                          "rather than preloaded" % name,
+                          PostForkImportWarning, stacklevel=2)
+
+        directive = Directive.parse(recursive, root=name,
+                                    defaults=self.defaults)
+        with self._recursion():
+            return self._recursive_import(module, directive)
+
+    def refresh(self, module, changed_dirs=None):
+        """Import modules and subpackages that have been added
+        to the tree of given recursive package since it was imported,
+        and find those that have been removed.
+
+        Only the directories that have changed since they were listed
+        are listed again, so that the cost depends on the number
+        of changed packages rather than the size of the whole tree.
+        Packages whose children are imported lazily are not refreshed.
+
+        :param module: Module object of a recursive package
+        :param changed_dirs: Optional collection of package directories
+                             known to have changed (e.g. as reported
+                             by filesystem notifications). If given,
+                             only those directories are listed again,
+                             without checking modification times
+                             of any others.
+        :return: :class:`RefreshReport`
+        """
+        name = module.__name__
+        report = RefreshReport(name)
+        prefix = name + '.'
+        with self._recursion():
+            for package_name in self.expanded_packages:
+                if package_name != name and \
+                        not package_name.startswith(prefix):
+                    continue
+                package = sys.modules.get(package_name)
+                if package is None:
+                    continue
+                children = self.expanded_packages.get(package)
+                if children is not None and \
+                        LazyChildren.of(package) is None:
+                    self._refresh_package(package, children, report,
+                                          changed_dirs)
+        return report
+
+    def _refresh_package(self, module, children, report, changed_dirs=None):
+        """Import new children of an expanded package,
+        if any of its directories have changed,
+        and record the children that are gone.
+
+        :param children: Children of the package imported so far
+        :param report: :class:`RefreshReport` to add the changes to
+        """
+        entries = self._identify_package_dirs(
+            module, self._get_package_dirs(module))
+        if changed_dirs is None:
+            changed = any(archive is None and
+                          self.dir_mtimes.get(package_dir) != _mtime(dir_stat)
+                          for package_dir, dir_stat, _, archive in entries)
+        else:
+            changed = any(package_dir in changed_dirs
+                          for package_dir, _, _, _ in entries)
+        if not changed:
+            return
+
+        directive = self._find_directive(module)
+        if directive is None:
+            return
+        accept = None
+        if directive.is_filtered:
+            accept = functools.partial(self._accepts_child, module, directive)
+
+        dir_ids = [dir_id for _, _, dir_id, _ in entries]
+        self._state.active_dirs.update(dir_ids)
+        try:
+            listed_at = time.time()
+            listed = [(package_dir,
+                       self._list_children(package_dir, dir_stat,
+                                           archive=archive, accept=accept,
+                                           namespaces=directive.namespaces,
+                                           rescan=True))
+                      for package_dir, dir_stat, _, archive in entries]
+            listings = self._filter_marked(listed, directive)
+            present = self._merge_children(listings)
+            removed = [child for child in children if child not in present]
+            known = set(children)
+            added = [child for child in present if child not in known]
+
+            imported = []
+            try:
+                for child in added:
+                    self._import_child(module, child, directive)
+                    imported.append(child)
+            finally:
+                # children that failed to import are retried next time
+                self.expanded_packages.add(
+                    module, [child for child in children
+                             if child not in removed] + imported)
+                report.added.extend('%s.%s' % (module.__name__, child)
+                                    for child in imported)
+                report.removed.extend('%s.%s' % (module.__name__, child)
+                                      for child in removed)
+            self._remember_mtimes(entries, listed, listed_at, accept=accept,
+                                  namespaces=directive.namespaces)
+        finally:
+            self._state.active_dirs.difference_update(dir_ids)
+
+    def _find_directive(self, module):
+        """Find the ``__recursive__`` directive that applies to given
+        package, i.e. the one of the package itself or its nearest ancestor.
+
+        :return: :class:`Directive` or ``None``
+        """
+        name = module.__name__
+        while name:
+            recursive = getattr(sys.modules.get(name), '__recursive__', None)
+            if recursive:
+                return Directive.parse(recursive, root=name,
+                                       defaults=self.defaults)
+            name = name.rpartition('.')[0]
+        return None
+
+    @contextmanager
+    def _recursion(self):
+        """Context manager that delimits a (possibly nested) recursive import,
+        cleaning up after the outermost one has finished.
+
+        The prefetcher is shut down only once there are no recursive
+        imports left on any thread, as it's shared by all of them.
+        """
+        if self._state.depth == 0:
+            with self._recursions_lock:
+                self._outermost_recursions += 1
+        self._state.depth += 1
+        try:
+            yield
+        finally:
+            self._state.depth -= 1
+            if self._state.depth == 0:
+                self._state.dir_stats.clear()
+                self._state.listings.clear()
+                with self._recursions_lock:
+                    self._outermost_recursions -= 1
+                    last = self._outermost_recursions == 0
+                    if last and self.prefetcher is not None:
+                        self.prefetcher.shutdown()
+                if self.cache is not None:
+                    self.cache.save()
+
+    def _recursive_import(self, module, directive):
         """Recursively import submodules and/or subpackage of given package.
 
         :param module: Module object for the package
-        :param as_star: Whether this should be a "star" import, i.e. a one
-                        that brings all symbols from child module into
-                        parent module's namespace (``from foo import **``).
+        :param directive: :class:`Directive` of the recursive package
+                          (``module`` itself or one of its ancestors)
+                          that tells whether this should be a "star"
+                          import (``from foo import **``), a lazy one,
+                          and which children should be imported
 
         :return: ``module`` object
         """
-        package_dir = self._get_package_dir(module)
-        if not package_dir:
-            return
-
         # if `foo.__init__` is imported explicitly (rare), ensure that
         # recursively imported `foo/bar.py` is namespaced as `foo.bar`
         # rather than nonsensical `foo.__init__.bar`
@@ -54,31 +328,449 @@ class RecursiveImporter(ImportHook):
             package_name = module.__name__[:-len('.__init__')]
             module = sys.modules[package_name]
 
-        for child in self._list_children(package_dir):
-            child_module = self._import_child_module(module, child)
+        package_dirs = self._get_package_dirs(module)
+        if not package_dirs:
+            return
 
-            # bring (symbols from) child module into parent's namespace
-            if as_star:
-                public_names = getattr(child_module, '__all__', None)
-                if public_names is None:
-                    public_names = (name for name in child_module.__dict__
-                                    if not name.startswith('_'))
-                for name in public_names:
-                    obj = getattr(child_module, name)
-                    setattr(module, name, obj)
-            else:
-                if not hasattr(module, child):
-                    setattr(module, child, child_module)
+        if module in self.expanded_packages:
+            return module
+        if not directive.descends(module.__name__):
+            return module
 
-            # apply the importing procedure recursively,
-            # but only if it wasn't applied already, simply by
-            # our import hook triggering when child was imported above
-            if not hasattr(child_module, '__recursive__'):
-                self._recursive_import(child_module, as_star)
+        # (children are filtered by name before anything else is done
+        # with them, including a ``stat`` of subdirectories)
+        accept = None
+        if directive.is_filtered:
+            accept = functools.partial(self._accepts_child, module, directive)
+
+        listings = None
+        if self.manifest is not None:
+            listings = self.manifest.lookup(module)
+        if listings is not None:
+            if accept is not None:
+                listings = [(package_dir, [c for c in children if accept(c)])
+                            for package_dir, children in listings]
+            listings = self._filter_marked(listings, directive)
+            self._expand(module, listings, directive)
+        else:
+            entries = self._identify_package_dirs(module, package_dirs)
+            if not entries:
+                return module  # symlink loop, or no accessible directories
+
+            dir_ids = [dir_id for _, _, dir_id, _ in entries]
+            self._state.active_dirs.update(dir_ids)
+            try:
+                listed_at = time.time()
+                listed = [(package_dir,
+                           self._list_children(
+                               package_dir, dir_stat, archive=archive,
+                               accept=accept,
+                               namespaces=directive.namespaces))
+                          for package_dir, dir_stat, _, archive in entries]
+                listings = self._filter_marked(listed, directive)
+                self._expand(module, listings, directive)
+                self._remember_mtimes(entries, listed, listed_at,
+                                      accept=accept,
+                                      namespaces=directive.namespaces)
+            finally:
+                self._state.active_dirs.difference_update(dir_ids)
 
         module.__loader__ = self
         return module
 
+    def _expand(self, module, listings, directive):
+        """Import the listed children of given package,
+        or make them importable lazily.
+
+        :param listings: List of ``(package_dir, children)`` pairs
+                         for every directory of the package
+        """
+        if directive.lazy and LazyChildren.is_supported():
+            children = self._merge_children(listings)
+            exports, opaque = None, ()
+            if directive.as_star:
+                exports, opaque = self._index_exports(listings)
+            lazy_children = LazyChildren.install(
+                module, children, functools.partial(
+                    self._load_lazy_child, directive=directive), exports)
+            self.expanded_packages.add(module, children)
+            for child in opaque:
+                lazy_children.get(child)
+        elif directive.background and not self._state.in_background:
+            self.background_imports.start(module, functools.partial(
+                self._expand_in_background, module, listings, directive,
+                active_dirs=set(self._state.active_dirs)))
+        else:
+            children = self._import_children(module, listings, directive)
+            if module not in self.deferred_children:
+                self.expanded_packages.add(module, children)
+
+    def _expand_in_background(self, module, listings, directive,
+                              active_dirs=()):
+        """Import the listed children of given package
+        on a background thread.
+
+        Any nested recursive imports (even of other ``'background'``
+        packages) happen on this thread as well.
+
+        :param active_dirs: Directories that were being recursively
+                            imported when the thread was started
+        """
+        self._state.in_background = True
+        self._state.active_dirs.update(active_dirs)
+        with self._recursion():
+            children = self._import_children(module, listings, directive)
+        if module not in self.deferred_children:
+            self.expanded_packages.add(module, children)
+
+    def _index_exports(self, listings):
+        """Find the names exported by children of a lazy "star" package
+        without importing them (see :class:`ExportIndex`).
+
+        :param listings: List of ``(package_dir, children)`` pairs
+        :return: Tuple of a dictionary mapping exported names to children
+                 they come from, and a list of children whose exports
+                 cannot be determined statically (so they have to be
+                 imported right away)
+        """
+        exports = {}
+        opaque = []
+        seen = set()
+        for package_dir, children in listings:
+            for child in children:
+                if child in seen:
+                    continue
+                seen.add(child)
+
+                path = os.path.join(package_dir, child)
+                if path not in self._state.dir_stats:
+                    try:
+                        names = self.export_index.exports(path + '.py')
+                    except (IOError, OSError):
+                        names = self._index_package_exports(path)
+                else:
+                    names = self._index_package_exports(path)
+
+                if names is None:
+                    opaque.append(child)
+                else:
+                    for name in names:
+                        exports[name] = child
+        return exports, opaque
+
+    def _index_package_exports(self, package_dir):
+        """Find the names exported by subpackage's `__init__.py`.
+        :return: List of names, or ``None`` if they're unknown
+        """
+        try:
+            return self.export_index.exports(
+                os.path.join(package_dir, '__init__.py'))
+        except (IOError, OSError):
+            # namespace packages export nothing by themselves,
+            # while packages in zip archives cannot be indexed
+            return [] if os.path.isdir(package_dir) else None
+
+    def _accepts_child(self, module, directive, child):
+        """Check whether given child of a package passes
+        the filters of recursive ``directive``.
+        """
+        return directive.accepts('%s.%s' % (module.__name__, child))
+
+    def _identify_package_dirs(self, module, package_dirs):
+        """Identify the accessible directories of given package,
+        skipping duplicates and ones that are currently being
+        recursively imported.
+
+        Directories are identified by their ``(st_dev, st_ino)``, except
+        for those inside zip archives (zipapps, zipped eggs, etc.) which
+        cannot be symlinked, so their paths identify them well enough.
+
+        :return: List of ``(package_dir, dir_stat, dir_id, archive)`` tuples
+        """
+        module_archive = self._get_archive(module)
+
+        entries = []
+        seen = set(self._state.active_dirs)
+        for package_dir in package_dirs:
+            if module_archive is not None and \
+                    package_dir.startswith(module_archive + os.sep):
+                dir_stat, dir_id, archive = None, package_dir, module_archive
+            else:
+                try:
+                    dir_stat = self._stat_package_dir(package_dir)
+                    dir_id = (dir_stat.st_dev, dir_stat.st_ino)
+                    archive = None
+                except OSError:
+                    archive = find_archive(package_dir)
+                    if archive is None:
+                        continue
+                    dir_stat, dir_id = None, package_dir
+            if dir_id not in seen:
+                seen.add(dir_id)
+                entries.append((package_dir, dir_stat, dir_id, archive))
+        return entries
+
+    def _import_children(self, module, listings, directive):
+        """Import all children of given package and bring them
+        into its namespace.
+
+        :param module: Module object for the package
+        :param listings: List of ``(package_dir, children)`` pairs
+                         for every directory of the package, with children
+                         as listed by :meth:`_list_children`
+        :param directive: :class:`Directive` of the recursive package
+
+        :return: List of children names
+        """
+        if self.prefetcher is not None:
+            for package_dir, children in listings:
+                self.prefetcher.prefetch(module.__name__, package_dir,
+                                         children)
+
+        children = self._merge_children(listings)
+        self._state.expanding.append(module)
+        try:
+            if (directive.parallel or 1) > 1 and len(children) > 1 and \
+                    not self._state.in_worker and \
+                    self._import_children_in_parallel(module, children,
+                                                      directive):
+                return children
+
+            for child in children:
+                try:
+                    self._import_child(module, child, directive)
+                except DeadlockError:
+                    # another thread is importing this child while waiting
+                    # for the package (whose module lock we're holding),
+                    # so the child is finished once that import completes
+                    self.deferred_children.add(module, child, children,
+                                               directive)
+        finally:
+            self._state.expanding.pop()
+        return children
+
+    def _import_children_in_parallel(self, module, children, directive):
+        """Import children of given package, each along with its subtree,
+        on a pool of ``directive.parallel`` worker threads.
+
+        Every subtree is still imported depth-first on a single thread,
+        while children are brought into package's namespace on the current
+        thread, in the same order as they would be without parallelism.
+
+        :return: Whether the children have been imported, which they
+                 aren't if thread pools are not available
+        """
+        try:
+            from concurrent.futures import ThreadPoolExecutor
+        except ImportError:
+            return False
+
+        active_dirs = set(self._state.active_dirs)
+        with self._unblocked_packages():
+            with ThreadPoolExecutor(directive.parallel) as executor:
+                futures = [executor.submit(self._import_subtree, module,
+                                           child, directive, active_dirs)
+                           for child in children]
+                for child, future in zip(children, futures):
+                    try:
+                        child_module, exports = future.result()
+                    except DeadlockError:
+                        # circular import between siblings that were
+                        # imported in parallel; one of them has finished
+                        # by now, so try again here
+                        self._import_child(module, child, directive)
+                    else:
+                        # the import system has bound the child already,
+                        # but at a time that depends on thread scheduling;
+                        # doing it again keeps the namespace deterministic
+                        setattr(module, child, child_module)
+                        self._bind_child(module, child, child_module,
+                                         exports)
+        return True
+
+    def _import_subtree(self, module, child, directive, active_dirs=()):
+        """Import a child of given package, along with its own children,
+        on a worker thread.
+
+        :param active_dirs: Directories being recursively imported
+                            by the thread that has started the worker
+        :return: Tuple of child module object and its exports
+                 (see :meth:`_get_exports`)
+        """
+        state = self._state
+        state.in_worker = True
+        state.depth += 1  # so that nested ``recurse`` calls
+                          # don't clean up after the whole import
+        state.active_dirs.update(active_dirs)
+        try:
+            child_module = self._import_child_module(module, child)
+            exports = self._get_exports(child_module, directive)
+            self._recurse_into_child(child_module, directive)
+            return child_module, exports
+        finally:
+            state.active_dirs.difference_update(active_dirs)
+            state.depth -= 1
+            state.dir_stats.clear()
+            state.listings.clear()
+            state.in_worker = False
+
+    @contextmanager
+    def _unblocked_packages(self):
+        """Let worker threads use the packages being recursively imported
+        by current thread without waiting for their module locks.
+
+        Code of these packages has already been executed; their imports
+        are only pending until their children have been imported, too.
+        Meanwhile, worker threads importing those children mustn't block
+        on the module locks held by current thread (which waits for them),
+        so to them, the packages are presented as if they were imported
+        completely -- just like in case of circular imports. Other threads
+        still wait for the packages, as usual.
+        """
+        specs = []
+        for package in self._state.expanding:
+            spec = getattr(package, '__spec__', None)
+            if getattr(spec, '_initializing', False) and \
+                    '_unblocked_in' not in spec.__dict__:
+                spec._unblocked_in = self._state
+                spec.__class__ = _unblocking_spec_class(type(spec))
+                specs.append(spec)
+        try:
+            yield
+        finally:
+            for spec in specs:
+                spec.__class__ = type(spec).__bases__[0]
+                del spec._unblocked_in
+
+    def _filter_marked(self, listings, directive):
+        """Leave out the child modules whose source doesn't contain
+        the marker of recursive ``directive``, if it has one.
+
+        Subpackages are kept, so that the marker applies to their
+        own children, as are modules whose source cannot be scanned
+        (e.g. because they are inside a zip archive).
+
+        :param listings: List of ``(package_dir, children)`` pairs
+        :return: Filtered list of ``(package_dir, children)`` pairs
+        """
+        if directive.marker is None:
+            return listings
+
+        filtered = []
+        for package_dir, children in listings:
+            marked = []
+            for child in children:
+                path = os.path.join(package_dir, child)
+                if path not in self._state.dir_stats:
+                    try:
+                        if not self.scanner.matches(path + '.py',
+                                                    directive.marker):
+                            continue
+                    except (IOError, OSError):
+                        pass  # a subpackage, or not on the filesystem
+                marked.append(child)
+            filtered.append((package_dir, marked))
+        return filtered
+
+    def _merge_children(self, listings):
+        """Merge children listed from all directories of a package,
+        keeping the first occurrence of every name.
+        """
+        if len(listings) == 1:
+            return listings[0][1]
+
+        children = []
+        seen = set()
+        for _, dir_children in listings:
+            for child in dir_children:
+                if child not in seen:
+                    seen.add(child)
+                    children.append(child)
+        return children
+
+    def _import_child(self, module, child, directive):
+        """Import a single child of given package, bring it into
+        package's namespace, and recursively import its own children.
+
+        :return: Child module object
+        """
+        child_module = self._import_child_module(module, child)
+        self._bind_child(module, child, child_module,
+                         self._get_exports(child_module, directive))
+        self._recurse_into_child(child_module, directive)
+        return child_module
+
+    def _finish_deferred_child(self, fullname, child_module):
+        """Bring a child that was deferred by :meth:`_import_children`
+        into its package's namespace, and recursively import its own
+        children, now that another thread has finished importing it.
+        """
+        deferred = self.deferred_children.complete(fullname)
+        if deferred is None:
+            return
+        module, child, directive, children = deferred
+        child_module = sys.modules.get(fullname, child_module)
+        with self._recursion():
+            self._bind_child(module, child, child_module,
+                             self._get_exports(child_module, directive))
+            self._recurse_into_child(child_module, directive)
+        if children is not None:
+            self.expanded_packages.add(module, children)
+
+    def _get_exports(self, child_module, directive):
+        """Return the symbols that a "star" import brings from given child
+        into its package's namespace.
+
+        :return: List of ``(name, object)`` pairs,
+                 or ``None`` if it's not a "star" import
+        """
+        if not directive.as_star:
+            return None
+        public_names = getattr(child_module, '__all__', None)
+        if public_names is None:
+            public_names = [name for name in child_module.__dict__
+                            if not name.startswith('_')]
+        return [(name, getattr(child_module, name)) for name in public_names]
+
+    def _bind_child(self, module, child, child_module, exports=None):
+        """Bring (symbols from) child module into parent's namespace.
+
+        :param exports: Symbols to bring in, as returned by
+                        :meth:`_get_exports`
+        """
+        if exports is not None:
+            for name, obj in exports:
+                setattr(module, name, obj)
+        else:
+            # (looking into ``__dict__`` directly, so that we don't trigger
+            # module's ``__getattr__`` if the package is imported lazily)
+            if child not in module.__dict__:
+                setattr(module, child, child_module)
+
+    def _recurse_into_child(self, child_module, directive):
+        """Apply the importing procedure recursively to a child module,
+        but only if it wasn't applied already, simply by
+        our import hook triggering when child was imported.
+        """
+        if not hasattr(child_module, '__recursive__'):
+            self._recursive_import(child_module, directive)
+
+    def _load_lazy_child(self, module, child, directive):
+        """Import a child of lazily imported package
+        on its first access.
+        """
+        with self._recursion():
+            lazy_children = LazyChildren.of(module)
+            if not directive.as_star or lazy_children is None:
+                return self._import_child(module, child, directive)
+
+            child_module = self._import_child_module(module, child)
+            exports = lazy_children.claim(
+                child, self._get_exports(child_module, directive))
+            self._bind_child(module, child, child_module, exports)
+            self._recurse_into_child(child_module, directive)
+            return child_module
+
     def _import_child_module(self, module, child):
         """Import a child module, relative to the ``module``\ s package.
 
@@ -96,56 +788,184 @@ class RecursiveImporter(ImportHook):
             from importlib import import_module
             return import_module('%s.%s' % (module.__name__, child))
 
-    def _get_package_dir(self, module):
-        """Get the package directory for given `__init__` module."""
-        module_file = getattr(module, '__file__', None)
-        if not self._is_init_py(module_file):
-            return
-        return os.path.dirname(module_file)
+    def _get_package_dirs(self, module):
+        """Get all the directories of given package, as listed
+        in its ``__path__``. Modules that aren't packages have none.
 
-    def _is_init_py(self, module_file):
-        """Check if given filename points to an `__init__` module."""
-        if not module_file:
-            return False
+        Besides regular packages, this covers :pep:`420` namespace packages
+        and packages whose ``__path__`` was extended (e.g. with ``pkgutil``)
+        to span several directories.
+        """
+        path = getattr(module, '__path__', None)
+        if path is None:
+            return []
+        return list(path)
+
+    def _get_archive(self, module):
+        """Get the path to zip archive that given package
+        was imported from, or ``None`` if it wasn't.
+        """
+        spec = getattr(module, '__spec__', None)
+        loader = getattr(spec, 'loader', None) or \
+            getattr(module, '__loader__', None)
+        if isinstance(loader, zipimport.zipimporter):
+            return loader.archive
+
+    def _stat_package_dir(self, package_dir):
+        """Return the ``stat`` result for given package directory,
+        reusing the one obtained when its parent was listed, if possible.
+
+        :raise OSError: If the directory cannot be accessed
+        """
+        st = self._state.dir_stats.pop(package_dir, None)
+        return os.stat(package_dir) if st is None else st
 
-        filename = os.path.basename(module_file)
-        root, _ = os.path.splitext(filename)
-        return root == '__init__'
+    def _remember_mtimes(self, entries, listed, listed_at, accept=None,
+                         namespaces=False):
+        """Remember modification times of listed package directories,
+        as returned by :meth:`_identify_package_dirs`, for :meth:`refresh`.
 
-    def _list_children(self, package_dir):
+        This is done once the children have been imported, which usually
+        modifies their directories, too (by creating `__pycache__`).
+        Directories modified since they were listed are listed once more,
+        and their current modification times are remembered only if that
+        doesn't turn up any other children. Like in :class:`ManifestCache`,
+        directories with coarse timestamps modified very recently before
+        being listed are not remembered at all.
+
+        :param listed: List of ``(package_dir, children)`` pairs
+                       as listed by :meth:`_list_children`
+        :param listed_at: Time when the directories were listed
+        """
+        for (package_dir, dir_stat, _, archive), (_, children) in \
+                zip(entries, listed):
+            if archive is not None:
+                continue
+            if _has_coarse_mtime(dir_stat) and \
+                    listed_at - dir_stat.st_mtime < \
+                    ManifestCache.RACY_INTERVAL:
+                self.dir_mtimes.pop(package_dir, None)
+                continue
+            try:
+                current = os.stat(package_dir)
+            except OSError:
+                self.dir_mtimes.pop(package_dir, None)
+                continue
+            if _mtime(current) != _mtime(dir_stat):
+                relisted = self._list_children(
+                    package_dir, current, accept=accept,
+                    namespaces=namespaces, rescan=True)
+                if relisted != children:
+                    self.dir_mtimes.pop(package_dir, None)
+                    continue
+            self.dir_mtimes[package_dir] = _mtime(current)
+
+    def _list_children(self, package_dir, dir_stat=None, archive=None,
+                       accept=None, namespaces=False, rescan=False):
         """Lists all child items contained with given package
-        including submodules and subpackages
+        including submodules and subpackages.
+
+        Subpackages that lead back to a directory which is currently
+        being recursively imported (through symlinks) are omitted.
 
         :param package_dir: Package directory
+        :param dir_stat: Optional ``stat`` result for the directory
+        :param archive: Path to zip archive containing the package, if any
+        :param accept: Optional function that tells whether a child
+                       of given name should be listed at all
+        :param namespaces: Whether namespace subpackages should be listed
+        :param rescan: Whether to list the directory anew
+                       even if it has been listed before
         """
+        if archive is not None:
+            children = ArchiveIndex.for_archive(archive) \
+                .list(package_dir, namespaces=namespaces).children
+            return children if accept is None else list(filter(accept,
+                                                               children))
+
+        if dir_stat is None:
+            dir_stat = self._stat_package_dir(package_dir)
+
+        # a directory may be reachable as more than one package
+        # (e.g. through ``__path__`` entries of split packages)
+        dir_id = (dir_stat.st_dev, dir_stat.st_ino)
+        key = (dir_id, namespaces)
+        listing = None if rescan else self._state.listings.get(key)
+        if listing is None and self.cache is not None and not rescan:
+            listing = self.cache.lookup(package_dir, dir_stat,
+                                        namespaces=namespaces)
+        if listing is None:
+            if accept is None or self.cache is not None:
+                # the complete listing is cached, and filtered below
+                listing = scan_package_dir(package_dir,
+                                           namespaces=namespaces)
+                if self.cache is not None:
+                    self.cache.store(package_dir, dir_stat, listing,
+                                     namespaces=namespaces)
+                self._state.listings[key] = listing
+            else:
+                # with nothing to cache, rejected children
+                # aren't even looked at
+                listing = scan_package_dir(package_dir, accept=accept,
+                                           namespaces=namespaces)
+        else:
+            self._state.listings[key] = listing
+
         children = []
-        children.extend(self._list_subpackages(package_dir))
-        children.extend(m for m in self._list_submodules(package_dir)
-                        if m != '__init__')
+        for child in listing.children:
+            if accept is not None and not accept(child):
+                continue
+            st = listing.subdirs.get(child)
+            if st is not None:
+                if (st.st_dev, st.st_ino) in self._state.active_dirs:
+                    continue
+                self._state.dir_stats[os.path.join(package_dir, child)] = st
+            children.append(child)
         return children
 
-    def _list_subpackages(self, package_dir):
-        """Lists all subpackages (directories with `__init__.py`)
-        contained within given package.
 
-        :param package_dir: Package directory
-        """
-        def is_subpackage_dir(name):
-            abs_path = os.path.join(package_dir, name)
-            init_py = os.path.join(abs_path, '__init__.py')
-            return os.path.isdir(abs_path) and os.path.isfile(init_py)
+class _RecursionState(threading.local):
+    """State of recursive imports in progress on current thread."""
 
-        return [name for name in os.listdir(package_dir)
-                if is_subpackage_dir(name)]
+    def __init__(self):
+        self.depth = 0
+        self.active_dirs = set()  # (st_dev, st_ino) of packages being
+                                  # recursively imported; guards against
+                                  # symlink cycles
+        self.dir_stats = {}  # subdirectory stats from parents' listings
+        self.listings = {}  # listings of directories already scanned
+                            # during current recursive import, by dir ID
+                            # and whether namespace subpackages are listed
+        self.in_background = False
+        self.in_worker = False  # whether this is a thread of a pool
+                                # importing children in parallel
+        self.expanding = []  # packages whose children are being imported
+                             # by this thread, outermost first
 
-    def _list_submodules(self, package_dir):
-        """Lists all submodules (`*.py` files) contained within given package.
-        :param package_dir: Package directory
-        """
-        def is_submodule_file(name):
-            abs_path = os.path.join(package_dir, name)
-            return os.path.isfile(abs_path) and name.endswith('.py')
 
-        return [os.path.splitext(name)[0]
-                for name in os.listdir(package_dir)
-                if is_submodule_file(name)]
+_unblocking_spec_classes = {}
+
+
+def _unblocking_spec_class(spec_class):
+    """Return a subclass of given module spec class whose ``_initializing``
+    flag (checked by the import system before using a module found
+    in ``sys.modules``) reads as false on the worker threads of
+    the recursive import that has set the spec's ``_unblocked_in``
+    to its :class:`_RecursionState`.
+    """
+    cls = _unblocking_spec_classes.get(spec_class)
+    if cls is None:
+        def get_initializing(spec):
+            if getattr(spec.__dict__['_unblocked_in'], 'in_worker', False):
+                return False
+            return spec.__dict__.get('_initializing', False)
+
+        def set_initializing(spec, value):
+            spec.__dict__['_initializing'] = value
+
+        cls = type(spec_class.__name__, (spec_class,), {
+            '__module__': spec_class.__module__,
+            '_initializing': property(get_initializing, set_initializing),
+        })
+        _unblocking_spec_classes[spec_class] = cls
+    return cls
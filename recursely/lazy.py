@@ -0,0 +1,141 @@
+"""
+Lazy importing of package children on first access.
+"""
+import sys
+import threading
+
+
+__all__ = ['LazyChildren', 'materialize']
+
+
+class LazyChildren(object):
+    """Module-level ``__getattr__`` (:pep:`562`) for lazily imported packages.
+
+    Children of the package are registered upfront, but each one is only
+    imported when it's first accessed as an attribute of the package.
+    Any ``__getattr__`` that the package has defined itself is still
+    consulted for all other attributes.
+
+    For lazy "star" imports, names exported by the children are registered
+    as well, so that accessing any of them imports the child it comes from.
+    """
+    def __init__(self, module, children, load, exports=None):
+        """Constructor.
+
+        :param module: Module object for the package
+        :param children: Names of package's children
+        :param load: Function taking the package module and a child name
+                     that imports the child and returns its module object
+        :param exports: Optional dictionary mapping names exported
+                        by the children to the names of those children
+        """
+        self.module = module
+        self.children = list(children)
+        self.positions = dict((child, i)
+                              for i, child in enumerate(self.children))
+        self.pending = set(self.children)
+        self.load = load
+        self.exports = dict(exports or ())
+        self.fallback = module.__dict__.get('__getattr__')
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_supported(cls):
+        """Checks whether current Python supports module ``__getattr__``."""
+        return sys.version_info >= (3, 7)
+
+    @classmethod
+    def install(cls, module, children, load, exports=None):
+        """Make children of given package importable lazily.
+        Has no effect if that has been done already.
+
+        :return: :class:`LazyChildren` object for the package
+        """
+        getattr_ = module.__dict__.get('__getattr__')
+        if isinstance(getattr_, cls):
+            return getattr_
+
+        lazy_children = cls(module, children, load, exports)
+        module.__getattr__ = lazy_children
+        return lazy_children
+
+    @classmethod
+    def of(cls, module):
+        """Return the :class:`LazyChildren` object for given package,
+        or ``None`` if it's not imported lazily.
+        """
+        getattr_ = getattr(module, '__dict__', {}).get('__getattr__')
+        return getattr_ if isinstance(getattr_, cls) else None
+
+    def __call__(self, name):
+        if name in self.pending:
+            return self.get(name)
+        child = self.exports.get(name)
+        if child is not None and child in self.pending:
+            self.get(child)
+            if name in self.module.__dict__:
+                return self.module.__dict__[name]
+        if self.fallback is not None:
+            return self.fallback(name)
+        raise AttributeError("module %r has no attribute %r" % (
+            self.module.__name__, name))
+
+    def get(self, child):
+        """Return the module object of given child, importing it if needed.
+        """
+        # importing itself is synchronized by the import system;
+        # holding our own lock for its duration could cause deadlocks
+        # with other threads' imports
+        child_module = self.load(self.module, child)
+        with self._lock:
+            self.pending.discard(child)
+        return self.module.__dict__.get(child, child_module)
+
+    def claim(self, child, exports):
+        """Filter the names that a lazily "star" imported child exports,
+        so that a name exported by several children is always bound from
+        the last one (like in an eager "star" import), regardless of the
+        order in which they are actually imported.
+
+        :param child: Name of the child that has just been imported
+        :param exports: List of ``(name, object)`` pairs it exports
+        :return: List of ``(name, object)`` pairs to bind in the package
+        """
+        position = self.positions[child]
+        claimed = []
+        with self._lock:
+            for name, obj in exports:
+                owner = self.exports.get(name, child)
+                if self.positions.get(owner, -1) > position:
+                    continue
+                self.exports[name] = child
+                claimed.append((name, obj))
+        return claimed
+
+    def materialize(self):
+        """Import all remaining children of the package,
+        in the same order as eager recursive import would.
+        """
+        for child in self.children:
+            if child in self.pending:
+                child_module = self.get(child)
+            else:
+                child_module = self.module.__dict__.get(child)
+            if child_module is not None:
+                materialize(child_module)
+
+
+def materialize(package):
+    """Force the import of the whole tree of a lazily imported package.
+
+    :param package: Package module object or its name
+    :return: Package module object
+    """
+    if not hasattr(package, '__dict__'):
+        from importlib import import_module
+        package = import_module(package)
+
+    lazy_children = LazyChildren.of(package)
+    if lazy_children is not None:
+        lazy_children.materialize()
+    return package
@@ -0,0 +1,224 @@
+"""
+Listing the contents of package directories.
+"""
+from collections import namedtuple
+import os
+import re
+import threading
+
+from recursely._compat import HAS_PEP420, scandir
+
+
+__all__ = ['ArchiveIndex', 'PackageListing', 'find_archive',
+           'scan_package_dir']
+
+
+class PackageListing(namedtuple('PackageListing', ['children', 'subdirs'])):
+    """Contents of a package directory.
+
+    :param children: Names of subpackages (including namespace ones,
+                     if they were asked for) followed by names of submodules
+    :param subdirs: Dictionary mapping names of *all* immediate subdirectories
+                    (packages or not) to their ``stat`` results
+    """
+    __slots__ = ()
+
+    @property
+    def package_subdirs(self):
+        """Dictionary of ``stat`` results of those subdirectories
+        that are, or could become, subpackages (unlike `__pycache__`,
+        which changes whenever a module is compiled).
+        """
+        return dict((name, st) for name, st in self.subdirs.items()
+                    if _is_package_name(name))
+
+
+def scan_package_dir(package_dir, accept=None, namespaces=False):
+    """List the children of given package directory in a single pass.
+
+    The directory is read exactly once, and file types are taken from
+    the directory entries themselves rather than ``stat``-ed separately.
+    Only the subdirectories need any extra system calls: one to obtain
+    their ``stat`` result, and one to check for `__init__.py`.
+
+    :param package_dir: Package directory
+    :param accept: Optional function that tells whether a child
+                   of given name should be listed. Rejected entries
+                   are skipped without any further system calls.
+    :param namespaces: Whether subdirectories without `__init__.py`
+                       that directly contain some `.py` files should
+                       also be listed, as :pep:`420` namespace subpackages
+                       (where supported). Each such directory needs
+                       to be read once more.
+    :return: :class:`PackageListing`
+    """
+    dirnames = []
+    subdirs = {}
+    submodules = []
+    with scandir(package_dir) as entries:
+        for entry in entries:
+            name = entry.name
+            if accept is not None and not accept(
+                    name[:-len('.py')] if name.endswith('.py') else name):
+                continue
+            try:
+                if entry.is_dir():
+                    subdirs[name] = entry.stat()
+                    dirnames.append(name)
+                elif name.endswith('.py') and entry.is_file():
+                    submodules.append(name[:-len('.py')])
+            except OSError:
+                continue  # e.g. a broken symlink
+
+    # check all the candidate subdirectories at once, after the directory
+    # itself has been read completely and its handle released
+    subpackages = []
+    namespace_packages = []
+    for name in dirnames:
+        path = os.path.join(package_dir, name)
+        if os.path.isfile(os.path.join(path, '__init__.py')):
+            subpackages.append(name)
+        elif namespaces and HAS_PEP420 and _is_namespace_dir(name, path):
+            namespace_packages.append(name)
+
+    children = subpackages + namespace_packages + [m for m in submodules
+                                           if m != '__init__']
+    return PackageListing(children=children, subdirs=subdirs)
+
+
+def _is_namespace_dir(name, path):
+    """Check whether a directory without `__init__.py`
+    should be treated as a namespace package.
+    """
+    if not _is_package_name(name):
+        return False
+    try:
+        with scandir(path) as entries:
+            return any(entry.name.endswith('.py') and entry.is_file()
+                       for entry in entries)
+    except OSError:
+        return False
+
+
+_identifier_re = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _is_package_name(name):
+    """Check whether a directory of given name can be a subpackage."""
+    if name == '__pycache__':
+        return False
+    if hasattr(name, 'isidentifier'):
+        return name.isidentifier()
+    return _identifier_re.match(name) is not None
+
+
+def find_archive(path):
+    """Find the zip archive that given path points inside of.
+
+    :param path: Path to a file or directory inside an archive,
+                 like ``archive.zip/package/subpackage``
+    :return: Path to the archive, or ``None`` if ``path`` is not inside one
+    """
+    parent = os.path.dirname(path)
+    while parent != path:
+        if os.path.isfile(parent):
+            import zipfile
+            return parent if zipfile.is_zipfile(parent) else None
+        path, parent = parent, os.path.dirname(parent)
+
+
+class ArchiveIndex(object):
+    """Index of package children inside a zip archive
+    (such as a zipapp, or a wheel/egg imported through ``zipimport``),
+    built from the archive's central directory.
+
+    Indexes are shared: every archive is read only once,
+    no matter how many of the packages inside it are listed,
+    and read again only if the archive file changes.
+    """
+    _cache = {}
+    _cache_lock = threading.Lock()
+
+    def __init__(self, archive):
+        """Constructor.
+
+        :param archive: Path to the zip archive
+        :raise IOError: If the archive cannot be read
+        """
+        self.archive = archive
+        self._packages = {}
+        self._modules = {}
+
+        import zipfile
+        zip_file = zipfile.ZipFile(archive)
+        try:
+            names = zip_file.namelist()
+        finally:
+            zip_file.close()
+
+        module_dirs = set()
+        for name in names:
+            dirname, _, filename = name.rpartition('/')
+            root, ext = os.path.splitext(filename)
+            if ext not in ('.py', '.pyc'):
+                continue
+            module_dirs.add(dirname)
+            if root == '__init__':
+                parent, _, package = dirname.rpartition('/')
+                self._add(self._packages, parent, package)
+            else:
+                self._add(self._modules, dirname, root)
+
+        self._namespaces = {}
+        if HAS_PEP420:
+            for dirname in sorted(module_dirs):
+                parent, _, package = dirname.rpartition('/')
+                if package in self._packages.get(parent, ()):
+                    continue
+                if _is_package_name(package):
+                    self._add(self._namespaces, parent, package)
+
+    @classmethod
+    def for_archive(cls, archive):
+        """Return an up-to-date index of given archive,
+        reusing a previously built one if possible.
+
+        :raise IOError: If the archive cannot be read
+        """
+        st = os.stat(archive)
+        key = (st.st_mtime, st.st_size)
+        with cls._cache_lock:
+            entry = cls._cache.get(archive)
+        if entry is not None and entry[0] == key:
+            return entry[1]
+
+        index = cls(archive)
+        with cls._cache_lock:
+            cls._cache[archive] = (key, index)
+        return index
+
+    def list(self, package_dir, namespaces=False):
+        """List the children of a package directory inside the archive.
+
+        :param package_dir: Package directory as path that starts
+                            with the archive path, like `__file__`
+                            of modules imported from the archive
+        :param namespaces: Whether subdirectories without `__init__.py`
+                           should also be listed, as namespace subpackages
+        :return: :class:`PackageListing`
+        """
+        inner_dir = os.path.relpath(package_dir, self.archive)
+        inner_dir = '' if inner_dir == os.curdir \
+            else inner_dir.replace(os.sep, '/')
+
+        subpackages = self._packages.get(inner_dir, [])
+        if namespaces:
+            subpackages = subpackages + self._namespaces.get(inner_dir, [])
+        children = subpackages + [m for m in self._modules.get(inner_dir, [])
+                                  if m not in subpackages]
+        return PackageListing(children=children, subdirs={})
+
+    def _add(self, index, dirname, name):
+        names = index.setdefault(dirname, [])
+        if name not in names:
+            names.append(name)
@@ -0,0 +1,242 @@
+"""
+Ahead-of-time manifests of recursively imported package trees.
+"""
+import os
+import sys
+import threading
+import warnings
+
+from recursely.cache import _mtime, _replace
+from recursely.lazy import LazyChildren, materialize
+from recursely.listing import ArchiveIndex, find_archive, scan_package_dir
+
+
+__all__ = ['ImportManifest', 'StaleManifestWarning', 'freeze']
+
+
+class StaleManifestWarning(RuntimeWarning):
+    """Warning issued when a package has changed since the manifest
+    was generated, and its children have to be discovered anew.
+    """
+
+
+class ImportManifest(object):
+    """Static manifest of recursively imported packages,
+    generated ahead of time with :func:`freeze`
+    (or ``python -m recursely freeze``).
+
+    For every package, the manifest holds its children in import order
+    (split by the directories in package's ``__path__``), names exported
+    by its children if it's a "star" import, and modification times
+    of all the directories that the listing depends on.
+
+    Unlike :class:`ManifestCache`, the manifest is never updated
+    at runtime. If a package is found to be stale, a
+    :class:`StaleManifestWarning` is issued and the importer falls back
+    to listing the package directories.
+    """
+    #: Version of the file format; files with different one are ignored
+    VERSION = 1
+
+    def __init__(self, filename=None, packages=None, verify=True):
+        """Constructor.
+
+        :param filename: Path to the manifest file
+        :param packages: Manifest data to use instead of reading a file,
+                         as produced by :func:`freeze`
+        :param verify: Whether to check modification times of package
+                       directories against those recorded in the manifest.
+                       Without verification, no filesystem access at all
+                       is necessary to obtain the children of a package.
+        """
+        self.filename = filename
+        self.verify = verify
+        self._packages = packages
+        self._stale = set()
+        self._lock = threading.Lock()
+
+    def __contains__(self, name):
+        return name in self._load()
+
+    def __iter__(self):
+        return iter(sorted(self._load()))
+
+    def __len__(self):
+        return len(self._load())
+
+    def get(self, name):
+        """Return the manifest entry for package of given name, if any.
+
+        :return: Dictionary with ``'path'`` (list of pairs of package
+                 directories and their children) and ``'mtimes'``,
+                 or ``None``
+        """
+        return self._load().get(name)
+
+    def lookup(self, module):
+        """Return the children of given package, as recorded in the manifest.
+
+        :param module: Package module object
+        :return: List of ``(package_dir, children)`` pairs for every
+                 directory in package's ``__path__``, or ``None`` if
+                 the package is not in manifest or its entry is stale
+        """
+        name = module.__name__
+        entry = self.get(name)
+        if entry is None:
+            return None
+
+        path = entry['path']
+        package_dirs = list(getattr(module, '__path__', None) or ())
+        if package_dirs != [package_dir for package_dir, _ in path] or \
+                (self.verify and not self._is_fresh(entry)):
+            self._warn_stale(name)
+            return None
+        return [(package_dir, list(children))
+                for package_dir, children in path]
+
+    def save(self, filename=None):
+        """Write the manifest to a file, atomically.
+
+        :param filename: Path to the manifest file;
+                         defaults to the one passed to constructor
+        """
+        import json
+        filename = filename or self.filename
+        tmp_filename = '%s.%s.tmp' % (filename, os.getpid())
+        try:
+            with open(tmp_filename, 'w') as f:
+                json.dump({'version': self.VERSION,
+                           'packages': self._load()}, f,
+                          indent=1, sort_keys=True)
+            _replace(tmp_filename, filename)
+        except Exception:
+            if os.path.exists(tmp_filename):
+                os.remove(tmp_filename)
+            raise
+
+    def _is_fresh(self, entry):
+        """Check whether modification times of all the paths
+        that given manifest entry depends on are still the same.
+        """
+        for path, mtime in entry['mtimes'].items():
+            try:
+                if _mtime(os.stat(path)) != mtime:
+                    return False
+            except OSError:
+                return False
+        return True
+
+    def _warn_stale(self, name):
+        """Warn about stale manifest entry, once per package."""
+        with self._lock:
+            if name in self._stale:
+                return
+            self._stale.add(name)
+        warnings.warn("manifest %s is stale for package %s; "
+                      "its children will be discovered anew" % (
+                          self.filename or '', name),
+                      StaleManifestWarning, stacklevel=2)
+
+    def _load(self):
+        """Load the manifest from disk, unless it has been loaded already.
+        :return: Dictionary of manifest entries
+        """
+        if self._packages is None:
+            import json
+            packages = {}
+            try:
+                with open(self.filename) as f:
+                    data = json.load(f)
+                if data.get('version') == self.VERSION:
+                    packages = data['packages']
+                else:
+                    warnings.warn("manifest %s has unsupported version %r" % (
+                        self.filename, data.get('version')),
+                        StaleManifestWarning, stacklevel=3)
+            except (IOError, OSError, ValueError, KeyError,
+                    AttributeError) as e:
+                warnings.warn("cannot read manifest %s: %s" % (
+                    self.filename, e), StaleManifestWarning, stacklevel=3)
+            self._packages = packages
+        return self._packages
+
+
+def freeze(packages):
+    """Import trees of given packages and record them in a manifest.
+
+    The packages are imported with a fresh :class:`RecursiveImporter`
+    that is applied to them the same way a retroactive ``install()`` does,
+    and lazily imported ones are materialized fully.
+
+    :param packages: Names of top-level recursive packages
+    :return: :class:`ImportManifest`
+    """
+    from importlib import import_module
+    from recursely.importer import RecursiveImporter
+    importer = RecursiveImporter()
+
+    def in_trees(name):
+        return any(name == p or name.startswith(p + '.') for p in packages)
+
+    for package in packages:
+        import_module(package)
+
+    # apply the importer until no more packages get expanded,
+    # since subpackages with their own ``__recursive__`` directive
+    # are normally left for the import hook to handle
+    seen = None
+    while True:
+        modules = [m for name, m in list(sys.modules.items())
+                   if m is not None and in_trees(name)]
+        for module in modules:
+            importer.recurse(module)
+            materialize(module)
+        names = set(m.__name__ for m in modules)
+        if names == seen:
+            break
+        seen = names
+
+    entries = {}
+    for name in sorted(seen):
+        module = sys.modules[name]
+        children = importer.expanded_packages.get(module)
+        if children is None:
+            lazy_children = LazyChildren.of(module)
+            if lazy_children is None:
+                continue
+            children = lazy_children.children
+        entries[name] = _freeze_package(module, children)
+    return ImportManifest(packages=entries)
+
+
+def _freeze_package(module, children):
+    """Create the manifest entry for a single package.
+
+    :param children: Package's children, in import order
+    """
+    path = []
+    mtimes = {}
+    remaining = list(children)
+    for package_dir in module.__path__:
+        if os.path.isdir(package_dir):
+            # (namespace subpackages are listed only to tell which
+            # directory the children are in; those not imported are ignored)
+            listing = scan_package_dir(package_dir, namespaces=True)
+            mtimes[package_dir] = _mtime(os.stat(package_dir))
+            for subdir, st in listing.package_subdirs.items():
+                mtimes[os.path.join(package_dir, subdir)] = _mtime(st)
+        else:
+            archive = find_archive(package_dir)
+            if archive is None:
+                continue
+            listing = ArchiveIndex.for_archive(archive).list(
+                package_dir, namespaces=True)
+            mtimes[archive] = _mtime(os.stat(archive))
+
+        dir_children = [c for c in listing.children if c in remaining]
+        for child in dir_children:
+            remaining.remove(child)
+        path.append([package_dir, dir_children])
+
+    return {'path': path, 'mtimes': mtimes}
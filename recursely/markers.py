@@ -0,0 +1,167 @@
+"""
+Scanning source files of child modules for content markers.
+"""
+import os
+import re
+import threading
+
+from recursely._compat import text_type
+from recursely.cache import _mtime
+
+
+__all__ = ['Marker', 'MarkerScanner']
+
+
+_pattern_type = type(re.compile(''))
+
+
+class Marker(object):
+    """Pattern that the source of a child module has to contain
+    for the module to be imported, e.g. ``b'@app.route'``.
+
+    Strings are searched for literally (text ones encoded as UTF-8),
+    unless ``regex=True`` is given; compiled patterns are always
+    treated as regular expressions. Regular expressions are matched
+    against the UTF-8 encoded source.
+    """
+    def __init__(self, pattern, regex=False):
+        """Constructor.
+
+        :param pattern: ``bytes``, ``str`` or compiled regular expression
+        :param regex: Whether a string pattern is a regular expression
+        :raise ValueError: If the pattern is of any other type, or empty
+        """
+        if isinstance(pattern, Marker):
+            pattern, regex = pattern.pattern, pattern.regex
+        if not pattern:
+            raise ValueError("marker must not be empty")
+
+        self.pattern = pattern
+        self._regex = None
+        if isinstance(pattern, (bytes, text_type)):
+            source = pattern if isinstance(pattern, bytes) \
+                else pattern.encode('utf-8')
+            if regex:
+                self._regex = re.compile(source)
+                self.key = 're:0:' + source.decode('latin-1')
+            else:
+                self._literal = source
+                self.key = 'b:' + source.decode('latin-1')
+        elif isinstance(pattern, _pattern_type):
+            source = pattern.pattern
+            if not isinstance(source, bytes):
+                source = source.encode('utf-8')
+                flags = pattern.flags & ~re.UNICODE
+            else:
+                flags = pattern.flags
+            self._regex = re.compile(source, flags)
+            self.key = 're:%d:%s' % (flags, source.decode('latin-1'))
+        else:
+            raise ValueError("invalid marker: %r" % (pattern,))
+
+    @classmethod
+    def parse(cls, value):
+        """Parse the marker given in a ``__recursive__`` directive.
+
+        Besides whatever the constructor accepts, the marker can be
+        a dictionary like ``{'regex': '^class .*Model'}``,
+        which (unlike a compiled pattern) can be read from
+        `__init__.py` without executing it.
+
+        :return: :class:`Marker`
+        :raise ValueError: If the value is not a valid marker
+        """
+        if isinstance(value, dict):
+            if set(value) != set(['regex']):
+                raise ValueError("invalid marker: %r" % (value,))
+            return cls(value['regex'], regex=True)
+        return cls(value)
+
+    @property
+    def regex(self):
+        """Whether the marker is a regular expression."""
+        return self._regex is not None
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self.pattern)
+
+    def __eq__(self, other):
+        return isinstance(other, Marker) and self.key == other.key
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def search(self, data):
+        """Check whether the marker occurs in given data.
+
+        :param data: Bytes, or a buffer like ``mmap``
+        """
+        if self._regex is None:
+            return data.find(self._literal) >= 0
+        return self._regex.search(data) is not None
+
+
+class MarkerScanner(object):
+    """Tells which source files contain given :class:`Marker`.
+
+    Files are memory-mapped and searched without being read
+    into Python objects. Results are remembered by file's modification
+    time and size, and persisted in :class:`ManifestCache` if one is given,
+    so that unchanged files aren't scanned again on subsequent runs.
+    """
+    def __init__(self, cache=None):
+        """Constructor.
+
+        :param cache: Optional :class:`ManifestCache` to persist results in
+        """
+        self.cache = cache
+        self._results = {}  # (path, marker key) -> (mtime, size, matched)
+        self._lock = threading.Lock()
+
+        #: Number of files that had to be scanned
+        self.scanned = 0
+
+    def matches(self, path, marker, file_stat=None):
+        """Check whether given source file contains the marker.
+
+        :param path: Path to the file
+        :param marker: :class:`Marker`
+        :param file_stat: Optional ``stat`` result for the file
+        :return: Whether the marker has been found
+        :raise OSError: If the file cannot be accessed
+        """
+        if file_stat is None:
+            file_stat = os.stat(path)
+        mtime, size = _mtime(file_stat), file_stat.st_size
+
+        result = self._results.get((path, marker.key))
+        if result is not None and result[:2] == (mtime, size):
+            return result[2]
+        matched = None
+        if self.cache is not None:
+            matched = self.cache.lookup_scan(path, file_stat, marker.key)
+        if matched is None:
+            matched = self._scan(path, marker, size)
+            if self.cache is not None:
+                self.cache.store_scan(path, file_stat, marker.key, matched)
+
+        with self._lock:
+            self._results[(path, marker.key)] = (mtime, size, matched)
+        return matched
+
+    def _scan(self, path, marker, size):
+        import mmap
+        with self._lock:
+            self.scanned += 1
+        with open(path, 'rb') as f:
+            if size == 0:
+                return False  # empty files cannot be mapped
+            data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            try:
+                return marker.search(data)
+            finally:
+                data.close()
+
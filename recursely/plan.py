@@ -0,0 +1,262 @@
+"""
+Planning recursive imports without executing any code.
+"""
+import ast
+import os
+
+from recursely._compat import HAS_PEP451, imp
+from recursely.directive import Directive
+from recursely.hook import ImportHook
+from recursely.importer import RecursiveImporter
+
+
+__all__ = ['PlanNode', 'plan']
+
+
+class PlanNode(object):
+    """Module in the plan of a recursive import, as returned by :func:`plan`.
+
+    :param name: Fully qualified name of the module
+    :param filename: Path to module's source file (`__init__.py`
+                     for packages), or ``None`` for namespace packages
+    :param size: Size of the source file in bytes
+    :param is_package: Whether the module is a package
+    :param directive: :class:`Directive` that applies to package's
+                      children, i.e. its own or the one inherited
+                      from its ancestors, if any
+    :param children: List of child :class:`PlanNode`\\ s, in import order
+    """
+    def __init__(self, name, filename=None, size=0, is_package=False,
+                 directive=None, children=None):
+        self.name = name
+        self.filename = filename
+        self.size = size
+        self.is_package = is_package
+        self.directive = directive
+        self.children = list(children or ())
+
+    def __repr__(self):
+        return '<%s %s (%d module(s), %d bytes)>' % (
+            self.__class__.__name__, self.name, len(self), self.total_size)
+
+    def __len__(self):
+        return sum(1 for _ in self.walk())
+
+    @property
+    def total_size(self):
+        """Total size of source files of this module and its descendants."""
+        return sum(node.size for node in self.walk())
+
+    def walk(self):
+        """Iterate over this module and all its descendants,
+        in the order they would be imported.
+        """
+        yield self
+        for child in self.children:
+            for node in child.walk():
+                yield node
+
+    def as_dict(self):
+        """Return the plan as a dictionary, suitable for saving as JSON."""
+        return {'name': self.name,
+                'filename': self.filename,
+                'size': self.size,
+                'total_size': self.total_size,
+                'package': self.is_package,
+                'mode': None if self.directive is None
+                else self.directive.mode,
+                'children': [child.as_dict() for child in self.children]}
+
+    def format(self):
+        """Format the plan as an indented tree.
+        :return: List of lines
+        """
+        lines = []
+        self._format(lines, depth=0)
+        return lines
+
+    def _format(self, lines, depth):
+        size = '%d bytes' % self.size
+        if self.children:
+            size += ', %d in total' % self.total_size
+        mode = ''
+        if self.directive is not None and self.directive.mode is not True:
+            mode = ' [%s]' % self.directive.mode
+        lines.append('%s%s%s (%s)' % ('  ' * depth, self.name, mode, size))
+        for child in self.children:
+            child._format(lines, depth + 1)
+
+
+def plan(package, importer=None):
+    """Find out which modules a recursive import of given package
+    would import, and in what order, without importing any of them.
+
+    Children of packages are listed the same way
+    :class:`RecursiveImporter` lists them, and filtered according to
+    ``__recursive__`` directives. Those are read from packages'
+    `__init__.py` files, as long as they're literals; any other value
+    is assumed to be ``True``. Only packages on the filesystem (rather
+    than in zip archives) are planned, and their ``__path__`` is assumed
+    not to be modified by their `__init__.py`.
+
+    Children of packages imported with ``'lazy'`` (or ``'background'``)
+    directives are planned as well, though they're imported only
+    when accessed (or on a separate thread).
+
+    :param package: Name of a recursive package
+    :param importer: Optional :class:`RecursiveImporter` whose global
+                     filters, and cached results of scanning for markers,
+                     should be used
+    :return: :class:`PlanNode` of the package
+    :raise ImportError: If the package cannot be found
+    """
+    return _plan(package, importer)
+
+
+def _plan(package, importer=None, default=None):
+    """Plan the recursive import of given package.
+
+    :param default: Directive to assume if the package has none
+    """
+    importer = importer or RecursiveImporter()
+
+    filename, package_dirs = _find_package(package)
+    node = _plan_node(package, filename, is_package=bool(package_dirs))
+    directive = _read_directive(package, filename, importer.defaults)
+    if directive is None:
+        directive = default
+    if directive:
+        node.directive = directive
+        with importer._recursion():
+            _plan_children(importer, node, package_dirs)
+    return node
+
+
+def _plan_children(importer, node, package_dirs):
+    """Plan the import of children of a single package, recursively.
+
+    :param node: :class:`PlanNode` of the package, with its directive
+    """
+    name, directive = node.name, node.directive
+    if not directive.descends(name):
+        return
+    accept = None
+    if directive.is_filtered:
+        accept = lambda child: directive.accepts('%s.%s' % (name, child))
+
+    state = importer._state
+    entries = []
+    for package_dir in package_dirs:
+        try:
+            dir_stat = importer._stat_package_dir(package_dir)
+        except OSError:
+            continue
+        dir_id = (dir_stat.st_dev, dir_stat.st_ino)
+        if dir_id not in state.active_dirs:
+            entries.append((package_dir, dir_stat, dir_id))
+
+    dir_ids = set(dir_id for _, _, dir_id in entries)
+    state.active_dirs.update(dir_ids)
+    try:
+        listings = [(package_dir, importer._list_children(
+                        package_dir, dir_stat, accept=accept,
+                        namespaces=directive.namespaces))
+                    for package_dir, dir_stat, _ in entries]
+        listings = importer._filter_marked(listings, directive)
+        listed = [(package_dir, set(children))
+                  for package_dir, children in listings]
+
+        for child in importer._merge_children(listings):
+            fullname = '%s.%s' % (name, child)
+            child_dirs = []
+            for package_dir, children in listed:
+                path = os.path.join(package_dir, child)
+                if child in children and path in state.dir_stats:
+                    child_dirs.append(path)  # (listed as a subdirectory)
+            if not child_dirs:
+                module_file = next(
+                    os.path.join(package_dir, child + '.py')
+                    for package_dir, children in listed
+                    if child in children)
+                node.children.append(_plan_node(fullname, module_file))
+                continue
+
+            init_py = next((os.path.join(child_dir, '__init__.py')
+                            for child_dir in child_dirs
+                            if os.path.isfile(os.path.join(
+                                child_dir, '__init__.py'))), None)
+            child_node = _plan_node(fullname, init_py, is_package=True)
+            node.children.append(child_node)
+
+            child_directive = _read_directive(fullname, init_py,
+                                              importer.defaults)
+            if child_directive is False:
+                continue  # explicitly not recursive
+            child_node.directive = child_directive or directive
+            _plan_children(importer, child_node, child_dirs)
+    finally:
+        state.active_dirs.difference_update(dir_ids)
+
+
+def _plan_node(name, filename, is_package=False):
+    size = 0
+    if filename is not None:
+        try:
+            size = os.stat(filename).st_size
+        except OSError:
+            pass
+    return PlanNode(name, filename, size, is_package=is_package)
+
+
+def _find_package(name):
+    """Find given package without importing it.
+    :return: Tuple of path to its `__init__.py` (or ``None``),
+             and list of its directories (empty if it's not a package)
+    """
+    hook = ImportHook()
+    if HAS_PEP451:
+        spec = hook._find_inspected_spec(name)
+        filename = spec.origin
+        if filename is not None and not os.path.isfile(filename):
+            filename = None  # namespace package
+        return filename, list(spec.submodule_search_locations or ())
+
+    filename, pathname, description = hook._find_inspected_module(name)
+    if description[2] == imp.PKG_DIRECTORY:
+        return filename, [pathname]
+    return filename, []
+
+
+def _read_directive(name, init_py, defaults=None):
+    """Read the ``__recursive__`` directive of a package from the source
+    of its `__init__.py`, without executing it.
+
+    :param init_py: Path to `__init__.py`, or ``None``
+    :param defaults: Optional :class:`Directive` with global filters
+    :return: :class:`Directive`, ``False`` if the package
+             has a falsy directive, or ``None`` if it has none
+    """
+    if init_py is None:
+        return None  # namespace package
+    with open(init_py, 'rb') as f:
+        source = f.read()
+    if b'__recursive__' not in source:
+        return None  # (most packages, which needn't be parsed at all)
+
+    try:
+        tree = ast.parse(source, init_py)
+    except SyntaxError:
+        return None  # will be reported when importing it
+
+    value = None
+    for node in tree.body:
+        if isinstance(node, ast.Assign) and any(
+                isinstance(target, ast.Name) and target.id == '__recursive__'
+                for target in node.targets):
+            try:
+                value = ast.literal_eval(node.value)
+            except ValueError:
+                value = True
+    if value is None:
+        return None
+    return Directive.parse(value, root=name, defaults=defaults) or False
@@ -0,0 +1,198 @@
+"""
+Reading and compiling child modules ahead of their import.
+"""
+import os
+import sys
+import threading
+
+from recursely._compat import IS_PY3
+
+if IS_PY3:
+    from importlib.machinery import (SOURCE_SUFFIXES, FileFinder,
+                                     SourceFileLoader)
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:
+        ThreadPoolExecutor = None
+else:
+    ThreadPoolExecutor = None
+
+
+__all__ = ['Prefetcher']
+
+
+class Prefetcher(object):
+    """Prepares code objects of child modules on a pool of threads,
+    while their parent package is still importing them one by one.
+
+    Preparation is done by the standard ``SourceFileLoader.get_code``
+    -- reading the `.pyc` file and unmarshaling it if it's up to date,
+    or reading and compiling the source otherwise -- so the code objects
+    are exactly the same as those obtained during a regular import.
+
+    To have these code objects actually used, the directory of every
+    prefetched package gets a copy of its regular ``FileFinder``
+    in ``sys.path_importer_cache``, whose standard loader for source files
+    is wrapped to check for prefetched code first. Other loaders
+    of the finder (like custom ones set up through ``sys.path_hooks``)
+    are kept as they are, and the original finder is put back
+    on :meth:`shutdown`. Module lookup and execution therefore
+    still happen through the standard import system, in the same order.
+    Packages whose directories are handled by any other path hook,
+    or whose source files are loaded by a custom loader,
+    are not prefetched.
+    """
+    def __init__(self, workers):
+        """Constructor.
+
+        :param workers: Number of threads to prefetch the modules with
+        """
+        self.workers = workers
+        self._executor = None
+        self._futures = {}
+        self._finders = {}  # package_dir -> (installed, original) finder
+        self._lock = threading.Lock()
+
+    @classmethod
+    def is_supported(cls):
+        """Checks whether prefetching is possible on current Python."""
+        return ThreadPoolExecutor is not None
+
+    def prefetch(self, package_name, package_dir, children):
+        """Start preparing code for children of given package.
+
+        :param package_name: Fully qualified name of the package
+        :param package_dir: Package directory
+        :param children: Names of child modules and subpackages,
+                         as returned by ``RecursiveImporter._list_children``
+        """
+        if not self._install_finder(package_dir):
+            return
+
+        with self._lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(self.workers)
+            for child in children:
+                fullname = '%s.%s' % (package_name, child)
+                if fullname in sys.modules:
+                    continue
+                self._futures[fullname] = self._executor.submit(
+                    _prepare_code, fullname, os.path.join(package_dir, child))
+
+    def take(self, fullname, filename):
+        """Retrieve the prefetched code for given module,
+        waiting for it to be prepared if necessary.
+
+        :param fullname: Fully qualified name of the module
+        :param filename: Path to the module's source file
+        :return: Code object, or ``None`` if the module wasn't prefetched
+                 or preparing it has failed
+        """
+        with self._lock:
+            future = self._futures.pop(fullname, None)
+        if future is None:
+            return None
+
+        try:
+            code_filename, code = future.result()
+        except Exception:
+            return None  # let the regular loader report the error
+        return code if code_filename == filename else None
+
+    def shutdown(self):
+        """Drop all pending prefetches, stop the worker threads,
+        and put back the original finders of prefetched directories.
+        """
+        with self._lock:
+            executor, self._executor = self._executor, None
+            futures, self._futures = self._futures, {}
+            finders, self._finders = self._finders, {}
+        for future in futures.values():
+            future.cancel()
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+        for package_dir, (finder, original) in finders.items():
+            if sys.path_importer_cache.get(package_dir) is not finder:
+                continue  # replaced by someone else since
+            if original is None:
+                del sys.path_importer_cache[package_dir]
+            else:
+                sys.path_importer_cache[package_dir] = original
+
+    def _install_finder(self, package_dir):
+        """Ensure that modules from given directory will be found
+        by a finder using :class:`PrefetchedSourceFileLoader`.
+
+        :return: Whether that was possible
+        """
+        original = finder = sys.path_importer_cache.get(package_dir)
+        if finder is None:
+            # this is what ``PathFinder`` would do to obtain the finder
+            for hook in sys.path_hooks:
+                try:
+                    finder = hook(package_dir)
+                    break
+                except ImportError:
+                    continue
+
+        if getattr(finder, 'prefetcher', None) is self:
+            return True
+        if type(finder) is not FileFinder:
+            return False
+
+        # (``_loaders`` are the ``(suffix, loader)`` pairs the finder
+        # has been created with, in the order they are tried)
+        loaders = list(getattr(finder, '_loaders', ()))
+        if not any(suffix in SOURCE_SUFFIXES and loader is SourceFileLoader
+                   for suffix, loader in loaders):
+            return False  # source files are loaded by a custom loader
+
+        def source_loader(fullname, path):
+            return PrefetchedSourceFileLoader(fullname, path, self)
+
+        finder = FileFinder(package_dir, *[
+            (source_loader if loader is SourceFileLoader else loader,
+             [suffix])
+            for suffix, loader in loaders])
+        finder.prefetcher = self
+        with self._lock:
+            if package_dir not in self._finders:  # (unless another thread
+                                                  # has installed it)
+                self._finders[package_dir] = (finder, original)
+                sys.path_importer_cache[package_dir] = finder
+        return True
+
+
+if IS_PY3:
+    class PrefetchedSourceFileLoader(SourceFileLoader):
+        """Source file loader that uses code prepared by :class:`Prefetcher`,
+        if there is any, falling back to standard behavior otherwise.
+        """
+        def __init__(self, fullname, path, prefetcher):
+            super(PrefetchedSourceFileLoader, self).__init__(fullname, path)
+            self._prefetcher = prefetcher
+
+        def get_code(self, fullname):
+            prefetcher, self._prefetcher = self._prefetcher, None
+            if prefetcher is not None:
+                code = prefetcher.take(fullname, self.get_filename(fullname))
+                if code is not None:
+                    return code
+            return super(PrefetchedSourceFileLoader, self).get_code(fullname)
+
+
+def _prepare_code(fullname, path):
+    """Read and compile (or unmarshal) the code of a child module,
+    using the standard source file loader.
+
+    :param fullname: Fully qualified name of the module
+    :param path: Path to the module, without `.py` extension
+                 (or to the subpackage directory)
+    :return: Tuple of source filename and code object
+    """
+    if os.path.isdir(path):
+        filename = os.path.join(path, '__init__.py')
+    else:
+        filename = path + '.py'
+    return filename, SourceFileLoader(fullname, filename).get_code(fullname)
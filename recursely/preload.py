@@ -0,0 +1,86 @@
+"""
+Preloading recursive packages before forking worker processes.
+"""
+import gc
+import os
+import sys
+
+from recursely.lazy import materialize
+from recursely.utils import rss
+
+
+__all__ = ['PostForkImportWarning', 'PreloadReport', 'preload']
+
+
+class PostForkImportWarning(RuntimeWarning):
+    """Warning issued when a recursive package is imported for the first
+    time in a process that was forked after :func:`preload`.
+    Such package is not shared copy-on-write between worker processes.
+    """
+
+
+class PreloadReport(object):
+    """Summary of what :func:`preload` has loaded.
+
+    :param packages: Names of the preloaded packages
+    :param modules: Names of all modules imported by preloading
+    :param bytes: Growth of the process' resident memory, in bytes,
+                  or ``None`` if it cannot be measured on this platform
+    """
+    def __init__(self, packages, modules, bytes):
+        self.packages = packages
+        self.modules = modules
+        self.bytes = bytes
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self)
+
+    def __str__(self):
+        size = 'unknown size' if self.bytes is None \
+            else '%.1f MiB' % (self.bytes / (1024.0 * 1024))
+        return '%d module(s) from %s, %s' % (
+            len(self.modules), ', '.join(self.packages), size)
+
+
+def preload(importer, packages, collect=True, freeze=True):
+    """Fully import trees of given packages, in preparation for forking.
+
+    :param importer: Installed :class:`RecursiveImporter`
+    :param packages: Names (or module objects) of recursive packages
+    :param collect: Whether to run ``gc.collect()`` afterwards
+    :param freeze: Whether to run ``gc.freeze()`` afterwards
+                   (where available), so that garbage collections
+                   in forked processes don't touch (and copy)
+                   the memory pages of preloaded objects
+    :return: :class:`PreloadReport`
+    """
+    from importlib import import_module
+
+    modules_before = set(sys.modules)
+    rss_before = rss()
+
+    names = []
+    for package in packages:
+        if not hasattr(package, '__dict__'):
+            package = import_module(package)
+        importer.recurse(package)
+        materialize(package)
+        background_import = importer.background_imports.get(package.__name__)
+        if background_import is not None and background_import.started():
+            background_import.wait()
+        names.append(package.__name__)
+
+    if collect:
+        gc.collect()
+    if freeze and hasattr(gc, 'freeze'):
+        gc.freeze()
+
+    importer.preloaded_pid = os.getpid()
+
+    rss_after = rss()
+    return PreloadReport(
+        packages=names,
+        modules=sorted(set(sys.modules) - modules_before),
+        bytes=None if rss_before is None or rss_after is None
+        else rss_after - rss_before)
+
@@ -0,0 +1,236 @@
+"""
+Profiling of recursive imports.
+"""
+import functools
+import threading
+import time
+
+from recursely.utils import rss
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None  # Python < 3.4
+
+
+__all__ = ['ImportProfiler', 'ImportRecord']
+
+
+clock = getattr(time, 'perf_counter', time.time)
+
+
+class ImportRecord(object):
+    """Timing of a single child module imported recursively.
+
+    :param name: Fully qualified name of the module
+    :param parent: Name of the recursive parent package that imported it
+    :param wall: Total time spent importing the module, in seconds
+    :param self_time: Part of ``wall`` that wasn't spent importing
+                      other recursively imported modules
+    :param children: Records of modules recursively imported
+                     by this one (if it's a package)
+    :param allocated: Growth of memory allocated by Python while
+                      importing the module, in bytes (as traced by
+                      ``tracemalloc``), if memory is being profiled
+    :param self_allocated: Part of ``allocated`` that isn't attributed
+                           to other recursively imported modules
+    :param rss: Growth of process' resident memory while importing
+                the module, in bytes, if memory is being profiled
+    :param self_rss: Part of ``rss`` that isn't attributed
+                     to other recursively imported modules
+    """
+    __slots__ = ('name', 'parent', 'wall', 'self_time', 'children',
+                 'allocated', 'self_allocated', 'rss', 'self_rss')
+
+    def __init__(self, name, parent):
+        self.name = name
+        self.parent = parent
+        self.wall = 0.0
+        self.self_time = 0.0
+        self.children = []
+        self.allocated = self.self_allocated = None
+        self.rss = self.self_rss = None
+
+    def __repr__(self):
+        return '<%s %s (%.3f ms)>' % (
+            self.__class__.__name__, self.name, self.wall * 1000)
+
+    @property
+    def cumulative(self):
+        """Self time of this module and all its recursive descendants."""
+        return self.self_time + sum(c.cumulative for c in self.children)
+
+    @property
+    def cumulative_allocated(self):
+        """Memory allocated by this module and all its recursive
+        descendants, or ``None`` if memory hasn't been profiled.
+        """
+        return self._rollup('self_allocated')
+
+    @property
+    def cumulative_rss(self):
+        """Resident memory growth attributed to this module and all its
+        recursive descendants, or ``None`` if it hasn't been measured.
+        """
+        return self._rollup('self_rss')
+
+    def as_dict(self):
+        """Return the record (and its descendants) as a dictionary."""
+        result = {'name': self.name,
+                  'parent': self.parent,
+                  'wall': self.wall,
+                  'self': self.self_time,
+                  'cumulative': self.cumulative,
+                  'children': [c.as_dict() for c in self.children]}
+        if self.allocated is not None:
+            result.update(allocated=self.allocated,
+                          self_allocated=self.self_allocated,
+                          cumulative_allocated=self.cumulative_allocated)
+        if self.rss is not None:
+            result.update(rss=self.rss, self_rss=self.self_rss,
+                          cumulative_rss=self.cumulative_rss)
+        return result
+
+    def _rollup(self, attr):
+        value = getattr(self, attr)
+        if value is None:
+            return None
+        return value + sum(c._rollup(attr) or 0 for c in self.children)
+
+
+class ImportProfiler(object):
+    """Collects :class:`ImportRecord`\\ s for modules imported
+    by :class:`RecursiveImporter`, arranged into a tree that follows
+    the parent -> child edges of recursive imports.
+    """
+    def __init__(self, memory=False):
+        """Constructor.
+
+        :param memory: Whether to also measure memory taken by every
+                       module. This starts ``tracemalloc`` (if available,
+                       and not started already), which slows down
+                       all allocations, so it's best used only to find out
+                       which modules are worth excluding or making lazy.
+        """
+        self.roots = []
+        self.memory = memory
+        self._records = {}
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        if memory and tracemalloc is not None and \
+                not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def wrap(self, import_child_module):
+        """Decorate ``RecursiveImporter._import_child_module``
+        so that every call to it is timed.
+        """
+        @functools.wraps(import_child_module)
+        def wrapper(module, child):
+            record = ImportRecord('%s.%s' % (module.__name__, child),
+                                  parent=module.__name__)
+            with self._lock:
+                parent = self._records.get(record.parent)
+                siblings = self.roots if parent is None else parent.children
+                siblings.append(record)
+                self._records[record.name] = record
+
+            stack = self._local.__dict__.setdefault('stack', [])
+            stack.append(record)
+            if self.memory:
+                memory_start = self._measure_memory()
+            start = clock()
+            try:
+                return import_child_module(module, child)
+            finally:
+                elapsed = clock() - start
+                stack.pop()
+                record.wall = elapsed
+                record.self_time += elapsed
+                if stack:
+                    stack[-1].self_time -= elapsed
+                if self.memory:
+                    self._attribute_memory(record, stack, memory_start)
+        return wrapper
+
+    def _measure_memory(self):
+        """Return the current amounts of memory allocated through Python
+        and resident in the process, either of which may be ``None``.
+        """
+        allocated = None
+        if tracemalloc is not None and tracemalloc.is_tracing():
+            allocated = tracemalloc.get_traced_memory()[0]
+        return allocated, rss()
+
+    def _attribute_memory(self, record, stack, start):
+        """Attribute the memory growth since ``start`` to given record,
+        and exclude it from the parent record's own usage.
+        """
+        end = self._measure_memory()
+        for i, attr in enumerate(('allocated', 'rss')):
+            if start[i] is None or end[i] is None:
+                continue
+            delta = end[i] - start[i]
+            self_attr = 'self_' + attr
+            setattr(record, attr, delta)
+            setattr(record, self_attr, (getattr(record, self_attr) or 0) +
+                    delta)
+            if stack:
+                parent = stack[-1]
+                setattr(parent, self_attr,
+                        (getattr(parent, self_attr) or 0) - delta)
+
+    def __iter__(self):
+        """Iterate over all records, depth-first."""
+        pending = list(reversed(self.roots))
+        while pending:
+            record = pending.pop()
+            yield record
+            pending.extend(reversed(record.children))
+
+    def as_dict(self):
+        """Return the whole tree as a list of nested dictionaries."""
+        return [r.as_dict() for r in self.roots]
+
+    def top(self, n=20, key='self_time'):
+        """Return ``n`` records with the highest value of given ``key``
+        (``'self_time'``, ``'wall'`` or ``'cumulative'``; or, if memory
+        is profiled: ``'self_allocated'``, ``'allocated'``,
+        ``'cumulative_allocated'``, and similarly for ``'rss'``).
+        """
+        return sorted(self, key=lambda r: getattr(r, key) or 0,
+                      reverse=True)[:n]
+
+    def report(self, n=20, key='self_time'):
+        """Format a textual report of ``n`` slowest imports.
+        :return: Report as string
+        """
+        lines = ['%10s %10s %10s  %s' % ('self ms', 'wall ms', 'cumul ms',
+                                          'module (parent)')]
+        for record in self.top(n, key):
+            lines.append('%10.3f %10.3f %10.3f  %s (%s)' % (
+                record.self_time * 1000, record.wall * 1000,
+                record.cumulative * 1000, record.name, record.parent))
+        return '\n'.join(lines)
+
+    def memory_report(self, n=20, key='cumulative_allocated'):
+        """Format a textual report of ``n`` modules that take
+        the most memory, along with their subtrees.
+        :return: Report as string
+        """
+        if not self.memory:
+            raise RuntimeError("memory is not being profiled")
+
+        def kib(value):
+            return '%12s' % ('-' if value is None
+                             else '%.1f' % (value / 1024.0))
+
+        lines = ['%12s %12s %12s %12s  %s' % (
+            'self KiB', 'subtree KiB', 'self RSS KiB', 'subtree RSS',
+            'module (parent)')]
+        for record in self.top(n, key):
+            lines.append('%s %s %s %s  %s (%s)' % (
+                kib(record.self_allocated), kib(record.cumulative_allocated),
+                kib(record.self_rss), kib(record.cumulative_rss),
+                record.name, record.parent))
+        return '\n'.join(lines)
@@ -0,0 +1,271 @@
+"""
+Refreshing recursive packages whose directories have changed at runtime.
+"""
+import os
+import struct
+import sys
+import threading
+import warnings
+
+from recursely.lazy import LazyChildren
+
+
+__all__ = ['RefreshReport', 'RefreshWarning', 'Watcher']
+
+
+class RefreshWarning(RuntimeWarning):
+    """Warning issued when a :class:`Watcher` fails to refresh a package
+    (e.g. because one of its new modules cannot be imported).
+    """
+
+
+class RefreshReport(object):
+    """Changes found by refreshing a recursive package.
+
+    :param package: Name of the refreshed package
+    :param added: Names of modules and subpackages that have been imported
+                  because they were added to the package tree
+    :param removed: Names of previously imported modules and subpackages
+                    that are no longer in the package tree.
+                    They are not unloaded.
+    """
+    def __init__(self, package, added=None, removed=None):
+        self.package = package
+        self.added = list(added or ())
+        self.removed = list(removed or ())
+
+    def __bool__(self):
+        return bool(self.added or self.removed)
+
+    __nonzero__ = __bool__
+
+    def __repr__(self):
+        return '<%s: %s>' % (self.__class__.__name__, self)
+
+    def __str__(self):
+        return '%s: %d added, %d removed' % (
+            self.package, len(self.added), len(self.removed))
+
+
+class Watcher(object):
+    """Background thread that refreshes recursive packages
+    whenever modules are added to or removed from their trees.
+
+    On Linux, changes are picked up through ``inotify``, so that only
+    the directories that have actually changed are listed again.
+    Elsewhere (or with ``inotify=False``), modification times of all
+    package directories are checked every ``interval`` seconds.
+    """
+    #: Time to wait for a burst of changes to finish, in seconds
+    SETTLE_INTERVAL = 0.1
+
+    def __init__(self, importer, packages, callback=None, interval=1.0,
+                 inotify=None):
+        """Constructor.
+
+        :param importer: Installed :class:`RecursiveImporter`
+        :param packages: Names of recursive packages to watch
+        :param callback: Optional function called with
+                         a :class:`RefreshReport` for every package
+                         that has changed
+        :param interval: How often to check for changes, in seconds
+        :param inotify: Whether to use ``inotify``. By default,
+                        it's used if available.
+        :raise RuntimeError: If ``inotify`` is requested but not available
+        """
+        self.importer = importer
+        self.packages = list(packages)
+        self.callback = callback
+        self.interval = interval
+        self.thread = None
+
+        self.inotify = None if inotify is False else _Inotify.create()
+        if inotify and self.inotify is None:
+            raise RuntimeError("inotify is not available")
+        self._stopped = threading.Event()
+
+    def start(self):
+        """Start watching on a new daemon thread.
+        :return: The watcher itself
+        """
+        if self.inotify is not None:
+            self._watch_dirs()
+        self.thread = threading.Thread(
+            target=self._run,
+            name='recursely-watcher-%s' % ','.join(self.packages))
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self, timeout=None):
+        """Stop watching, and wait until the thread has finished."""
+        self._stopped.set()
+        if self.thread is not None:
+            self.thread.join(timeout)
+        if self.inotify is not None:
+            self.inotify.close()
+
+    def refresh(self, changed_dirs=None):
+        """Refresh all the watched packages once.
+
+        :param changed_dirs: Optional collection of package directories
+                             known to have changed
+        :return: List of :class:`RefreshReport`\\ s of packages
+                 that have changed
+        """
+        reports = []
+        for name in self.packages:
+            module = sys.modules.get(name)
+            if module is None:
+                continue
+            report = self.importer.refresh(module, changed_dirs=changed_dirs)
+            if report:
+                reports.append(report)
+                if self.callback is not None:
+                    self.callback(report)
+        if self.inotify is not None:
+            self._watch_dirs()
+        return reports
+
+    def _run(self):
+        while not self._stopped.is_set():
+            if self.inotify is None:
+                if self._stopped.wait(self.interval):
+                    break
+                changed_dirs = None
+            else:
+                changed_dirs = self.inotify.read(self.interval)
+                if not changed_dirs:
+                    continue
+                while True:
+                    more = self.inotify.read(self.SETTLE_INTERVAL)
+                    if not more:
+                        break
+                    changed_dirs |= more
+            try:
+                self.refresh(changed_dirs)
+            except Exception:
+                warnings.warn("refreshing %s failed: %s" % (
+                    ', '.join(self.packages), sys.exc_info()[1]),
+                    RefreshWarning)
+
+    def _watch_dirs(self):
+        """Watch the directories of all expanded packages
+        within the trees of watched packages,
+        except those whose children are imported lazily.
+        """
+        prefixes = tuple(name + '.' for name in self.packages)
+        for name in self.importer.expanded_packages:
+            if name not in self.packages and not name.startswith(prefixes):
+                continue
+            package = sys.modules.get(name)
+            if LazyChildren.of(package) is not None:
+                continue
+            for package_dir in getattr(package, '__path__', None) or ():
+                if os.path.isdir(package_dir):
+                    self.inotify.watch(package_dir)
+
+
+class _Inotify(object):
+    """Minimal binding to Linux ``inotify`` (through ``ctypes``)
+    that reports which of the watched directories have changed.
+    """
+    IN_CLOSE_WRITE = 0x8
+    IN_MOVED_FROM = 0x40
+    IN_MOVED_TO = 0x80
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_IGNORED = 0x8000
+    IN_ONLYDIR = 0x1000000
+    IN_ISDIR = 0x40000000
+
+    MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO |
+            IN_CREATE | IN_DELETE | IN_ONLYDIR)
+
+    #: Header of ``struct inotify_event``, followed by the file name
+    EVENT = struct.Struct('iIII')
+
+    @classmethod
+    def create(cls):
+        """Create an ``inotify`` instance.
+        :return: :class:`_Inotify` or ``None`` if it's not supported
+        """
+        if not sys.platform.startswith('linux'):
+            return None
+        try:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                               use_errno=True)
+            fd = libc.inotify_init1(getattr(os, 'O_CLOEXEC', 0o2000000) |
+                                    os.O_NONBLOCK)
+        except (ImportError, OSError, AttributeError):
+            return None
+        return cls(libc, fd) if fd >= 0 else None
+
+    def __init__(self, libc, fd):
+        self.libc = libc
+        self.fd = fd
+        self._watches = {}  # watch descriptor -> (path, path to report)
+        self._watched = {}  # path -> path to report
+
+    def watch(self, path, report_as=None):
+        """Watch given directory for added and removed files.
+
+        :param report_as: Directory to report when this one changes,
+                          if it isn't the directory itself
+        """
+        report_as = report_as or path
+        if self._watched.get(path) == report_as:
+            return
+        encoded = path if isinstance(path, bytes) \
+            else path.encode(sys.getfilesystemencoding())
+        wd = self.libc.inotify_add_watch(self.fd, encoded, self.MASK)
+        if wd >= 0:
+            self._watches[wd] = (path, report_as)
+            self._watched[path] = report_as
+
+    def read(self, timeout):
+        """Wait for changes in the watched directories.
+
+        :param timeout: Maximum time to wait, in seconds
+        :return: Set of directories that have changed
+        """
+        import select
+        try:
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            data = os.read(self.fd, 64 * 1024) if ready else b''
+        except (OSError, select.error, ValueError):
+            return set()  # no events after all, or closed meanwhile
+
+        changed = set()
+        offset = 0
+        while offset + self.EVENT.size <= len(data):
+            wd, mask, _, length = self.EVENT.unpack_from(data, offset)
+            offset += self.EVENT.size
+            name = data[offset:offset + length].rstrip(b'\0') \
+                .decode(sys.getfilesystemencoding(), 'replace')
+            offset += length
+
+            if wd not in self._watches:
+                continue
+            path, report_as = self._watches[wd]
+            if mask & self.IN_IGNORED:  # directory is gone
+                del self._watches[wd]
+                self._watched.pop(path, None)
+                continue
+
+            is_dir = mask & self.IN_ISDIR
+            if name.endswith('.py') or (is_dir and name != '__pycache__'):
+                changed.add(report_as)
+                if is_dir and mask & (self.IN_CREATE | self.IN_MOVED_TO):
+                    # a new directory only becomes a subpackage once
+                    # its ``__init__.py`` (or any module) is there,
+                    # which is reported as a change of the parent
+                    self.watch(os.path.join(path, name), report_as=report_as)
+        return changed
+
+    def close(self):
+        if self.fd >= 0:
+            os.close(self.fd)
+            self.fd = -1
@@ -0,0 +1,163 @@
+"""
+Registries of packages known to the recursive importer.
+"""
+import sys
+import threading
+
+
+__all__ = ['DeferredChildren', 'ExpandedPackages', 'PackageRegistry']
+
+
+class PackageRegistry(object):
+    """Set of package names that can tell, in time proportional
+    only to the nesting depth of a name, whether a module belongs
+    to the tree of any of those packages.
+    """
+    def __init__(self, names=()):
+        self._names = set()
+        self._lock = threading.Lock()
+        for name in names:
+            self.add(name)
+
+    def __contains__(self, name):
+        return name in self._names
+
+    def __iter__(self):
+        return iter(sorted(self._names))
+
+    def __len__(self):
+        return len(self._names)
+
+    def add(self, name):
+        """Add a package to the registry."""
+        with self._lock:
+            self._names.add(name)
+
+    def covers(self, fullname):
+        """Check whether module of given name is one of the packages
+        in the registry, or is contained (at any depth) within one.
+        """
+        names = self._names
+        if fullname in names:
+            return True
+        i = fullname.find('.')
+        while i != -1:
+            if fullname[:i] in names:
+                return True
+            i = fullname.find('.', i + 1)
+        return False
+
+
+class ExpandedPackages(object):
+    """Registry of packages whose trees have been fully imported
+    (or made importable lazily) by the recursive importer,
+    along with their child lists.
+
+    Entries are tied to particular module objects, so a package
+    that gets removed from ``sys.modules`` and imported anew
+    is no longer considered expanded. (Module objects are held directly,
+    since they don't support weak references on Python 2.)
+    """
+    def __init__(self):
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, module):
+        return self.get(module) is not None
+
+    def __iter__(self):
+        with self._lock:
+            return iter(sorted(self._entries))
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, module, children):
+        """Record that given package has been expanded.
+
+        :param module: Package module object
+        :param children: Names of package's children, in import order
+        """
+        with self._lock:
+            self._entries[module.__name__] = (module, list(children))
+
+    def get(self, module):
+        """Return the children of given package,
+        or ``None`` if it hasn't been expanded.
+        """
+        entry = self._entries.get(module.__name__)
+        if entry is None or entry[0] is not module:
+            return None
+        return entry[1]
+
+    def as_dict(self):
+        """Return a dictionary mapping names of expanded packages
+        to lists of their children.
+        """
+        with self._lock:
+            entries = list(self._entries.items())
+        return dict((name, list(children))
+                    for name, (module, children) in entries
+                    if sys.modules.get(name) is module)
+
+
+class DeferredChildren(object):
+    """Registry of children that couldn't be imported while their package
+    was being expanded, because another thread was importing them
+    (and waiting for the package) at the time.
+
+    Such children are finished once the other thread's import completes,
+    and their package counts as expanded only after all of them are.
+    """
+    def __init__(self):
+        self._children = {}
+        self._pending = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, module):
+        with self._lock:
+            entry = self._pending.get(module.__name__)
+            return entry is not None and entry[0] is module
+
+    def __len__(self):
+        return len(self._children)
+
+    def add(self, module, child, children, directive):
+        """Record that a child of given package has been deferred.
+
+        :param module: Package module object
+        :param child: Name of the deferred child
+        :param children: Names of all package's children, in import order
+        :param directive: :class:`Directive` the package is expanded with
+        """
+        with self._lock:
+            self._children[module.__name__ + '.' + child] = (module, child,
+                                                             directive)
+            entry = self._pending.get(module.__name__)
+            if entry is None or entry[0] is not module:
+                entry = self._pending[module.__name__] = (
+                    module, list(children), set())
+            entry[2].add(child)
+
+    def complete(self, fullname):
+        """Take the deferred child module of given name off the registry,
+        once its import has finished.
+
+        :return: Tuple of package module object, child name, directive,
+                 and the list of all package's children if that was
+                 its last deferred child (``None`` otherwise);
+                 or ``None`` if the module hasn't been deferred
+        """
+        with self._lock:
+            deferred = self._children.pop(fullname, None)
+            if deferred is None:
+                return None
+            module, child, directive = deferred
+            entry = self._pending.get(module.__name__)
+            children = None
+            if entry is not None and entry[0] is module:
+                entry[2].discard(child)
+                if not entry[2]:
+                    del self._pending[module.__name__]
+                    children = entry[1]
+            return module, child, directive, children
@@ -2,11 +2,13 @@
 Utility module.
 """
 import functools
+import os
+import sys
 
 from recursely._compat import IS_PY3, metaclass
 
 
-__all__ = ['SentinelList']
+__all__ = ['FastSentinelList', 'SentinelList', 'rss']
 
 
 class SentinelListMetaclass(type):
@@ -93,3 +95,182 @@ class SentinelList(list):
 
         super(SentinelList, self).__init__(list(iterable) + sentinels)
         self._sentinels_count = len(sentinels)
+
+
+class FastSentinelList(list):
+    """Variant of :class:`SentinelList` that keeps its sentinels
+    at the end with constant-time bookkeeping.
+
+    Rather than removing the sentinels before every modification
+    and putting them back afterwards, all state-altering operations
+    are simply applied to the part of the list that precedes them,
+    with indices interpreted relative to that part (just like
+    in :class:`SentinelList`). Sentinel objects that are added
+    to the list again are dropped, so they never appear elsewhere.
+
+    Sentinels are also available as the ``sentinels`` tuple,
+    which allows for checking them without scanning the whole list.
+    """
+    def __init__(self, iterable, **kwargs):
+        """Constructor.
+
+        Single sentinel should be provided as keyword argument ``sentinel``.
+        Multiple sentinel element should be provided through ``sentinels``.
+        These two arguments are mutually exclusive.
+
+        Other than that, the constructor works the same way as in :class:`list`.
+        """
+        has_sentinel = 'sentinel' in kwargs
+        has_sentinels = 'sentinels' in kwargs
+        if not (has_sentinel or has_sentinels):
+            raise TypeError('sentinel(s) expected')
+        if has_sentinel and has_sentinels:
+            raise TypeError('ambiguous sentinel(s)')
+
+        if has_sentinel:
+            sentinels = [kwargs['sentinel']]
+        else:
+            sentinels = list(kwargs['sentinels'])
+
+        self.sentinels = tuple(sentinels)
+        self._sentinel_ids = frozenset(map(id, sentinels))
+        super(FastSentinelList, self).__init__(
+            self._without_sentinels(iterable) + sentinels)
+
+    # List operations
+
+    def append(self, obj):
+        if id(obj) not in self._sentinel_ids:
+            list.insert(self, self._head_length(), obj)
+
+    def extend(self, iterable):
+        head_length = self._head_length()
+        list.__setitem__(self, slice(head_length, head_length),
+                         self._without_sentinels(iterable))
+
+    def insert(self, index, obj):
+        if id(obj) not in self._sentinel_ids:
+            list.insert(self, self._clamp(index), obj)
+
+    def pop(self, index=-1):
+        return list.pop(self, self._check(index, "pop index out of range"))
+
+    def remove(self, obj):
+        del self[list.index(self, obj, 0, self._head_length())]
+
+    def clear(self):
+        list.__delitem__(self, slice(0, self._head_length()))
+
+    def reverse(self):
+        self._rewrite(lambda head: head.reverse())
+
+    def sort(self, *args, **kwargs):
+        self._rewrite(lambda head: head.sort(*args, **kwargs))
+
+    def __setitem__(self, index, value):
+        if isinstance(index, slice):
+            def setitem(head):
+                head[index] = value
+            self._rewrite(setitem)
+        elif id(value) in self._sentinel_ids:
+            del self[index]
+        else:
+            list.__setitem__(self, self._check(index), value)
+
+    def __delitem__(self, index):
+        if isinstance(index, slice):
+            def delitem(head):
+                del head[index]
+            self._rewrite(delitem)
+        else:
+            list.__delitem__(self, self._check(index))
+
+    def __iadd__(self, other):
+        self.extend(other)
+        return self
+
+    def __imul__(self, n):
+        def imul(head):
+            head *= n
+        self._rewrite(imul)
+        return self
+
+    if not IS_PY3:
+        def __setslice__(self, i, j, sequence):
+            self.__setitem__(slice(i, j), sequence)
+
+        def __delslice__(self, i, j):
+            self.__delitem__(slice(i, j))
+
+    # Utility methods
+
+    def _head_length(self):
+        """Return the length of the part of list that precedes sentinels."""
+        return len(self) - len(self.sentinels)
+
+    def _without_sentinels(self, iterable):
+        """Return a list of elements from ``iterable`` that aren't sentinels.
+        """
+        sentinel_ids = self._sentinel_ids
+        return [obj for obj in iterable if id(obj) not in sentinel_ids]
+
+    def _clamp(self, index):
+        """Translate an insertion index relative to the part of list
+        preceding the sentinels, clamping it like :meth:`list.insert` does.
+        """
+        head_length = self._head_length()
+        if index < 0:
+            return max(0, index + head_length)
+        return min(index, head_length)
+
+    def _check(self, index, message="list index out of range"):
+        """Translate an element index relative to the part of list
+        preceding the sentinels.
+
+        :raise IndexError: If the index is out of bounds of that part
+        """
+        head_length = self._head_length()
+        if index < 0:
+            index += head_length
+        if not 0 <= index < head_length:
+            raise IndexError(message)
+        return index
+
+    def _rewrite(self, func):
+        """Apply a function modifying a list in place to the part of list
+        that precedes the sentinels. Meant for operations that would
+        take linear time anyway.
+        """
+        head_length = self._head_length()
+        head = list.__getitem__(self, slice(0, head_length))
+        func(head)
+        list.__setitem__(self, slice(0, head_length),
+                         self._without_sentinels(head))
+
+
+# Utility functions
+
+def rss():
+    """Return the resident memory size of current process, in bytes,
+    or ``None`` if it cannot be determined.
+    """
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * _page_size()
+    except (IOError, OSError, ValueError, IndexError):
+        pass
+
+    try:
+        import resource
+    except ImportError:
+        return None
+    # (only peak usage is available here, in kilobytes except on OS X)
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return max_rss if sys.platform == 'darwin' else max_rss * 1024
+
+
+def _page_size():
+    try:
+        return os.sysconf('SC_PAGE_SIZE')
+    except (AttributeError, ValueError, OSError):
+        return 4096
@@ -0,0 +1,69 @@
+"""
+Temporary directory trees for tests.
+"""
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+from tests._compat import TestCase
+
+
+class TempTree(TestCase):
+    """Base class for test cases operating on a temporary directory tree,
+    e.g. of packages that are imported from it.
+    """
+    #: Names of top-level packages and modules in the tree,
+    #: removed from ``sys.modules`` (along with their submodules)
+    #: after every test
+    PACKAGES = ()
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self._sys_path = []
+
+    def tearDown(self):
+        for path in self._sys_path:
+            if path in sys.path:
+                sys.path.remove(path)
+        self.forget()
+        shutil.rmtree(self.root)
+
+    def path(self, *path):
+        """Return the absolute path of given file or directory in the tree.
+        """
+        return os.path.join(self.root, *path)
+
+    def write(self, path, source='', age=None):
+        """Write a file in the tree, creating its directories if needed.
+
+        :param path: Path of the file, relative to tree's root
+        :param source: Content of the file
+        :param age: Optional number of seconds to set file's
+                    modification time back by
+        :return: Absolute path of the file
+        """
+        path = self.path(path)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, 'w') as f:
+            f.write(source)
+        if age is not None:
+            past = time.time() - age
+            os.utime(path, (past, past))
+        return path
+
+    def add_to_sys_path(self, path=''):
+        """Put given directory of the tree at the front of ``sys.path``,
+        until the end of the test.
+        """
+        path = self.path(path) if path else self.root
+        sys.path.insert(0, path)
+        self._sys_path.append(path)
+
+    def forget(self):
+        """Remove modules of the tree from ``sys.modules``."""
+        for name in list(sys.modules):
+            if name.split('.')[0] in self.PACKAGES:
+                del sys.modules[name]
@@ -0,0 +1,4 @@
+"""
+Package imported lazily.
+"""
+__recursive__ = 'lazy'
@@ -0,0 +1,4 @@
+"""
+Module used by tests.
+"""
+A = 1
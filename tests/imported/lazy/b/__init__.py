@@ -0,0 +1,4 @@
+"""
+Packages used by tests.
+"""
+B = 2
@@ -0,0 +1,4 @@
+"""
+Module used by tests.
+"""
+C = 3
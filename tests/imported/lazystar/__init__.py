@@ -0,0 +1,4 @@
+"""
+Package imported lazily, as a "star" import.
+"""
+__recursive__ = 'lazy*'
@@ -0,0 +1,5 @@
+__all__ = ['A', 'shared']
+
+A = 1
+shared = 'a'
+hidden = True
@@ -0,0 +1,3 @@
+B = 2
+shared = 'b'
+_private = 0
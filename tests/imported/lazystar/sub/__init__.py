@@ -0,0 +1 @@
+S = 4
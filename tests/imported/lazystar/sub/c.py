@@ -0,0 +1 @@
+C = 5
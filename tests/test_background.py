@@ -0,0 +1,74 @@
+"""
+Tests for the .background module.
+"""
+import sys
+import threading
+import types
+
+import recursely
+from tests._tree import TempTree
+
+
+class Background(TempTree):
+    """Tests for ``__recursive__ = 'background'``."""
+    PACKAGES = ('bgpkg', 'bg_gate')
+
+    def setUp(self):
+        super(Background, self).setUp()
+        self.write('bgpkg/__init__.py', '__recursive__ = "background"\n')
+        self.write('bgpkg/a.py', 'A = 1\n')
+        self.write('bgpkg/gated.py',
+                   'import bg_gate\nbg_gate.event.wait(10)\nG = 2\n')
+        self.write('bgpkg/sub/__init__.py', '')
+        self.write('bgpkg/sub/b.py', 'B = 3\n')
+
+        gate = types.ModuleType('bg_gate')
+        gate.event = threading.Event()
+        self.gate = sys.modules['bg_gate'] = gate
+
+        self.add_to_sys_path()
+        recursely.install()
+
+    def tearDown(self):
+        self.gate.event.set()
+        importer = recursely.RecursiveImporter.get_installed()
+        for background_import in importer.background_imports:
+            if background_import.thread is not None:
+                background_import.thread.join(10)
+
+        sys.meta_path = [ih for ih in sys.meta_path
+                         if type(ih) is not recursely.RecursiveImporter]
+        super(Background, self).tearDown()
+
+    def test_wait(self):
+        import bgpkg as pkg
+        self.assertFalse(recursely.wait(pkg, timeout=0.01))
+
+        self.gate.event.set()
+        self.assertTrue(recursely.wait('bgpkg', timeout=10))
+        self.assertEqual(2, pkg.gated.G)
+        self.assertEqual(3, pkg.sub.b.B)
+        self.assertEqual(['a', 'gated', 'sub'],
+                         sorted(recursely.expanded_packages()['bgpkg']))
+
+    def test_when_ready(self):
+        ready = []
+        recursely.when_ready('bgpkg', ready.append)
+        import bgpkg as pkg
+        self.assertEqual([], ready)
+
+        self.gate.event.set()
+        recursely.wait(pkg, timeout=10)
+        self.assertEqual(1, len(ready))
+        self.assertIs(pkg, ready[0].module)
+        self.assertIsNone(ready[0].exception)
+
+    def test_failure(self):
+        self.write('bgpkg/broken.py', 'raise ValueError("broken")\n')
+        self.gate.event.set()
+        import bgpkg  # noqa
+        with self.assertRaises(ValueError):
+            recursely.wait('bgpkg', timeout=10)
+
+    def test_not_background(self):
+        self.assertTrue(recursely.wait('nonexistent', timeout=0))
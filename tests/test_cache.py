@@ -0,0 +1,98 @@
+"""
+Tests for the .cache module.
+"""
+import os
+import time
+
+from recursely.cache import ManifestCache
+from recursely.listing import scan_package_dir
+from tests._tree import TempTree
+
+
+class ManifestCacheTest(TempTree):
+
+    def setUp(self):
+        super(ManifestCacheTest, self).setUp()
+        self.cache_file = self.path('manifest.json')
+        self.package_dir = self.path('pkg')
+        self.write('pkg/__init__.py')
+
+    def store(self, cache):
+        """Store current listing of the package directory in ``cache``."""
+        cache.store(self.package_dir, os.stat(self.package_dir),
+                    scan_package_dir(self.package_dir))
+
+    def lookup(self, cache):
+        """Look up the package directory in ``cache``.
+        :return: List of children or ``None``
+        """
+        listing = cache.lookup(self.package_dir, os.stat(self.package_dir))
+        return None if listing is None else listing.children
+
+    def age(self, *path):
+        """Set the modification time of given directory (and everything
+        inside it) far enough into the past to avoid being considered racy.
+        """
+        past = time.time() - 60
+        top = self.path(*path)
+        for dirpath, dirnames, _ in os.walk(top):
+            for name in dirnames:
+                os.utime(os.path.join(dirpath, name), (past, past))
+        os.utime(top, (past, past))
+
+    def test_lookup__empty(self):
+        cache = ManifestCache(self.cache_file)
+        self.assertIsNone(self.lookup(cache))
+
+    def test_store__persisted(self):
+        self.write('pkg/a.py')
+        self.write('pkg/b/__init__.py')
+        self.age('pkg')
+        cache = ManifestCache(self.cache_file)
+        self.store(cache)
+        cache.save()
+
+        cache = ManifestCache(self.cache_file)
+        self.assertEqual(['b', 'a'], self.lookup(cache))
+
+    def test_store__racy(self):
+        cache = ManifestCache(self.cache_file)
+        self.store(cache)
+        self.assertIsNone(self.lookup(cache))
+
+    def test_lookup__file_added(self):
+        self.age('pkg')
+        cache = ManifestCache(self.cache_file)
+        self.store(cache)
+
+        self.write('pkg/a.py')
+        self.assertIsNone(self.lookup(cache))
+
+    def test_lookup__subdir_became_package(self):
+        os.mkdir(self.path('pkg', 'sub'))
+        self.age('pkg')
+        cache = ManifestCache(self.cache_file)
+        self.store(cache)
+
+        self.write('pkg/sub/__init__.py')
+        self.assertIsNone(self.lookup(cache))
+
+    def test_lookup__module_compiled(self):
+        os.mkdir(self.path('pkg', '__pycache__'))
+        self.age('pkg')
+        cache = ManifestCache(self.cache_file)
+        self.store(cache)
+
+        self.write('pkg/__pycache__/a.pyc')
+        self.assertEqual([], self.lookup(cache))
+
+    def test_save__corrupted_file(self):
+        with open(self.cache_file, 'w') as f:
+            f.write('{not json')
+        self.write('pkg/a.py')
+        self.age('pkg')
+
+        cache = ManifestCache(self.cache_file)
+        self.store(cache)
+        cache.save()
+        self.assertEqual(['a'], self.lookup(ManifestCache(self.cache_file)))
@@ -0,0 +1,100 @@
+"""
+Tests for the .check module.
+"""
+import json
+import os
+import sys
+
+from recursely.__main__ import main
+from recursely.check import CheckReport, check, discover
+from tests._compat import TestCase
+from tests._tree import TempTree
+
+
+class _CheckTest(TempTree):
+    """Base class for test cases using a temporary recursive package."""
+    PACKAGES = ('checked',)
+
+    def setUp(self):
+        super(_CheckTest, self).setUp()
+        self.write('checked/__init__.py', '__recursive__ = {'
+                   '"exclude": ["checked.skipped"]}\n')
+        self.write('checked/a.py', 'A = 1\n')
+        self.write('checked/broken.py', 'raise ValueError("broken")\n')
+        self.write('checked/skipped.py', 'raise ValueError("skipped")\n')
+        self.write('checked/sub/__init__.py', '')
+        self.write('checked/sub/b.py', 'B = 2\n')
+        self.write('checked/flat/__init__.py', '__recursive__ = False\n')
+        self.write('checked/flat/c.py', 'C = 3\n')
+        self.add_to_sys_path()
+
+
+class Discover(_CheckTest):
+
+    def test_tree(self):
+        names = discover(['checked'])
+        self.assertEqual('checked', names[0])
+        self.assertEqual(
+            ['checked', 'checked.a', 'checked.broken', 'checked.flat',
+             'checked.sub', 'checked.sub.b'],
+            sorted(names))
+        self.assertLess(names.index('checked.sub'),
+                        names.index('checked.sub.b'))
+        self.assertNotIn('checked', sys.modules)
+
+    def test_depth(self):
+        self.write('checked/__init__.py',
+                   '__recursive__ = {"max_depth": 1}\n')
+        self.assertEqual(
+            ['checked', 'checked.a', 'checked.broken', 'checked.flat',
+             'checked.skipped', 'checked.sub'],
+            sorted(discover(['checked'])))
+
+    def test_non_literal(self):
+        self.write('checked/__init__.py', '__recursive__ = bool(1)\n')
+        self.assertIn('checked.skipped', discover(['checked']))
+
+
+class Check(_CheckTest):
+
+    def test_results(self):
+        report = check(['checked'], jobs=2)
+        self.assertEqual(discover(['checked']),
+                         [result['module'] for result in report.results])
+        self.assertEqual(['checked.broken'],
+                         [result['module'] for result in report.failures])
+        self.assertIn('ValueError: broken', report.failures[0]['error'])
+        for result in report.results:
+            self.assertGreaterEqual(result['time'], 0)
+        self.assertNotIn('checked', sys.modules)
+
+    def test_cli(self):
+        output_file = os.path.join(self.root, 'report.json')
+        with open(os.devnull, 'w') as devnull:
+            stderr, sys.stderr = sys.stderr, devnull
+            try:
+                exit_code = main(['check', '--format', 'json',
+                                  '-o', output_file, 'checked'])
+            finally:
+                sys.stderr = stderr
+        self.assertEqual(1, exit_code)
+
+        with open(output_file) as f:
+            report = json.load(f)
+        self.assertEqual(6, report['modules'])
+        self.assertEqual(1, report['failures'])
+
+
+class CheckReportTest(TestCase):
+
+    def test_format(self):
+        report = CheckReport([
+            {'module': 'foo', 'ok': True, 'error': None,
+             'time': 0.001, 'memory': None},
+            {'module': 'foo.bar', 'ok': False,
+             'error': 'ValueError: bar\n', 'time': 0.002, 'memory': 4096},
+        ])
+        lines = report.format()
+        self.assertTrue(lines[1].startswith('foo.bar '))
+        self.assertIn('2 module(s), 1 failed, 3.0ms in total', lines)
+        self.assertEqual('    ValueError: bar', lines[-1])
@@ -0,0 +1,106 @@
+"""
+Tests for the .directive module.
+"""
+from recursely.directive import Directive
+from tests._compat import TestCase
+
+
+class Parse(TestCase):
+
+    def test_falsy(self):
+        self.assertIsNone(Directive.parse(False, 'pkg'))
+        self.assertIsNone(Directive.parse(None, 'pkg'))
+
+    def test_modes(self):
+        self.assertEqual(True, Directive.parse(True, 'pkg').mode)
+        self.assertTrue(Directive.parse('*', 'pkg').as_star)
+        self.assertTrue(Directive.parse('lazy', 'pkg').lazy)
+        self.assertFalse(Directive.parse(True, 'pkg').is_filtered)
+
+    def test_dict(self):
+        directive = Directive.parse({'mode': '*', 'exclude': ['tests'],
+                                     'max_depth': 2}, 'pkg')
+        self.assertTrue(directive.as_star)
+        self.assertEqual(['tests'], directive.exclude)
+        self.assertEqual(2, directive.max_depth)
+        self.assertEqual('pkg', directive.root)
+
+    def test_dict__invalid(self):
+        with self.assertRaises(ValueError):
+            Directive.parse({'exclud': ['tests']}, 'pkg')
+        with self.assertRaises(ValueError):
+            Directive.parse({'mode': 'eager'}, 'pkg')
+
+    def test_parallel(self):
+        directive = Directive.parse({'parallel': 4}, 'pkg')
+        self.assertEqual(4, directive.parallel)
+        self.assertFalse(directive.is_filtered)
+        for parallel in (0, -1, True, '4'):
+            with self.assertRaises(ValueError):
+                Directive.parse({'parallel': parallel}, 'pkg')
+
+    def test_marker(self):
+        directive = Directive.parse({'marker': b'@route'}, 'pkg')
+        self.assertEqual(b'@route', directive.marker.pattern)
+        self.assertFalse(directive.is_filtered)
+        self.assertEqual(directive.marker,
+                         Directive.parse(directive, 'pkg').marker)
+        self.assertTrue(Directive.parse({'marker': {'regex': '^@route'}},
+                                        'pkg').marker.regex)
+        for marker in (b'', 42, {'regex': ''}):
+            with self.assertRaises(ValueError):
+                Directive.parse({'marker': marker}, 'pkg')
+
+    def test_defaults(self):
+        defaults = Directive(include=['api'], exclude=['tests'], max_depth=1)
+        directive = Directive.parse({'exclude': ['conftest'], 'max_depth': 3},
+                                    'pkg', defaults=defaults)
+        self.assertEqual(['conftest', 'tests'], directive.exclude)
+        self.assertEqual(['api'], directive.include)
+        self.assertEqual(1, directive.max_depth)
+
+    def test_namespaces(self):
+        self.assertFalse(Directive.parse(True, 'pkg').namespaces)
+        self.assertTrue(Directive.parse({'namespaces': True},
+                                        'pkg').namespaces)
+
+        defaults = Directive(namespaces=True)
+        self.assertTrue(Directive.parse(True, 'pkg',
+                                        defaults=defaults).namespaces)
+        self.assertFalse(Directive.parse({'namespaces': False}, 'pkg',
+                                         defaults=defaults).namespaces)
+
+
+class Accepts(TestCase):
+
+    def test_unfiltered(self):
+        self.assertTrue(Directive(root='pkg').accepts('pkg.tests'))
+
+    def test_exclude(self):
+        directive = Directive(exclude=['tests', 'backends.ora*'], root='pkg')
+        self.assertFalse(directive.accepts('pkg.tests'))
+        self.assertFalse(directive.accepts('pkg.sub.tests'))
+        self.assertFalse(directive.accepts('pkg.backends.oracle'))
+        self.assertTrue(directive.accepts('pkg.backends.sqlite'))
+        self.assertTrue(directive.accepts('pkg.sub.other'))
+
+    def test_exclude__fullname(self):
+        directive = Directive(exclude=['pkg.sub.*'], root='pkg')
+        self.assertFalse(directive.accepts('pkg.sub.a'))
+        self.assertTrue(directive.accepts('pkg.sub'))
+
+    def test_include(self):
+        directive = Directive(include=['handlers', 'api.v2'], root='pkg')
+        self.assertTrue(directive.accepts('pkg.handlers'))
+        self.assertTrue(directive.accepts('pkg.handlers.users'))
+        self.assertTrue(directive.accepts('pkg.api'))
+        self.assertTrue(directive.accepts('pkg.api.v2'))
+        self.assertFalse(directive.accepts('pkg.api.v1'))
+        self.assertFalse(directive.accepts('pkg.models'))
+
+    def test_max_depth(self):
+        directive = Directive(max_depth=1, root='pkg')
+        self.assertTrue(directive.accepts('pkg.a'))
+        self.assertFalse(directive.accepts('pkg.a.b'))
+        self.assertTrue(directive.descends('pkg'))
+        self.assertFalse(directive.descends('pkg.a'))
@@ -0,0 +1,80 @@
+"""
+Tests for the .exports module.
+"""
+from recursely.cache import ManifestCache
+from recursely.exports import ExportIndex, find_exports
+from tests._compat import TestCase
+from tests._tree import TempTree
+
+
+class FindExports(TestCase):
+
+    def test_all(self):
+        self.assertEqual(['foo', 'Bar'], find_exports(
+            "__all__ = ('foo', 'Bar')\ndef foo(): pass\nclass Bar: pass\n"))
+
+    def test_top_level_names(self):
+        source = '\n'.join([
+            "import os, xml.dom",
+            "from sys import path as sys_path, _getframe",
+            "A, (B, C) = 1, (2, 3)",
+            "_private = 4",
+            "def func():",
+            "    local = 5",
+            "class Class(object):",
+            "    attr = 6",
+            "try:",
+            "    import json",
+            "except ImportError:",
+            "    json = None",
+            "if True:",
+            "    D = 7",
+            "else:",
+            "    E = 8",
+        ])
+        self.assertEqual(['os', 'xml', 'sys_path', 'A', 'B', 'C', 'func',
+                          'Class', 'json', 'D', 'E'], find_exports(source))
+
+    def test_unknown(self):
+        for source in ("__all__ = ['a'] + ['b']\n",
+                       "__all__ = ['a']\n__all__ += ['b']\n",
+                       "__all__ = ['a']\n__all__.append('b')\n",
+                       "from os.path import *\n",
+                       "def broken(:\n"):
+            self.assertIsNone(find_exports(source), source)
+
+
+class ExportIndexTest(TempTree):
+
+    def setUp(self):
+        super(ExportIndexTest, self).setUp()
+        self.cache_file = self.path('manifest.json')
+        self.module = self.write('module.py', "__all__ = ['A']\nA = 1\n",
+                                 age=60)
+        self.dynamic = self.write('dynamic.py', "__all__ = list('A')\n",
+                                  age=60)
+
+    def test_exports(self):
+        index = ExportIndex()
+        self.assertEqual(['A'], index.exports(self.module))
+        self.assertIsNone(index.exports(self.dynamic))
+        self.assertEqual(['A'], index.exports(self.module))
+        self.assertEqual(2, index.parsed)
+
+    def test_modified(self):
+        index = ExportIndex()
+        index.exports(self.module)
+        self.write('module.py', "__all__ = ['A', 'B']\nA = B = 1\n", age=30)
+        self.assertEqual(['A', 'B'], index.exports(self.module))
+
+    def test_cache(self):
+        cache = ManifestCache(self.cache_file)
+        index = ExportIndex(cache)
+        index.exports(self.module)
+        index.exports(self.dynamic)
+        cache.save()
+
+        index = ExportIndex(ManifestCache(self.cache_file))
+        self.assertEqual(['A'], index.exports(self.module))
+        self.assertIsNone(index.exports(self.dynamic))
+        self.assertEqual(0, index.parsed)
@@ -1,9 +1,22 @@
 """
 Tests for the .hook module.
 """
-from recursely._compat import IS_PY3
-from recursely.hook import ImportHook
+import os
+import py_compile
+import shutil
+import sys
+import tempfile
+import threading
+import time
+
+from recursely._compat import HAS_PEP451, IS_PY3
+from recursely.hook import ImportHook, _read_bytecode
 from tests._compat import TestCase, skipUnless
+from tests._tree import TempTree
+
+
+TESTS_DIR = os.path.dirname(__file__)
+IMPORTED_DIR = os.path.join(TESTS_DIR, 'imported')
 
 
 class TestImportHook(TestCase):
@@ -11,6 +24,224 @@ class TestImportHook(TestCase):
     @skipUnless(IS_PY3, "requires Python 3.x")
     def test_abc(self):
         from importlib import abc
-        self.assertTrue(issubclass(ImportHook, abc.Finder))
+        if hasattr(abc, 'Finder'):
+            self.assertTrue(issubclass(ImportHook, abc.Finder))
+        self.assertTrue(issubclass(ImportHook, abc.MetaPathFinder))
         self.assertTrue(issubclass(ImportHook, abc.Loader))
         self.assertTrue(issubclass(ImportHook, abc.InspectLoader))
+
+
+class _RecordingHook(ImportHook):
+    """Import hook that records the events it receives."""
+
+    def __init__(self):
+        self.found = []
+        self.imported = []
+
+    def on_module_found(self, fullname, path):
+        self.found.append(fullname)
+
+    def on_module_imported(self, fullname, module):
+        self.imported.append(fullname)
+
+
+@skipUnless(HAS_PEP451, "requires Python 3.4+")
+class FindSpec(TestCase):
+
+    def setUp(self):
+        sys.path.insert(0, IMPORTED_DIR)
+        self.hook = _RecordingHook()
+        sys.meta_path.insert(0, self.hook)
+
+    def tearDown(self):
+        sys.meta_path.remove(self.hook)
+        sys.path.remove(IMPORTED_DIR)
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'both2levels':
+                del sys.modules[name]
+
+    def test_events(self):
+        import both2levels.a.c
+        self.assertEqual(['both2levels', 'both2levels.a', 'both2levels.a.c'],
+                         self.hook.found)
+        self.assertEqual(self.hook.found, self.hook.imported)
+
+    def test_submodule_path(self):
+        import both2levels.a
+        spec = self.hook.find_spec('both2levels.a.d', both2levels.a.__path__)
+        self.assertIs(self.hook, spec.loader)
+        self.assertTrue(spec.origin.endswith(os.path.join('a', 'd.py')))
+
+    def test_not_found(self):
+        self.assertIsNone(self.hook.find_spec('nonexistent_module_xyz'))
+        with self.assertRaises(ImportError):
+            import nonexistent_module_xyz  # noqa
+
+    def test_regular_loader(self):
+        """Imported modules should look the same as without the hook."""
+        from importlib.machinery import SourceFileLoader
+        import both2levels.b as mod
+        self.assertIsInstance(mod.__loader__, SourceFileLoader)
+        self.assertIs(mod.__loader__, mod.__spec__.loader)
+
+    def test_overridden_finding(self):
+        """Modules whose finding has been overridden, but not their loading,
+        should be loaded using the standard procedure.
+        """
+        from importlib.machinery import SourceFileLoader
+        self.hook.on_find_module = lambda fullname, path: True
+        import both2levels.a.c as mod
+        self.assertEqual(['both2levels', 'both2levels.a', 'both2levels.a.c'],
+                         self.hook.imported)
+        self.assertIsInstance(mod.__loader__, SourceFileLoader)
+        self.assertTrue(mod.__file__.endswith(os.path.join('a', 'c.py')))
+        self.assertEqual([os.path.join(IMPORTED_DIR, 'both2levels', 'a')],
+                         list(sys.modules['both2levels.a'].__path__))
+
+
+@skipUnless(HAS_PEP451, "requires Python 3.4+")
+class Inspect(TestCase):
+    """Tests for the ``InspectLoader`` methods."""
+
+    def setUp(self):
+        sys.path.insert(0, IMPORTED_DIR)
+        self.hook = ImportHook()
+
+    def tearDown(self):
+        sys.path.remove(IMPORTED_DIR)
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'both2levels':
+                del sys.modules[name]
+
+    def test_is_package(self):
+        self.assertTrue(self.hook.is_package('both2levels'))
+        self.assertTrue(self.hook.is_package('both2levels.a'))
+        self.assertFalse(self.hook.is_package('both2levels.a.c'))
+        self.assertNotIn('both2levels', sys.modules)
+
+    def test_get_source(self):
+        with open(os.path.join(IMPORTED_DIR, 'both2levels', 'b.py')) as f:
+            expected = f.read()
+        self.assertEqual(expected, self.hook.get_source('both2levels.b'))
+        self.assertNotIn('both2levels', sys.modules)
+
+    def test_get_code(self):
+        code = self.hook.get_code('both2levels.b')
+        namespace = {}
+        exec(code, namespace)
+        self.assertEqual(2, namespace['B'])
+        self.assertEqual(os.path.join(IMPORTED_DIR, 'both2levels', 'b.py'),
+                         code.co_filename)
+        self.assertNotIn('both2levels', sys.modules)
+
+    def test_imported_parent(self):
+        """Extended ``__path__`` of an imported package should be used."""
+        import both2levels
+        extra_dir = tempfile.mkdtemp()
+        try:
+            with open(os.path.join(extra_dir, 'extra.py'), 'w') as f:
+                f.write('EXTRA = True\n')
+            both2levels.__path__.append(extra_dir)
+            self.assertFalse(self.hook.is_package('both2levels.extra'))
+            self.assertEqual('EXTRA = True\n',
+                             self.hook.get_source('both2levels.extra'))
+            self.assertNotIn('both2levels.extra', sys.modules)
+        finally:
+            shutil.rmtree(extra_dir)
+
+    def test_not_found(self):
+        for method in (self.hook.is_package, self.hook.get_source,
+                       self.hook.get_code):
+            with self.assertRaises(ImportError):
+                method('both2levels.nonexistent')
+            with self.assertRaises(ImportError):
+                method('both2levels.b.nonexistent')
+
+
+@skipUnless(HAS_PEP451, "requires Python 3.4+")
+class GetCodeCache(TempTree):
+    """Tests for ``get_code`` using cached bytecode."""
+    PACKAGES = ('cached_mod',)
+
+    def setUp(self):
+        from importlib.machinery import SourceFileLoader
+        super(GetCodeCache, self).setUp()
+        self.source = self.write('cached_mod.py', 'X = 1\n')
+        py_compile.compile(self.source, doraise=True)
+        self.add_to_sys_path()
+
+        self.compiled = compiled = []
+        self._source_to_code = source_to_code = \
+            SourceFileLoader.source_to_code
+
+        def recording_source_to_code(loader, data, path, *args, **kwargs):
+            compiled.append(path)
+            return source_to_code(loader, data, path, *args, **kwargs)
+        SourceFileLoader.source_to_code = recording_source_to_code
+
+    def tearDown(self):
+        from importlib.machinery import SourceFileLoader
+        SourceFileLoader.source_to_code = self._source_to_code
+        super(GetCodeCache, self).tearDown()
+
+    def test_cached(self):
+        self.assertIsNotNone(ImportHook().get_code('cached_mod'))
+        self.assertEqual([], self.compiled)
+
+    def test_stale(self):
+        self.write('cached_mod.py', 'X = 2  # changed\n')
+        os.utime(self.source, (time.time() + 10, time.time() + 10))
+
+        code = ImportHook().get_code('cached_mod')
+        self.assertEqual([self.source], self.compiled)
+        namespace = {}
+        exec(code, namespace)
+        self.assertEqual(2, namespace['X'])
+
+
+@skipUnless(not HAS_PEP451, "requires Python older than 3.4")
+class ReadBytecode(TempTree):
+    """Tests for reading legacy ``.pyc`` files."""
+
+    def setUp(self):
+        super(ReadBytecode, self).setUp()
+        self.source = self.write('compiled_mod.py', 'X = 1\n')
+        self.compiled = self.source + 'c'
+        py_compile.compile(self.source, cfile=self.compiled, doraise=True)
+
+    def test_read(self):
+        code = _read_bytecode(self.compiled,
+                              source_mtime=os.stat(self.source).st_mtime)
+        namespace = {}
+        exec(code, namespace)
+        self.assertEqual(1, namespace['X'])
+
+    def test_stale(self):
+        self.assertIsNone(_read_bytecode(
+            self.compiled, source_mtime=os.stat(self.source).st_mtime + 10))
+
+    def test_missing(self):
+        self.assertIsNone(_read_bytecode(self.path('missing_mod.pyc')))
+
+
+@skipUnless(IS_PY3, "requires Python 3.x")
+class ModuleLock(TestCase):
+
+    def setUp(self):
+        sys.path.insert(0, IMPORTED_DIR)
+
+    def tearDown(self):
+        sys.path.remove(IMPORTED_DIR)
+        for name in list(sys.modules):
+            if name.split('.')[0] == 'justmodules':
+                del sys.modules[name]
+
+    def test_other_imports_proceed(self):
+        hook = ImportHook()
+        thread = threading.Thread(target=__import__, args=('justmodules',))
+        thread.daemon = True
+        with hook.module_lock('nonexistent_module_xyz'):
+            thread.start()
+            thread.join(10)
+            self.assertFalse(thread.is_alive())
+        self.assertIn('justmodules', sys.modules)
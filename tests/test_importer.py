@@ -2,10 +2,21 @@
 Tests for .importer module.
 """
 import os
+import shutil
 import sys
+import threading
+import time
+import types
 
 import recursely
-from tests._compat import TestCase
+from recursely._compat import (HAS_PEP420, HAS_PEP451, acquire_lock,
+                               release_lock)
+from recursely.cache import ManifestCache
+from tests._compat import TestCase, skipUnless
+from tests._tree import TempTree
+
+if HAS_PEP451:
+    from importlib import import_module
 
 
 TESTS_DIR = os.path.dirname(__file__)
@@ -78,6 +89,60 @@ class Install(_RecursiveImporter):
         self.assertEquals(1, len(recursive_importers))
 
 
+class InstallLimited(_RecursiveImporter):
+    """Tests for ``install`` limited to certain packages."""
+
+    def setUp(self):
+        super(InstallLimited, self).setUp()
+        recursely.install(packages=['both2levels'])
+        self.importer = recursely.RecursiveImporter.get_installed()
+
+    def test_covered(self):
+        import both2levels as pkg
+        self.assertEqual(pkg.a.c.C, 3)
+        self.assertIn('both2levels', self.importer.recursive_packages)
+
+    def test_not_covered(self):
+        count = self.importer.short_circuited
+        import both1level as pkg
+        self.assertFalse(hasattr(pkg, 'a'))
+        self.assertGreater(self.importer.short_circuited, count)
+
+
+class ExpandedPackages(_RecursiveImporter):
+    """Tests for the registry of already expanded packages."""
+
+    def setUp(self):
+        super(ExpandedPackages, self).setUp()
+        recursely.install()
+        self.importer = recursely.RecursiveImporter.get_installed()
+
+    def test_registered(self):
+        import both2levels  # noqa
+        expanded = recursely.expanded_packages()
+        self.assertEqual(['a', 'b'], expanded['both2levels'])
+        self.assertEqual(['c', 'd'], sorted(expanded['both2levels.a']))
+
+    def test_not_expanded_twice(self):
+        import justmodules as pkg
+
+        listed = []
+        list_children = self.importer._list_children
+        self.importer._list_children = \
+            lambda *args: listed.append(args) or list_children(*args)
+
+        self.importer.recurse(pkg)
+        for module in list(sys.modules.values()):  # like retroactive install
+            self.importer.recurse(module)
+        self.assertEqual([], listed)
+
+    def test_reimported(self):
+        import justmodules  # noqa
+        del sys.modules['justmodules']
+        import justmodules as pkg
+        self.assertEqual(1, pkg.a.A)
+
+
 class Import(_RecursiveImporter):
     """Tests for the recursive importing through :class:`RecursiveImporter`."""
 
@@ -127,3 +192,533 @@ class Import(_RecursiveImporter):
         import starimport as pkg
         self.assertEquals(pkg.A, 1)
         self.assertEquals(pkg.B, 2)
+
+
+class SymlinkLoop(TempTree):
+    """Tests for protection against symlink cycles in package trees."""
+    PACKAGES = ('looped',)
+
+    def setUp(self):
+        if not hasattr(os, 'symlink'):
+            self.skipTest("requires symlink support")
+
+        super(SymlinkLoop, self).setUp()
+        self.write('looped/__init__.py', '__recursive__ = True\n')
+        self.write('looped/a.py', 'A = 1\n')
+        os.symlink(self.path('looped'), self.path('looped', 'loop'))
+        self.add_to_sys_path()
+
+    def test_recurse(self):
+        import looped as pkg
+        recursely.RecursiveImporter().recurse(pkg)
+        self.assertEqual(1, pkg.a.A)
+        self.assertNotIn('looped.loop', sys.modules)
+
+
+class ZipArchive(TempTree):
+    """Tests for recursive import of packages inside zip archives."""
+    PACKAGES = ('zipped',)
+
+    FILES = {'zipped/__init__.py': '__recursive__ = True\n',
+             'zipped/a.py': 'A = 1\n',
+             'zipped/b/__init__.py': '',
+             'zipped/b/c.py': 'C = 3\n',
+             'zipped/d/__init__.py': '',
+             'zipped/d/e.py': 'E = 5\n'}
+
+    def setUp(self):
+        import zipfile
+        super(ZipArchive, self).setUp()
+        self.archive = self.path('app.zip')
+        zip_file = zipfile.ZipFile(self.archive, 'w')
+        try:
+            for name, source in sorted(self.FILES.items()):
+                zip_file.writestr(name, source)
+        finally:
+            zip_file.close()
+        self.add_to_sys_path('app.zip')
+
+    def tearDown(self):
+        sys.path_importer_cache.pop(self.archive, None)
+        super(ZipArchive, self).tearDown()
+
+    def test_recurse(self):
+        import zipped as pkg
+        recursely.RecursiveImporter().recurse(pkg)
+        self.assertEqual(1, pkg.a.A)
+        self.assertEqual(3, pkg.b.c.C)
+        self.assertEqual(5, pkg.d.e.E)
+
+    def test_archive_read_once(self):
+        import zipfile
+        from recursely import listing
+        opened = []
+        zip_file_class = zipfile.ZipFile
+
+        class CountingZipFile(zip_file_class):
+            def __init__(self, filename, *args, **kwargs):
+                opened.append(filename)
+                zip_file_class.__init__(self, filename, *args, **kwargs)
+
+        listing.ArchiveIndex._cache.pop(self.archive, None)
+        zipfile.ZipFile = CountingZipFile
+        try:
+            import zipped as pkg
+            recursely.RecursiveImporter().recurse(pkg)
+        finally:
+            zipfile.ZipFile = zip_file_class
+
+        self.assertEqual([self.archive], opened)
+
+
+class SplitPackage(TempTree):
+    """Tests for recursive import of packages spanning several directories."""
+    PACKAGES = ('split', 'nspkg')
+
+    def test_extended_path(self):
+        self.write('one/split/__init__.py',
+                    '__recursive__ = True\n'
+                    'import os\n'
+                    '__path__.append(os.path.join(os.path.dirname('
+                    'os.path.dirname(os.path.dirname(__file__))), '
+                    '"two", "split"))\n')
+        self.write('one/split/a.py', 'A = 1\n')
+        self.write('two/split/b.py', 'B = 2\n')
+        self.write('two/split/a.py', 'A = 666\n')
+        self.add_to_sys_path('one')
+
+        import split as pkg
+        recursely.RecursiveImporter().recurse(pkg)
+        self.assertEqual(1, pkg.a.A)
+        self.assertEqual(2, pkg.b.B)
+
+    def test_namespace_package(self):
+        if not HAS_PEP420:
+            self.skipTest("requires PEP 420")
+        self.write('one/nspkg/a.py', 'A = 1\n')
+        self.write('two/nspkg/sub/__init__.py')
+        self.write('two/nspkg/sub/b.py', 'B = 2\n')
+        self.add_to_sys_path('two')
+        self.add_to_sys_path('one')
+
+        import nspkg as pkg
+        pkg.__recursive__ = True
+        recursely.RecursiveImporter().recurse(pkg)
+        self.assertEqual(1, pkg.a.A)
+        self.assertEqual(2, pkg.sub.b.B)
+
+    def test_namespace_subpackage(self):
+        if not HAS_PEP420:
+            self.skipTest("requires PEP 420")
+        self.write('one/split/__init__.py',
+                    '__recursive__ = {"namespaces": True}\n')
+        self.write('one/split/ns/c.py', 'C = 3\n')
+        self.add_to_sys_path('one')
+
+        import split as pkg
+        recursely.RecursiveImporter().recurse(pkg)
+        self.assertEqual(3, pkg.ns.c.C)
+
+    def test_namespace_subpackage__not_enabled(self):
+        self.write('one/split/__init__.py', '__recursive__ = True\n')
+        self.write('one/split/scripts/run.py', 'raise ImportError\n')
+        self.add_to_sys_path('one')
+
+        import split as pkg
+        recursely.RecursiveImporter().recurse(pkg)
+        self.assertNotIn('split.scripts', sys.modules)
+
+    def test_namespace_subpackage__install_option(self):
+        if not HAS_PEP420:
+            self.skipTest("requires PEP 420")
+        self.write('one/split/__init__.py', '__recursive__ = True\n')
+        self.write('one/split/ns/c.py', 'C = 3\n')
+        self.add_to_sys_path('one')
+
+        import split as pkg
+        recursely.RecursiveImporter(namespaces=True).recurse(pkg)
+        self.assertEqual(3, pkg.ns.c.C)
+
+
+class Filtered(TempTree):
+    """Tests for filtering children with a ``__recursive__`` spec."""
+    PACKAGES = ('filtered',)
+
+    def setUp(self):
+        super(Filtered, self).setUp()
+        for path, source in (
+                ('filtered/__init__.py', '__recursive__ = %r\n' % {
+                    'exclude': ['tests', 'conftest'], 'max_depth': 2}),
+                ('filtered/a.py', ''),
+                ('filtered/conftest.py', 'raise ImportError\n'),
+                ('filtered/tests/__init__.py', 'raise ImportError\n'),
+                ('filtered/sub/__init__.py', ''),
+                ('filtered/sub/tests.py', 'raise ImportError\n'),
+                ('filtered/sub/deep/__init__.py', ''),
+                ('filtered/sub/deep/b.py', 'raise ImportError\n')):
+            self.write(path, source)
+        self.add_to_sys_path()
+
+    def test_recurse(self):
+        import filtered as pkg
+        importer = recursely.RecursiveImporter()
+        importer.recurse(pkg)
+
+        self.assertIn('filtered.a', sys.modules)
+        self.assertIn('filtered.sub.deep', sys.modules)
+        for name in ('conftest', 'tests', 'sub.tests', 'sub.deep.b'):
+            self.assertNotIn('filtered.' + name, sys.modules)
+        self.assertEqual(['deep'],
+                         importer.expanded_packages.get(pkg.sub))
+
+    def test_global_exclude(self):
+        import filtered as pkg
+        importer = recursely.RecursiveImporter(exclude=['sub'])
+        importer.recurse(pkg)
+
+        self.assertIn('filtered.a', sys.modules)
+        self.assertNotIn('filtered.sub', sys.modules)
+
+    def test_cached(self):
+        # so that importing doesn't modify the directories again
+        self.addCleanup(setattr, sys, 'dont_write_bytecode',
+                        sys.dont_write_bytecode)
+        sys.dont_write_bytecode = True
+
+        past = time.time() - 60
+        for dirpath, _, _ in os.walk(self.root):
+            os.utime(dirpath, (past, past))
+
+        cache_file = self.path('cache.json')
+        for _ in range(2):
+            self.forget()
+            import filtered as pkg
+            importer = recursely.RecursiveImporter(
+                cache=ManifestCache(cache_file), exclude=['a'])
+            importer.recurse(pkg)
+            importer.cache.save()
+
+            self.assertNotIn('filtered.a', sys.modules)
+            self.assertIn('filtered.sub.deep', sys.modules)
+            self.assertIsNotNone(importer.cache.lookup(
+                self.path('filtered'), os.stat(self.path('filtered'))))
+
+
+class Marked(TempTree):
+    """Tests for importing only the children that contain a marker."""
+    PACKAGES = ('marked',)
+
+    def setUp(self):
+        super(Marked, self).setUp()
+        for path, source in (
+                ('marked/__init__.py', '__recursive__ = %r\n' % {
+                    'marker': b'@register'}),
+                ('marked/views.py', 'register = lambda f: f\n\n'
+                                    '@register\ndef view(): pass\n'),
+                ('marked/helpers.py', 'raise ImportError\n'),
+                ('marked/empty.py', ''),
+                ('marked/sub/__init__.py', ''),
+                ('marked/sub/models.py', 'from marked.views import register'
+                                         '\n\n@register\nclass Model: pass\n'),
+                ('marked/sub/utils.py', 'raise ImportError\n')):
+            self.write(path, source)
+        self.add_to_sys_path()
+
+    def test_recurse(self):
+        import marked as pkg
+        importer = recursely.RecursiveImporter()
+        importer.recurse(pkg)
+
+        self.assertIn('marked.views', sys.modules)
+        self.assertIn('marked.sub.models', sys.modules)
+        for name in ('helpers', 'empty', 'sub.utils'):
+            self.assertNotIn('marked.' + name, sys.modules)
+        self.assertEqual(['models'], importer.expanded_packages.get(pkg.sub))
+        self.assertEqual(5, importer.scanner.scanned)
+
+
+@skipUnless(HAS_PEP451, "requires Python 3.4+")
+class Concurrency(TempTree):
+    """Tests for imports in other threads while a package is expanded."""
+    PACKAGES = ('slowpkg', 'unrelated', 'cyclic', 'cycstar', 'parpkg',
+                'lock_gate')
+
+    def setUp(self):
+        super(Concurrency, self).setUp()
+        for path, source in (
+                ('slowpkg/__init__.py', '__recursive__ = True\n'),
+                ('slowpkg/gated.py',
+                 'import lock_gate\n'
+                 'lock_gate.expanding.set()\n'
+                 'lock_gate.release.wait(10)\n'),
+                ('unrelated.py', 'X = 1\n'),
+                ('cyclic/__init__.py',
+                 '__recursive__ = True\n'
+                 'import time, lock_gate\n'
+                 'lock_gate.expanding.set()\n'
+                 'lock_gate.release.wait(10)\n'
+                 'time.sleep(0.2)\n'),
+                ('cyclic/a.py', ''),
+                ('cyclic/b.py',
+                 'import lock_gate\n'
+                 'lock_gate.release.set()\n'
+                 'import cyclic\n'
+                 'B = 1\n'),
+                ('cycstar/__init__.py',
+                 '__recursive__ = "*"\n'
+                 'import time, lock_gate\n'
+                 'lock_gate.expanding.set()\n'
+                 'lock_gate.release.wait(10)\n'
+                 'time.sleep(0.2)\n'),
+                ('cycstar/a.py', '__all__ = ["A"]\nA = 1\n'),
+                ('cycstar/b/__init__.py',
+                 '__all__ = ["B"]\n'
+                 'import lock_gate\n'
+                 'lock_gate.release.set()\n'
+                 'import cycstar\n'
+                 'B = 2\n'),
+                ('cycstar/b/deep.py', '__all__ = ["DEEP"]\nDEEP = 3\n'),
+                ('parpkg/__init__.py', '__recursive__ = {"parallel": 2}\n'),
+                ('parpkg/a.py',
+                 'import lock_gate\n'
+                 'lock_gate.expanding.set()\n'
+                 'lock_gate.release.wait(10)\n'),
+                ('parpkg/b.py', 'import parpkg\nB = 1\n')):
+            self.write(path, source)
+
+        gate = types.ModuleType('lock_gate')
+        gate.expanding = threading.Event()
+        gate.release = threading.Event()
+        self.gate = sys.modules['lock_gate'] = gate
+
+        self.add_to_sys_path()
+        recursely.install()
+
+    def tearDown(self):
+        self.gate.release.set()
+        sys.meta_path = [ih for ih in sys.meta_path
+                         if type(ih) is not recursely.RecursiveImporter]
+        super(Concurrency, self).tearDown()
+
+    def test_unrelated_import(self):
+        importing = self._start_import('slowpkg')
+        self.assertTrue(self.gate.expanding.wait(10))
+
+        # the recursive import of ``slowpkg`` is blocked now,
+        # which shouldn't prevent other imports from proceeding
+        unrelated = self._start_import('unrelated')
+        unrelated.join(10)
+        self.assertFalse(unrelated.is_alive())
+        self.assertIn('unrelated', sys.modules)
+
+        # neither is the global import lock held in the meantime
+        global_lock = threading.Thread(target=self._take_import_lock)
+        global_lock.daemon = True
+        global_lock.start()
+        global_lock.join(10)
+        self.assertFalse(global_lock.is_alive())
+        self.assertTrue(importing.is_alive())
+
+        self.gate.release.set()
+        importing.join(10)
+        self.assertEqual([], importing.errors + unrelated.errors)
+        self.assertIn('slowpkg.gated', sys.modules)
+
+    def test_circular_import(self):
+        importing = self._start_import('cyclic')
+        self.assertTrue(self.gate.expanding.wait(10))
+
+        # ``cyclic.b`` waits for the package to finish importing,
+        # while the package's recursive import gets to ``cyclic.b``
+        child = self._start_import('cyclic.b')
+        importing.join(10)
+        child.join(10)
+        self.assertFalse(importing.is_alive() or child.is_alive())
+        self.assertEqual([], importing.errors + child.errors)
+
+        import cyclic as pkg
+        self.assertIn('cyclic.a', sys.modules)
+        self.assertEqual(1, pkg.b.B)
+
+    def test_circular_import__subpackage(self):
+        importing = self._start_import('cycstar')
+        self.assertTrue(self.gate.expanding.wait(10))
+
+        # the deferred subpackage is finished by the thread importing it,
+        # once the package has been imported
+        child = self._start_import('cycstar.b')
+        importing.join(10)
+        child.join(10)
+        self.assertFalse(importing.is_alive() or child.is_alive())
+        self.assertEqual([], importing.errors + child.errors)
+
+        import cycstar as pkg
+        self.assertIn('cycstar.b.deep', sys.modules)
+        self.assertEqual((1, 2), (pkg.A, pkg.B))
+        self.assertEqual(3, pkg.b.DEEP)
+        self.assertEqual(sorted(['a', 'b']),
+                         sorted(recursely.expanded_packages()['cycstar']))
+
+    def test_circular_import__failed(self):
+        self.write('cycstar/b/__init__.py',
+                   'import lock_gate\n'
+                   'lock_gate.release.set()\n'
+                   'import cycstar\n'
+                   'raise ValueError\n')
+        importing = self._start_import('cycstar')
+        self.assertTrue(self.gate.expanding.wait(10))
+
+        child = self._start_import('cycstar.b')
+        importing.join(10)
+        child.join(10)
+        self.assertEqual([], importing.errors)
+        self.assertEqual([ValueError], [type(e) for e in child.errors])
+        self.assertNotIn('cycstar', recursely.expanded_packages())
+
+    def test_parallel_import(self):
+        importing = self._start_import('parpkg')
+        self.assertTrue(self.gate.expanding.wait(10))
+
+        # worker threads can use the package being expanded,
+        # other threads have to wait for it
+        other = self._start_import('parpkg')
+        other.join(0.2)
+        self.assertTrue(other.is_alive())
+        self.assertIn('parpkg.b', sys.modules)
+
+        self.gate.release.set()
+        importing.join(10)
+        other.join(10)
+        self.assertFalse(importing.is_alive() or other.is_alive())
+        self.assertEqual([], importing.errors + other.errors)
+
+        import parpkg as pkg
+        self.assertEqual(1, pkg.b.B)
+
+    def _start_import(self, name):
+        thread = threading.Thread(target=self._import, args=(name,))
+        thread.errors = []
+        thread.daemon = True
+        thread.start()
+        return thread
+
+    def _take_import_lock(self):
+        acquire_lock()
+        release_lock()
+
+    def _import(self, name):
+        try:
+            import_module(name)
+        except Exception:
+            threading.current_thread().errors.append(sys.exc_info()[1])
+
+
+@skipUnless(HAS_PEP451, "requires Python 3.4+")
+class Parallel(TempTree):
+    """Stress test for ``'parallel'`` recursive imports, using trees
+    shaped like the ``both2levels`` fixture, only scaled up.
+
+    Modules import the top-level package and subpackages from other
+    subtrees, while some subpackages have their own directives (and so
+    hold their module locks for the whole import of their subtrees).
+    """
+    PACKAGES = ('stress',)
+    WIDTH = 6
+    DEPTH = 2
+    MODULES = 5
+    ROUNDS = 5
+
+    def setUp(self):
+        super(Parallel, self).setUp()
+        self.add_to_sys_path()
+
+    def generate(self, directive):
+        shutil.rmtree(self.path('stress'), ignore_errors=True)
+        self._generate_package('stress', self.DEPTH)
+        self.write('stress/__init__.py', '__recursive__ = %r\n' % (directive,))
+
+    def _generate_package(self, name, depth):
+        package_dir = name.replace('.', '/')
+        index = int(name.rsplit('.', 1)[-1][1:]) if '.' in name else 0
+        self.write(package_dir + '/__init__.py',
+                   '__recursive__ = True\n' if index % 3 == 1 else '')
+
+        for i in range(self.MODULES):
+            fullname = '%s.m%d' % (name, i)
+            self.write('%s/m%d.py' % (package_dir, i),
+                       'import time\n'
+                       'import stress\n'
+                       'from stress import p%d\n'
+                       'time.sleep(0.001)\n'
+                       'NAME = %r\n'
+                       '%s = 1\n'
+                       '__all__ = ["NAME", %r]\n' % (
+                           (index + i + 1) % self.WIDTH, fullname,
+                           fullname.replace('.', '_'),
+                           fullname.replace('.', '_')))
+        if depth > 0:
+            for i in range(self.WIDTH):
+                self._generate_package('%s.p%d' % (name, i), depth - 1)
+
+    def import_tree(self):
+        """Import the tree through the hook, and return the contents
+        of every package's namespace, as names.
+
+        (Namespaces of modules depend on when exactly they were executed,
+        since they capture attributes of packages that are still being
+        populated.)
+        """
+        importer = recursely.RecursiveImporter()
+        sys.meta_path.insert(0, importer)
+        try:
+            import_module('stress')
+        finally:
+            sys.meta_path.remove(importer)
+
+        namespaces = {}
+        for name, module in list(sys.modules.items()):
+            if (name == 'stress' or name.startswith('stress.')) and \
+                    hasattr(module, '__path__'):
+                namespaces[name] = sorted(
+                    (attr, getattr(value, '__name__', value))
+                    for attr, value in vars(module).items()
+                    if not attr.startswith('_'))
+        self.forget()
+        return namespaces
+
+    def test_tree(self):
+        self.generate({'mode': True})
+        expected = self.import_tree()
+
+        self.generate({'mode': True, 'parallel': 8})
+        for _ in range(self.ROUNDS):
+            namespaces = self.import_tree()
+            self.assertEqual(sorted(expected), sorted(namespaces))
+            self.assertEqual(expected, namespaces)
+
+    def test_star(self):
+        self.generate({'mode': '*'})
+        expected = self.import_tree()
+
+        self.generate({'mode': '*', 'parallel': 8})
+        for _ in range(self.ROUNDS):
+            namespaces = self.import_tree()
+            self.assertEqual(expected['stress'], namespaces['stress'])
+            self.assertEqual(expected, namespaces)
+
+    def test_circular_siblings(self):
+        """Siblings importing each other while being imported
+        in parallel should see each other partially initialized,
+        like in case of concurrent circular imports without recursely.
+        """
+        self.write('stress/__init__.py', '__recursive__ = {"parallel": 2}\n')
+        for name, other in (('a', 'b'), ('b', 'a')):
+            self.write('stress/%s.py' % name,
+                       'import time\n'
+                       'time.sleep(0.1)\n'
+                       'from stress import %s\n'
+                       'NAME = %r\n' % (other, name))
+
+        namespaces = self.import_tree()
+        self.assertEqual([('a', 'stress.a'), ('b', 'stress.b')],
+                         namespaces['stress'])
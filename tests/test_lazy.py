@@ -0,0 +1,137 @@
+"""
+Tests for the .lazy module.
+"""
+import sys
+from contextlib import contextmanager
+
+import recursely
+from recursely import importer as importer_module
+from recursely.lazy import LazyChildren
+from tests._compat import skipUnless
+from tests.test_importer import _RecursiveImporter
+
+
+@contextmanager
+def _recording_scans():
+    """Record the package directories listed within the block."""
+    scanned = []
+    scan_package_dir = importer_module.scan_package_dir
+    importer_module.scan_package_dir = \
+        lambda d, **kwargs: (scanned.append(d) or
+                             scan_package_dir(d, **kwargs))
+    try:
+        yield scanned
+    finally:
+        importer_module.scan_package_dir = scan_package_dir
+
+
+@skipUnless(LazyChildren.is_supported(), "requires module __getattr__")
+class Lazy(_RecursiveImporter):
+    """Tests for ``__recursive__ = 'lazy'``."""
+
+    def setUp(self):
+        super(Lazy, self).setUp()
+        import lazy as pkg
+        recursely.install(retroactive=True)
+        self.pkg = pkg
+
+    def test_deferred(self):
+        self.assertNotIn('lazy.a', sys.modules)
+        self.assertNotIn('lazy.b', sys.modules)
+
+    def test_attribute_access(self):
+        self.assertEqual(1, self.pkg.a.A)
+        self.assertIn('lazy.a', sys.modules)
+        self.assertNotIn('lazy.b', sys.modules)
+
+    def test_subpackage__lazy_too(self):
+        self.assertEqual(2, self.pkg.b.B)
+        self.assertNotIn('lazy.b.c', sys.modules)
+        self.assertEqual(3, self.pkg.b.c.C)
+
+    def test_missing_attribute(self):
+        with self.assertRaises(AttributeError):
+            self.pkg.nonexistent
+
+    def test_materialize(self):
+        recursely.materialize(self.pkg)
+        for name in ('lazy.a', 'lazy.b', 'lazy.b.c'):
+            self.assertIn(name, sys.modules)
+        self.assertEqual(3, self.pkg.b.c.C)
+
+    def test_materialize__by_name(self):
+        recursely.materialize('lazy')
+        self.assertIn('lazy.b.c', sys.modules)
+
+    def test_expanded(self):
+        self.assertEqual(['a', 'b'],
+                         sorted(recursely.expanded_packages()['lazy']))
+        with _recording_scans() as scanned:
+            recursely.RecursiveImporter.get_installed().recurse(self.pkg)
+        self.assertEqual([], scanned)
+        self.assertNotIn('lazy.a', sys.modules)
+
+    def test_not_refreshed(self):
+        importer = recursely.RecursiveImporter.get_installed()
+        with _recording_scans() as scanned:
+            report = importer.refresh(self.pkg,
+                                      changed_dirs=self.pkg.__path__)
+        self.assertFalse(report)
+        self.assertEqual([], scanned)
+
+
+@skipUnless(LazyChildren.is_supported(), "requires module __getattr__")
+class LazyStar(_RecursiveImporter):
+    """Tests for ``__recursive__ = 'lazy*'``."""
+
+    def setUp(self):
+        super(LazyStar, self).setUp()
+        import lazystar as pkg
+        recursely.install(retroactive=True)
+        self.pkg = pkg
+
+    def last_of(self, *children):
+        """Return the child that comes last in import order."""
+        return max(children, key=LazyChildren.of(self.pkg).children.index)
+
+    def test_deferred(self):
+        for name in ('a', 'b', 'sub'):
+            self.assertNotIn('lazystar.' + name, sys.modules)
+
+    def test_unindexed_imported_eagerly(self):
+        self.assertIn('lazystar.dyn', sys.modules)
+        self.assertEqual(3, self.pkg.__dict__['DYN'])
+
+    def test_exported_name(self):
+        self.assertEqual(1, self.pkg.A)
+        self.assertIn('lazystar.a', sys.modules)
+        self.assertNotIn('lazystar.b', sys.modules)
+
+        from lazystar import B
+        self.assertEqual(2, B)
+
+    def test_not_exported(self):
+        for name in ('hidden', '_private'):
+            with self.assertRaises(AttributeError):
+                getattr(self.pkg, name)
+
+    def test_shared_name(self):
+        expected = self.last_of('a', 'b')
+        self.assertEqual(expected, self.pkg.shared)
+        self.pkg.A, self.pkg.B
+        self.assertEqual(expected, self.pkg.shared)
+
+    def test_shared_name__reverse_order(self):
+        self.pkg.B, self.pkg.A
+        self.assertEqual(self.last_of('a', 'b'), self.pkg.shared)
+
+    def test_subpackage(self):
+        self.assertEqual(4, self.pkg.S)
+        self.assertNotIn('lazystar.sub.c', sys.modules)
+        self.assertEqual(5, self.pkg.sub.C)
+
+    def test_materialize(self):
+        recursely.materialize(self.pkg)
+        for name in ('A', 'B', 'S', 'DYN', 'shared'):
+            self.assertIn(name, self.pkg.__dict__)
+        self.assertEqual(self.last_of('a', 'b'), self.pkg.shared)
@@ -0,0 +1,124 @@
+"""
+Tests for the .listing module.
+"""
+import os
+
+from recursely import listing
+from recursely._compat import HAS_PEP420
+from recursely.listing import scan_package_dir
+from tests._compat import TestCase, skipUnless
+from tests._tree import TempTree
+
+
+TESTS_DIR = os.path.dirname(__file__)
+IMPORTED_DIR = os.path.join(TESTS_DIR, 'imported')
+
+
+class ScanPackageDir(TestCase):
+
+    def setUp(self):
+        self.calls = []
+
+        def counting(name, func):
+            def wrapper(*args, **kwargs):
+                self.calls.append((name, args[0]))
+                return func(*args, **kwargs)
+            return wrapper
+
+        self._originals = [(listing, 'scandir', listing.scandir),
+                           (os, 'listdir', os.listdir),
+                           (os.path, 'isdir', os.path.isdir),
+                           (os.path, 'isfile', os.path.isfile)]
+        for obj, name, func in self._originals:
+            setattr(obj, name, counting(name, func))
+
+    def tearDown(self):
+        for obj, name, func in self._originals:
+            setattr(obj, name, func)
+
+    def test_children(self):
+        result = scan_package_dir(os.path.join(IMPORTED_DIR, 'both3levels'))
+        self.assertEqual(['a', 'b'], result.children)
+        subdirs = set(result.subdirs) - set(['__pycache__'])
+        self.assertEqual(['a'], sorted(subdirs))
+
+    @skipUnless(hasattr(os, 'scandir'),
+                "the os.listdir fallback doesn't return types of entries")
+    def test_syscalls__both3levels(self):
+        """Walk the whole tree and check that every package directory
+        is read exactly once, with one extra check per subdirectory.
+        """
+        subdir_count = 0
+        pending = [os.path.join(IMPORTED_DIR, 'both3levels')]
+        package_dirs = []
+        while pending:
+            package_dir = pending.pop()
+            package_dirs.append(package_dir)
+            result = scan_package_dir(package_dir)
+            subdir_count += len(result.subdirs)
+            pending.extend(os.path.join(package_dir, child)
+                           for child in result.children
+                           if child in result.subdirs)
+
+        self.assertEqual(3, len(package_dirs))
+        self.assertEqual(sorted(package_dirs),
+                         sorted(path for name, path in self.calls
+                                if name == 'scandir'))
+        self.assertEqual(subdir_count, len([name for name, _ in self.calls
+                                            if name == 'isfile']))
+        self.assertFalse([c for c in self.calls
+                          if c[0] in ('listdir', 'isdir')])
+
+
+class ScanNamespaces(TempTree):
+
+    def setUp(self):
+        super(ScanNamespaces, self).setUp()
+        for path in ('ns/mod.py', 'data/file.txt', 'reg/__init__.py'):
+            self.write(path)
+
+    def test_disabled(self):
+        self.assertEqual(['reg'], scan_package_dir(self.root).children)
+
+    @skipUnless(HAS_PEP420, "requires PEP 420")
+    def test_enabled(self):
+        self.assertEqual(['reg', 'ns'], scan_package_dir(
+            self.root, namespaces=True).children)
+
+
+class ArchiveIndex(TempTree):
+
+    def setUp(self):
+        import zipfile
+        super(ArchiveIndex, self).setUp()
+        self.archive = self.path('app.pyz')
+        zip_file = zipfile.ZipFile(self.archive, 'w')
+        try:
+            for name in ('__main__.py', 'pkg/__init__.py', 'pkg/a.py',
+                         'pkg/a.pyc', 'pkg/sub/__init__.pyc', 'pkg/b.pyc',
+                         'pkg/data.txt', 'pkg/notpkg/x.py'):
+                zip_file.writestr(name, '')
+        finally:
+            zip_file.close()
+
+    def test_list(self):
+        index = listing.ArchiveIndex(self.archive)
+        result = index.list(os.path.join(self.archive, 'pkg'))
+        self.assertEqual(['sub', 'a', 'b'], result.children)
+        self.assertEqual({}, result.subdirs)
+
+    def test_list__namespaces(self):
+        index = listing.ArchiveIndex(self.archive)
+        result = index.list(os.path.join(self.archive, 'pkg'),
+                            namespaces=True)
+        namespaces = ['notpkg'] if HAS_PEP420 else []
+        self.assertEqual(['sub'] + namespaces + ['a', 'b'], result.children)
+
+    def test_list__root(self):
+        index = listing.ArchiveIndex(self.archive)
+        self.assertEqual(['pkg', '__main__'],
+                         index.list(self.archive).children)
+
+    def test_for_archive__reused(self):
+        index = listing.ArchiveIndex.for_archive(self.archive)
+        self.assertIs(index, listing.ArchiveIndex.for_archive(self.archive))
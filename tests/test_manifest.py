@@ -0,0 +1,110 @@
+"""
+Tests for the .manifest module.
+"""
+import os
+import sys
+import warnings
+
+from recursely import importer as importer_module
+from recursely.__main__ import main
+from recursely.importer import RecursiveImporter
+from recursely.manifest import ImportManifest, StaleManifestWarning, freeze
+from tests._tree import TempTree
+
+
+class _ManifestTest(TempTree):
+    """Base class for test cases using a temporary recursive package."""
+    PACKAGES = ('frozen',)
+
+    def setUp(self):
+        super(_ManifestTest, self).setUp()
+        self.manifest_file = self.path('manifest.json')
+        self.write('frozen/__init__.py', '__recursive__ = True\n')
+        self.write('frozen/a.py', 'A = 1\n')
+        self.write('frozen/b/__init__.py', '__recursive__ = "*"\n')
+        self.write('frozen/b/c.py', '__all__ = ["C"]\nC = 3\n')
+        self.add_to_sys_path()
+
+    def freeze(self):
+        freeze(['frozen']).save(self.manifest_file)
+        self.forget()
+
+
+class Freeze(_ManifestTest):
+
+    def test_entries(self):
+        manifest = freeze(['frozen'])
+        self.assertEqual(['frozen', 'frozen.b'], list(manifest))
+
+        entry = manifest.get('frozen')
+        self.assertEqual([[os.path.join(self.root, 'frozen'), ['b', 'a']]],
+                         entry['path'])
+        self.assertEqual(['mtimes', 'path'], sorted(entry))
+
+    def test_mtimes(self):
+        self.write('frozen/__pycache__/a.pyc')
+        self.write('frozen/docs/index.txt')
+        entry = freeze(['frozen']).get('frozen')
+        expected = [os.path.join(self.root, path)
+                    for path in ('frozen', 'frozen/b', 'frozen/docs')]
+        self.assertEqual(sorted(expected), sorted(entry['mtimes']))
+
+    def test_save(self):
+        self.freeze()
+        manifest = ImportManifest(self.manifest_file)
+        self.assertEqual(['frozen', 'frozen.b'], list(manifest))
+
+    def test_cli(self):
+        with open(os.devnull, 'w') as devnull:
+            stderr, sys.stderr = sys.stderr, devnull
+            try:
+                exit_code = main(['freeze', '-o', self.manifest_file,
+                                  'frozen'])
+            finally:
+                sys.stderr = stderr
+        self.assertEqual(0, exit_code)
+        self.assertIn('frozen.b', ImportManifest(self.manifest_file))
+
+
+class Lookup(_ManifestTest):
+
+    def setUp(self):
+        super(Lookup, self).setUp()
+        self.freeze()
+        self.scanned = []
+        self._scan_package_dir = importer_module.scan_package_dir
+        importer_module.scan_package_dir = \
+            lambda d, **kwargs: (self.scanned.append(d) or
+                                 self._scan_package_dir(d, **kwargs))
+
+    def tearDown(self):
+        importer_module.scan_package_dir = self._scan_package_dir
+        super(Lookup, self).tearDown()
+
+    def recurse(self):
+        importer = RecursiveImporter(
+            manifest=ImportManifest(self.manifest_file))
+        sys.meta_path.insert(0, importer)
+        try:
+            import frozen as pkg
+        finally:
+            sys.meta_path.remove(importer)
+        return pkg
+
+    def test_no_listing(self):
+        pkg = self.recurse()
+        self.assertEqual(1, pkg.a.A)
+        self.assertEqual(3, pkg.b.C)
+        self.assertEqual([], self.scanned)
+
+    def test_stale(self):
+        self.write('frozen/d.py', 'D = 4\n')
+        os.utime(os.path.join(self.root, 'frozen'), (0, 0))
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            pkg = self.recurse()
+        self.assertEqual(4, pkg.d.D)
+        self.assertEqual([os.path.join(self.root, 'frozen')], self.scanned)
+        self.assertEqual([StaleManifestWarning],
+                         [w.category for w in caught])
@@ -0,0 +1,99 @@
+"""
+Tests for the .markers module.
+"""
+import re
+
+from recursely.cache import ManifestCache
+from recursely.markers import Marker, MarkerScanner
+from tests._compat import TestCase
+from tests._tree import TempTree
+
+
+class MarkerTest(TestCase):
+
+    def test_literal(self):
+        marker = Marker(b'@app.route')
+        self.assertTrue(marker.search(b'@app.route("/")\n'))
+        self.assertFalse(marker.search(b'@app_route("/")\n'))
+        self.assertEqual(marker, Marker(u'@app.route'))
+        self.assertFalse(marker.regex)
+
+    def test_regex(self):
+        marker = Marker(r'^class \w+\(Model\)', regex=True)
+        self.assertTrue(marker.regex)
+        self.assertTrue(marker.search(b'class Foo(Model):\n'))
+        self.assertFalse(marker.search(b'import x\nclass Foo(Model):\n'))
+        marker = Marker(re.compile(r'^class \w+\(Model\)', re.MULTILINE))
+        self.assertTrue(marker.search(b'import x\nclass Foo(Model):\n'))
+        self.assertEqual(marker, Marker(re.compile(br'^class \w+\(Model\)',
+                                                   re.MULTILINE)))
+
+    def test_parse(self):
+        marker = Marker.parse({'regex': r'^class \w+\(Model\)'})
+        self.assertEqual(Marker(r'^class \w+\(Model\)', regex=True), marker)
+        self.assertEqual(Marker(re.compile(r'^class \w+\(Model\)')), marker)
+        self.assertEqual(Marker(b'@route'), Marker.parse(b'@route'))
+        for value in ({}, {'regex': ''}, {'regex': 'x', 'flags': 0}):
+            with self.assertRaises(ValueError):
+                Marker.parse(value)
+
+    def test_invalid(self):
+        for pattern in ('', b'', None, 42):
+            with self.assertRaises(ValueError):
+                Marker(pattern)
+
+
+class MarkerScannerTest(TempTree):
+
+    def setUp(self):
+        super(MarkerScannerTest, self).setUp()
+        self.cache_file = self.path('manifest.json')
+        self.marked = self.write('marked.py', '@register\ndef foo(): pass\n',
+                                 age=60)
+        self.unmarked = self.write('unmarked.py', 'def bar(): pass\n',
+                                   age=60)
+        self.empty = self.write('empty.py', '', age=60)
+        self.marker = Marker(b'@register')
+
+    def test_matches(self):
+        scanner = MarkerScanner()
+        self.assertTrue(scanner.matches(self.marked, self.marker))
+        self.assertFalse(scanner.matches(self.unmarked, self.marker))
+        self.assertFalse(scanner.matches(self.empty, self.marker))
+        self.assertEqual(3, scanner.scanned)
+
+        self.assertTrue(scanner.matches(self.marked, self.marker))
+        self.assertEqual(3, scanner.scanned)
+
+    def test_modified(self):
+        scanner = MarkerScanner()
+        self.assertFalse(scanner.matches(self.unmarked, self.marker))
+        self.write('unmarked.py', '@register\ndef bar(): pass\n', age=30)
+        self.assertTrue(scanner.matches(self.unmarked, self.marker))
+        self.assertEqual(2, scanner.scanned)
+
+    def test_cache(self):
+        cache = ManifestCache(self.cache_file)
+        scanner = MarkerScanner(cache)
+        scanner.matches(self.marked, self.marker)
+        scanner.matches(self.unmarked, self.marker)
+        cache.save()
+
+        scanner = MarkerScanner(ManifestCache(self.cache_file))
+        self.assertTrue(scanner.matches(self.marked, self.marker))
+        self.assertFalse(scanner.matches(self.unmarked, self.marker))
+        self.assertEqual(0, scanner.scanned)
+
+        # results for other markers are scanned anew
+        self.assertFalse(scanner.matches(self.marked, Marker(b'@other')))
+        self.assertEqual(1, scanner.scanned)
+
+    def test_cache__racy(self):
+        recent = self.write('recent.py', '@register\n', age=0)
+        cache = ManifestCache(self.cache_file)
+        MarkerScanner(cache).matches(recent, self.marker)
+        cache.save()
+
+        scanner = MarkerScanner(ManifestCache(self.cache_file))
+        self.assertTrue(scanner.matches(recent, self.marker))
+        self.assertEqual(1, scanner.scanned)
@@ -0,0 +1,101 @@
+"""
+Tests for the .plan module.
+"""
+import json
+import os
+import sys
+
+import recursely
+from recursely.__main__ import main
+from recursely.plan import plan
+from tests._tree import TempTree
+
+
+class _PlanTest(TempTree):
+    """Base class for test cases using a temporary recursive package."""
+    PACKAGES = ('planned',)
+
+    def setUp(self):
+        super(_PlanTest, self).setUp()
+        self.write('planned/__init__.py', '__recursive__ = {'
+                   '"exclude": ["tests"]}\n')
+        self.write('planned/a.py', 'A = 1\n')
+        self.write('planned/tests.py', 'raise ImportError\n')
+        self.write('planned/star/__init__.py', '__recursive__ = "*"\n')
+        self.write('planned/star/b.py', 'B = 2\n')
+        self.write('planned/flat/__init__.py', '__recursive__ = False\n')
+        self.write('planned/flat/c.py', 'C = 3\n')
+        self.write('planned/sub/__init__.py', '')
+        self.write('planned/sub/tests.py', 'raise ImportError\n')
+        self.write('planned/sub/d.py', 'D = 4\n')
+        self.add_to_sys_path()
+
+
+class Plan(_PlanTest):
+
+    def test_tree(self):
+        node = plan('planned')
+        self.assertEqual(
+            ['planned.a', 'planned.flat', 'planned.star', 'planned.sub'],
+            sorted(child.name for child in node.children))
+        self.assertEqual(
+            sorted(['planned', 'planned.a', 'planned.flat', 'planned.star',
+                    'planned.star.b', 'planned.sub', 'planned.sub.d']),
+            sorted(module.name for module in node.walk()))
+        self.assertNotIn('planned', sys.modules)
+
+    def test_import_order(self):
+        node = plan('planned')
+
+        imported = ['planned']
+        recursely.install()
+        importer = recursely.RecursiveImporter.get_installed()
+        import_child_module = importer._import_child_module
+        importer._import_child_module = lambda module, child: (
+            imported.append('%s.%s' % (module.__name__, child)) or
+            import_child_module(module, child))
+        try:
+            import planned  # noqa
+        finally:
+            sys.meta_path = [ih for ih in sys.meta_path
+                             if type(ih) is not recursely.RecursiveImporter]
+        self.assertEqual([module.name for module in node.walk()], imported)
+
+    def test_nested_directives(self):
+        children = dict((child.name, child)
+                        for child in plan('planned').children)
+        self.assertEqual('*', children['planned.star'].directive.mode)
+        self.assertEqual([], children['planned.flat'].children)
+        self.assertEqual(['planned.sub.d'], [
+            child.name for child in children['planned.sub'].children])
+
+    def test_sizes(self):
+        node = plan('planned')
+        a = [child for child in node.children if child.name == 'planned.a'][0]
+        self.assertEqual(len('A = 1\n'), a.size)
+        self.assertFalse(a.is_package)
+        self.assertEqual(os.path.join(self.root, 'planned', 'a.py'),
+                         a.filename)
+        self.assertEqual(sum(module.size for module in node.walk()),
+                         node.total_size)
+
+    def test_not_recursive(self):
+        self.write('planned/__init__.py', '')
+        node = plan('planned')
+        self.assertEqual([], node.children)
+        self.assertIsNone(node.directive)
+
+    def test_cli(self):
+        output_file = os.path.join(self.root, 'plan.json')
+        stdout = sys.stdout
+        try:
+            with open(output_file, 'w') as sys.stdout:
+                exit_code = main(['plan', '--format', 'json', 'planned'])
+        finally:
+            sys.stdout = stdout
+        self.assertEqual(0, exit_code)
+
+        with open(output_file) as f:
+            data = json.load(f)
+        self.assertEqual('planned', data['name'])
+        self.assertEqual(plan('planned').total_size, data['total_size'])
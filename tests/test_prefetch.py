@@ -0,0 +1,92 @@
+"""
+Tests for the .prefetch module.
+"""
+import os
+import sys
+import threading
+
+from recursely.importer import RecursiveImporter
+from recursely.prefetch import Prefetcher
+from tests._compat import TestCase, skipUnless
+
+
+TESTS_DIR = os.path.dirname(__file__)
+IMPORTED_DIR = os.path.join(TESTS_DIR, 'imported')
+
+
+@skipUnless(Prefetcher.is_supported(), "requires concurrent.futures")
+class PrefetcherTest(TestCase):
+
+    def setUp(self):
+        sys.path.insert(0, IMPORTED_DIR)
+        self.importer = RecursiveImporter(prefetcher=Prefetcher(2))
+
+    def tearDown(self):
+        sys.path.remove(IMPORTED_DIR)
+        for path in list(sys.path_importer_cache):
+            if path.startswith(IMPORTED_DIR):
+                del sys.path_importer_cache[path]
+        for name in list(sys.modules):
+            if name.split('.')[0] in ('justmodules', 'both3levels'):
+                del sys.modules[name]
+
+    def test_recurse(self):
+        import both3levels as pkg
+        self.importer.recurse(pkg)
+        self.assertEqual(1, pkg.a.A)
+        self.assertEqual(2, pkg.b.B)
+        self.assertEqual(6, pkg.a.c.f.F)
+        self.assertEqual(7, pkg.a.c.g.G)
+
+    def test_prefetched_loader(self):
+        from recursely.prefetch import PrefetchedSourceFileLoader
+        import justmodules as pkg
+        self.importer.recurse(pkg)
+        self.assertIsInstance(pkg.a.__loader__, PrefetchedSourceFileLoader)
+        self.assertEqual(1, pkg.a.A)
+
+    def test_shutdown(self):
+        import justmodules as pkg
+        self.importer.recurse(pkg)
+        self.assertIsNone(self.importer.prefetcher._executor)
+        self.assertEqual({}, self.importer.prefetcher._futures)
+
+    def test_shutdown__other_thread(self):
+        """Prefetcher should be kept until recursive imports
+        on all threads have finished.
+        """
+        import justmodules as pkg
+        shutdowns = []
+        prefetcher = self.importer.prefetcher
+        shutdown = prefetcher.shutdown
+        prefetcher.shutdown = lambda: shutdowns.append(shutdown())
+
+        with self.importer._recursion():
+            other = threading.Thread(target=self.importer.recurse,
+                                     args=(pkg,))
+            other.start()
+            other.join(10)
+            self.assertEqual(1, pkg.a.A)
+            self.assertEqual([], shutdowns)
+        self.assertEqual([None], shutdowns)
+
+    def test_original_finder_restored(self):
+        import justmodules as pkg
+        package_dir = pkg.__path__[0]
+        self.importer.recurse(pkg)
+        self.assertIsNone(getattr(sys.path_importer_cache.get(package_dir),
+                                  'prefetcher', None))
+
+    def test_custom_loader(self):
+        from importlib.machinery import FileFinder, SourceFileLoader
+
+        class CustomLoader(SourceFileLoader):
+            pass
+
+        import justmodules as pkg
+        package_dir = pkg.__path__[0]
+        finder = FileFinder(package_dir, (CustomLoader, ['.py']))
+        sys.path_importer_cache[package_dir] = finder
+        self.importer.recurse(pkg)
+        self.assertIsInstance(pkg.a.__loader__, CustomLoader)
+        self.assertIs(finder, sys.path_importer_cache[package_dir])
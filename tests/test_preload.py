@@ -0,0 +1,64 @@
+"""
+Tests for the .preload module.
+"""
+import gc
+import os
+import sys
+import warnings
+
+import recursely
+from recursely.preload import PostForkImportWarning
+from recursely.utils import rss
+from tests._compat import TestCase
+
+
+TESTS_DIR = os.path.dirname(__file__)
+IMPORTED_DIR = os.path.join(TESTS_DIR, 'imported')
+
+
+class Preload(TestCase):
+
+    def setUp(self):
+        sys.path.insert(0, IMPORTED_DIR)
+
+    def tearDown(self):
+        if hasattr(gc, 'unfreeze'):
+            gc.unfreeze()
+        sys.meta_path = [ih for ih in sys.meta_path
+                         if type(ih) is not recursely.RecursiveImporter]
+        sys.path.remove(IMPORTED_DIR)
+        for package in os.listdir(IMPORTED_DIR):
+            for name in list(sys.modules):
+                if name == package or name.startswith(package + '.'):
+                    del sys.modules[name]
+
+    def test_report(self):
+        report = recursely.preload('justmodules', 'lazy')
+        self.assertEqual(['justmodules', 'lazy'], report.packages)
+        for name in ('justmodules.a', 'justmodules.b', 'lazy.b.c'):
+            self.assertIn(name, report.modules)
+        if rss() is not None:
+            self.assertIsNotNone(report.bytes)
+        self.assertIn('module(s)', str(report))
+
+    def test_freeze(self):
+        if not hasattr(gc, 'freeze'):
+            self.skipTest("requires gc.freeze()")
+        recursely.preload('justmodules')
+        self.assertGreater(gc.get_freeze_count(), 0)
+
+    def test_unknown_option(self):
+        with self.assertRaises(TypeError):
+            recursely.preload('justmodules', frozen=True)
+
+    def test_post_fork_warning(self):
+        recursely.preload('justmodules', freeze=False)
+        importer = recursely.RecursiveImporter.get_installed()
+        importer.preloaded_pid = os.getpid() + 1  # as if we've forked
+
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            import justmodules  # noqa (preloaded, so no warning)
+            import both1level  # noqa
+        self.assertEqual([PostForkImportWarning],
+                         [w.category for w in caught])
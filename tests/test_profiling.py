@@ -0,0 +1,92 @@
+"""
+Tests for the .profiling module.
+"""
+import recursely
+from recursely.importer import RecursiveImporter
+from recursely.profiling import ImportProfiler, tracemalloc
+from tests._tree import TempTree
+from tests.test_importer import _RecursiveImporter
+
+
+class Profiling(_RecursiveImporter):
+
+    def test_disabled(self):
+        recursely.install()
+        self.assertIsNone(recursely.stats())
+        self.assertNotIn('_import_child_module',
+                         RecursiveImporter.get_installed().__dict__)
+
+    def test_tree(self):
+        import both3levels as pkg
+        profiler = ImportProfiler()
+        RecursiveImporter(profiler=profiler).recurse(pkg)
+
+        self.assertEqual(['both3levels.a', 'both3levels.b'],
+                         [r.name for r in profiler.roots])
+        a = profiler.roots[0]
+        self.assertEqual('both3levels', a.parent)
+        self.assertEqual(['both3levels.a.c', 'both3levels.a.d',
+                          'both3levels.a.e'],
+                         sorted(r.name for r in a.children))
+        self.assertEqual(7, len(list(profiler)))
+
+        for record in profiler:
+            self.assertGreaterEqual(record.wall, record.self_time)
+            self.assertGreaterEqual(record.cumulative, record.self_time)
+
+    def test_stats(self):
+        import justmodules
+        recursely.install(retroactive=True, profile=True)
+        stats = recursely.stats()
+
+        self.assertEqual(2, len(stats.top(5)))
+        self.assertEqual(['justmodules.a', 'justmodules.b'],
+                         sorted(r['name'] for r in stats.as_dict()))
+        self.assertIn('justmodules.a (justmodules)', stats.report())
+
+
+class MemoryProfiling(TempTree):
+    PACKAGES = ('hog',)
+
+    def setUp(self):
+        if tracemalloc is None:
+            self.skipTest("requires tracemalloc")
+        self.was_tracing = tracemalloc.is_tracing()
+
+        super(MemoryProfiling, self).setUp()
+        for path, source in (
+                ('hog/__init__.py', '__recursive__ = True\n'),
+                ('hog/small.py', 'X = 1\n'),
+                ('hog/sub/__init__.py', ''),
+                ('hog/sub/big.py', 'DATA = list(range(200000))\n')):
+            self.write(path, source)
+        self.add_to_sys_path()
+
+    def tearDown(self):
+        if not self.was_tracing:
+            tracemalloc.stop()
+        super(MemoryProfiling, self).tearDown()
+
+    def test_rollup(self):
+        profiler = ImportProfiler(memory=True)
+        self.assertTrue(tracemalloc.is_tracing())
+        import hog as pkg
+        RecursiveImporter(profiler=profiler).recurse(pkg)
+
+        records = dict((r.name, r) for r in profiler)
+        big = records['hog.sub.big']
+        self.assertGreater(big.self_allocated, 1000000)
+        self.assertLess(records['hog.small'].self_allocated, 1000000)
+        self.assertLess(records['hog.sub'].self_allocated, 1000000)
+        self.assertGreaterEqual(records['hog.sub'].cumulative_allocated,
+                                big.self_allocated)
+        self.assertEqual('hog.sub.big', profiler.top(
+            1, key='self_allocated')[0].name)
+        self.assertIn('cumulative_allocated', big.as_dict())
+
+        report = profiler.memory_report()
+        self.assertIn('hog.sub.big (hog.sub)', report)
+
+    def test_disabled(self):
+        with self.assertRaises(RuntimeError):
+            ImportProfiler().memory_report()
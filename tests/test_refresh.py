@@ -0,0 +1,178 @@
+"""
+Tests for the .refresh module.
+"""
+import os
+import sys
+import threading
+import time
+
+import recursely
+from recursely import importer as importer_module
+from recursely.refresh import RefreshReport, _Inotify
+from tests._compat import TestCase, skipUnless
+from tests._tree import TempTree
+
+
+def _has_inotify():
+    inotify = _Inotify.create()
+    if inotify is None:
+        return False
+    inotify.close()
+    return True
+
+
+HAS_INOTIFY = _has_inotify()
+
+
+class _Refresh(TempTree):
+    PACKAGES = ('plugins',)
+
+    def setUp(self):
+        super(_Refresh, self).setUp()
+        # importing should write bytecode, which modifies the directories
+        self.dont_write_bytecode = sys.dont_write_bytecode
+        sys.dont_write_bytecode = False
+
+        self.write('plugins/__init__.py', '__recursive__ = True\n')
+        self.write('plugins/a.py', 'A = 1\n')
+        self.write('plugins/sub/__init__.py', '')
+        self.write('plugins/sub/b.py', 'B = 2\n')
+
+        # make the directories look like they haven't changed in a while
+        past = time.time() - 60
+        for dirpath, _, _ in os.walk(self.root):
+            os.utime(dirpath, (past, past))
+
+        self.add_to_sys_path()
+        recursely.install()
+        import plugins
+        self.package = plugins
+
+        self.scanned = []
+        self._scan_package_dir = importer_module.scan_package_dir
+        importer_module.scan_package_dir = \
+            lambda d, **kwargs: (self.scanned.append(d) or
+                                 self._scan_package_dir(d, **kwargs))
+
+    def tearDown(self):
+        importer_module.scan_package_dir = self._scan_package_dir
+        sys.meta_path = [ih for ih in sys.meta_path
+                         if type(ih) is not recursely.RecursiveImporter]
+        sys.dont_write_bytecode = self.dont_write_bytecode
+        super(_Refresh, self).tearDown()
+
+
+class Refresh(_Refresh):
+
+    def test_unchanged(self):
+        report = recursely.refresh(self.package)
+        self.assertFalse(report)
+        self.assertEqual([], self.scanned)
+
+    def test_added(self):
+        self.write('plugins/sub/c.py', 'C = 3\n')
+        self.write('plugins/new/__init__.py', '')
+        self.write('plugins/new/d.py', 'D = 4\n')
+
+        report = recursely.refresh('plugins')
+        self.assertEqual(['plugins.new', 'plugins.sub.c'],
+                         sorted(report.added))
+        self.assertEqual([], report.removed)
+        self.assertEqual(3, self.package.sub.c.C)
+        self.assertEqual(4, self.package.new.d.D)
+        self.assertEqual(
+            sorted(['a', 'new', 'sub']),
+            sorted(recursely.expanded_packages()['plugins']))
+
+        # only the changed directories (and the new one) have been listed
+        # (some once more, if writing bytecode there modified them)
+        self.assertEqual(
+            sorted(self.path(p) for p in ('plugins', 'plugins/sub',
+                                          'plugins/new')),
+            sorted(set(self.scanned)))
+
+    def test_removed(self):
+        os.remove(self.path('plugins/a.py'))
+        report = recursely.refresh(self.package)
+        self.assertEqual(['plugins.a'], report.removed)
+        self.assertEqual([], report.added)
+        self.assertIn('plugins.a', sys.modules)  # not unloaded
+
+        report = recursely.refresh(self.package)
+        self.assertEqual([], report.removed)
+
+    def test_failed_import(self):
+        self.write('plugins/broken.py', 'raise ValueError("broken")\n',
+                   age=60)  # so that its bytecode is not reused
+        with self.assertRaises(ValueError):
+            recursely.refresh(self.package)
+
+        self.write('plugins/broken.py', 'FIXED = True\n')
+        report = recursely.refresh(self.package)
+        self.assertEqual(['plugins.broken'], report.added)
+
+    def test_changed_dirs(self):
+        self.write('plugins/sub/c.py', 'C = 3\n')
+        self.write('plugins/e.py', 'E = 5\n')
+
+        importer = recursely.RecursiveImporter.get_installed()
+        report = importer.refresh(self.package, changed_dirs=[
+            self.path('plugins/sub')])
+        self.assertEqual(['plugins.sub.c'], report.added)
+        self.assertEqual([self.path('plugins/sub')], sorted(set(self.scanned)))
+
+
+class Watch(_Refresh):
+
+    def setUp(self):
+        super(Watch, self).setUp()
+        self.reports = []
+        self.refreshed = threading.Event()
+        self.watcher = None
+
+    def tearDown(self):
+        if self.watcher is not None:
+            self.watcher.stop(10)
+        super(Watch, self).tearDown()
+
+    def callback(self, report):
+        self.reports.append(report)
+        self.refreshed.set()
+
+    def test_polling(self):
+        self.watcher = recursely.watch('plugins', callback=self.callback,
+                                       interval=0.05, inotify=False)
+        self.write('plugins/c.py', 'C = 3\n')
+        self.assertTrue(self.refreshed.wait(10))
+        self.assertEqual(['plugins.c'], self.reports[0].added)
+
+    @skipUnless(HAS_INOTIFY, "requires inotify")
+    def test_inotify(self):
+        self.watcher = recursely.watch('plugins', callback=self.callback,
+                                       inotify=True)
+        self.write('plugins/sub/c.py', 'C = 3\n')
+        self.assertTrue(self.refreshed.wait(10))
+        self.assertEqual(['plugins.sub.c'], self.reports[0].added)
+        self.assertEqual([self.path('plugins/sub')], sorted(set(self.scanned)))
+
+    @skipUnless(HAS_INOTIFY, "requires inotify")
+    def test_inotify__new_subpackage(self):
+        self.watcher = recursely.watch('plugins', callback=self.callback,
+                                       inotify=True)
+        os.mkdir(self.path('plugins/new'))
+        time.sleep(0.5)  # let the empty directory be refreshed
+        self.write('plugins/new/__init__.py', '')
+        self.write('plugins/new/d.py', 'D = 4\n')
+
+        deadline = time.time() + 10
+        while time.time() < deadline and 'plugins.new.d' not in sys.modules:
+            time.sleep(0.05)
+        self.assertIn('plugins.new.d', sys.modules)
+
+
+class RefreshReportTest(TestCase):
+
+    def test_bool(self):
+        self.assertFalse(RefreshReport('foo'))
+        self.assertTrue(RefreshReport('foo', added=['foo.bar']))
+        self.assertTrue(RefreshReport('foo', removed=['foo.bar']))
@@ -0,0 +1,30 @@
+"""
+Tests for the .registry module.
+"""
+from recursely.registry import PackageRegistry
+from tests._compat import TestCase
+
+
+class PackageRegistryTest(TestCase):
+
+    def setUp(self):
+        self.registry = PackageRegistry(['foo', 'bar.baz'])
+
+    def test_covers__package(self):
+        self.assertTrue(self.registry.covers('foo'))
+        self.assertTrue(self.registry.covers('bar.baz'))
+
+    def test_covers__descendant(self):
+        self.assertTrue(self.registry.covers('foo.a'))
+        self.assertTrue(self.registry.covers('bar.baz.a.b'))
+
+    def test_covers__outside(self):
+        self.assertFalse(self.registry.covers('bar'))
+        self.assertFalse(self.registry.covers('foobar'))
+        self.assertFalse(self.registry.covers('bar.bazinga'))
+        self.assertFalse(self.registry.covers('qux.foo'))
+
+    def test_add(self):
+        self.registry.add('qux')
+        self.assertIn('qux', self.registry)
+        self.assertTrue(self.registry.covers('qux.foo'))
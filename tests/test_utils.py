@@ -0,0 +1,95 @@
+"""
+Tests for the .utils module.
+"""
+from recursely.utils import FastSentinelList, SentinelList
+from tests._compat import TestCase
+
+
+class _SentinelListTests(object):
+    """Tests shared by both implementations of sentinel list."""
+
+    def setUp(self):
+        self.list = self.cls([1, 2, 3], sentinels=['s1', 's2'])
+
+    def assertList(self, expected):
+        self.assertEqual(expected + ['s1', 's2'], list(self.list))
+
+    def test_ctor__no_sentinel(self):
+        with self.assertRaises(TypeError):
+            self.cls([1, 2])
+
+    def test_ctor__ambiguous(self):
+        with self.assertRaises(TypeError):
+            self.cls([1], sentinel='s', sentinels=['s'])
+
+    def test_append(self):
+        self.list.append(4)
+        self.assertList([1, 2, 3, 4])
+
+    def test_append__sentinel(self):
+        self.list.append('s1')
+        self.assertList([1, 2, 3])
+
+    def test_extend(self):
+        self.list.extend([4, 's2', 5])
+        self.assertList([1, 2, 3, 4, 5])
+
+    def test_iadd(self):
+        self.list += [4]
+        self.assertList([1, 2, 3, 4])
+
+    def test_insert(self):
+        self.list.insert(0, 0)
+        self.list.insert(-1, 2.5)
+        self.list.insert(100, 4)
+        self.assertList([0, 1, 2, 2.5, 3, 4])
+
+    def test_pop(self):
+        self.assertEqual(3, self.list.pop())
+        self.assertEqual(1, self.list.pop(0))
+        self.assertList([2])
+
+    def test_remove(self):
+        self.list.remove(2)
+        self.assertList([1, 3])
+        with self.assertRaises(ValueError):
+            self.list.remove('s1')
+
+    def test_setitem(self):
+        self.list[-1] = 4
+        self.list[0:1] = [5, 6]
+        self.assertList([5, 6, 2, 4])
+
+    def test_delitem(self):
+        del self.list[-1]
+        del self.list[:1]
+        self.assertList([2])
+
+    def test_reverse(self):
+        self.list.reverse()
+        self.assertList([3, 2, 1])
+
+    def test_sort(self):
+        self.list.sort(reverse=True)
+        self.assertList([3, 2, 1])
+
+
+class SentinelListTest(_SentinelListTests, TestCase):
+    cls = SentinelList
+
+
+class FastSentinelListTest(_SentinelListTests, TestCase):
+    cls = FastSentinelList
+
+    def test_sentinels(self):
+        self.assertEqual(('s1', 's2'), self.list.sentinels)
+
+    def test_clear(self):
+        self.list.clear()
+        self.assertList([])
+
+    def test_index_out_of_range(self):
+        with self.assertRaises(IndexError):
+            self.list[3] = 4
+        with self.assertRaises(IndexError):
+            self.list.pop(3)